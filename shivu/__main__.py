@@ -1,17 +1,28 @@
 import asyncio
-import random
+import signal
+import time
 import traceback
+import uuid
 import importlib
 from html import escape
-from contextlib import asynccontextmanager
+from pymongo import UpdateOne
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import CommandHandler, MessageHandler, filters, ContextTypes
 from telegram.error import BadRequest
 
 from shivu import db, shivuu, application, LOGGER
+from shivu.name_matcher import NameMatcher
 from shivu.modules import ALL_MODULES
+from shivu.modules.database.catalog import catalog
+from shivu.modules.database.search_index import search_index
+from shivu.modules.database.spawn_sampler import sampler, rarity_emoji
+from shivu.modules.database.sent_tracker import sent_tracker
+from shivu.modules.database.spawn_state import spawn_state
+from shivu.modules.database.counter_buffer import grab_counters
+from shivu.modules.database import ownership
+from shivu.modules.database.users import users
+from shivu.modules.database.outbox import outbox, Priority
 
-col = db['anime_characters_lol']
 u_col = db['user_collection_lmaoooo']
 ut_col = db['user_totals_lmaoooo']
 gut_col = db['group_user_totalsssssss']
@@ -19,117 +30,65 @@ tg_col = db['top_global_groups']
 
 MSG_FREQ = 40
 DESPAWN_T = 180
+SPAWN_TTL = DESPAWN_T + 30
+GRAB_FUZZY = False
+# A spawn that cannot go out within this many seconds is skipped, so a busy
+# chat's backlog never keeps the spawn slot held.
+SPAWN_SEND_DEADLINE = 30
+# Hint replies to /grab are dropped if they cannot be sent this quickly.
+HINT_DEADLINE = 10
+IDLE_T = 6 * 3600
+REAP_INTERVAL = 600
 AMV_GRP = -1003100468240
 
 st = {
-    'msg_cnt': {},
-    'sent_ch': {},
-    'last_ch': {},
-    'first_g': {},
-    'sp_msg': {},
-    'sp_link': {},
-    'sp_now': {},
-    'locks': {}
+    'seen': {},
+    'matchers': {}
 }
 
-sp_set_col = None
-gr_col = None
-get_sp_set = None
-get_gr_ex = None
+rar_policy = None
+freq_table = None
 
-@asynccontextmanager
-async def get_lock(cid: str):
-    if cid not in st['locks']:
-        st['locks'][cid] = asyncio.Lock()
-    async with st['locks'][cid]:
-        yield
+def is_char_ok(ch: dict, cid: int, blocked: frozenset) -> bool:
+    if ch.get('removed', False):
+        return False
 
-async def is_char_ok(ch: dict, cid: int = None) -> bool:
-    try:
-        if ch.get('removed', False):
-            return False
-
-        r = ch.get('rarity', '🟢 Common')
-        r_e = r.split()[0] if ' ' in str(r) else r
-        vid = ch.get('is_video', False)
-
-        if vid and r_e == '🎥':
-            return cid == AMV_GRP
+    r_e = rarity_emoji(ch)
 
-        if gr_col and cid:
-            ex = await gr_col.find_one({'chat_id': cid, 'rarity_emoji': r_e})
-            if ex:
-                return True
+    if ch.get('is_video', False) and r_e == '🎥':
+        return cid == AMV_GRP
 
-            o_ex = await gr_col.find_one({'rarity_emoji': r_e, 'chat_id': {'$ne': cid}})
-            if o_ex:
-                return False
-
-        if sp_set_col and get_sp_set:
-            sets = await get_sp_set()
-            rars = sets.get('rarities', {}) if sets else {}
-            if r_e in rars and not rars[r_e].get('enabled', True):
-                return False
-
-        return True
-    except Exception as e:
-        LOGGER.error(f"Filter err: {e}")
-        return True
+    return r_e not in blocked
 
 async def upd_user(uid: int, uname: str, fname: str, ch: dict) -> None:
-    u = await u_col.find_one({'id': uid})
-    
-    upd_f = {
-        'username': uname,
-        'first_name': fname
-    }
-    
-    if u:
-        await u_col.update_one(
-            {'id': uid},
-            {
-                '$set': {k: v for k, v in upd_f.items() if v != u.get(k)},
-                '$push': {'characters': ch}
-            }
+    await u_col.bulk_write([
+        *ownership.grab_ops(uid, ch, {
+            '$set': {'username': uname, 'first_name': fname},
+            '$unset': {'broadcast_blocked': ''}
+        }),
+        UpdateOne(
+            {'id': uid, 'pass_data': {'$exists': True}},
+            {'$inc': {'pass_data.tasks.grabs': 1}}
         )
-        if 'pass_data' in u:
-            await u_col.update_one(
-                {'id': uid},
-                {'$inc': {'pass_data.tasks.grabs': 1}}
-            )
-    else:
-        await u_col.insert_one({
-            'id': uid,
-            **upd_f,
-            'characters': [ch]
-        })
-
-async def upd_grp_stats(uid: int, cid: int, uname: str, fname: str, gname: str) -> None:
-    await gut_col.update_one(
+    ], ordered=True)
+    users.invalidate(uid)
+    ownership.record_added_later(uid, [ch], unique=False)
+
+def upd_grp_stats(uid: int, cid: int, uname: str, fname: str, gname: str) -> None:
+    grab_counters.incr(
+        gut_col,
         {'user_id': uid, 'group_id': cid},
-        {
-            '$set': {'username': uname, 'first_name': fname},
-            '$inc': {'count': 1}
-        },
-        upsert=True
-    )
-    
-    await tg_col.update_one(
-        {'group_id': cid},
-        {
-            '$set': {'group_name': gname},
-            '$inc': {'count': 1}
-        },
-        upsert=True
+        {'username': uname, 'first_name': fname}
     )
+    grab_counters.incr(tg_col, {'group_id': cid}, {'group_name': gname}, unset=('broadcast_blocked',))
 
-async def despawn_ch(cid: int, mid: int, ch: dict, ctx: ContextTypes.DEFAULT_TYPE) -> None:
+async def despawn_ch(cid: int, sp_id: str, mid: int, ch: dict, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     try:
         await asyncio.sleep(DESPAWN_T)
 
-        if cid in st['first_g']:
-            for k in ['last_ch', 'sp_msg', 'sp_link', 'sp_now']:
-                st[k].pop(cid, None)
+        if await spawn_state.claimed_by(cid, sp_id) is not None:
+            await spawn_state.clear_spawn(cid, sp_id)
+            drop_matcher(cid, sp_id)
             return
 
         try:
@@ -151,12 +110,12 @@ async def despawn_ch(cid: int, mid: int, ch: dict, ctx: ContextTypes.DEFAULT_TYP
         send_m = ctx.bot.send_video if ch.get('is_video') else ctx.bot.send_photo
         mk = 'video' if ch.get('is_video') else 'photo'
         
-        miss_msg = await send_m(
+        miss_msg = await outbox.send(cid, lambda: send_m(
             chat_id=cid,
             **{mk: ch.get('img_url')},
             caption=cap,
             parse_mode='HTML'
-        )
+        ), Priority.SPAWN)
 
         await asyncio.sleep(10)
         try:
@@ -164,8 +123,8 @@ async def despawn_ch(cid: int, mid: int, ch: dict, ctx: ContextTypes.DEFAULT_TYP
         except BadRequest:
             pass
 
-        for k in ['last_ch', 'sp_msg', 'sp_link', 'sp_now']:
-            st[k].pop(cid, None)
+        await spawn_state.clear_spawn(cid, sp_id)
+        drop_matcher(cid, sp_id)
 
     except Exception as e:
         LOGGER.error(f"Despawn err: {e}\n{traceback.format_exc()}")
@@ -174,100 +133,82 @@ async def msg_counter(upd: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     if upd.effective_chat.type not in ['group', 'supergroup']:
         return
 
-    cid = str(upd.effective_chat.id)
-    
-    async with get_lock(cid):
-        st['msg_cnt'][cid] = st['msg_cnt'].get(cid, 0) + 1
+    cid = upd.effective_chat.id
+    st['seen'][cid] = time.monotonic()
+
+    # No lock needed: the increment is atomic in the backend and begin_spawn
+    # is a set-if-absent, so only one message per cycle can trigger a spawn.
+    cnt = await spawn_state.incr_messages(cid)
+    freq = (freq_table.get(cid) if freq_table is not None else None) or MSG_FREQ
 
-        if st['msg_cnt'][cid] >= MSG_FREQ:
-            if not st['sp_now'].get(cid, False):
-                st['sp_now'][cid] = True
-                st['msg_cnt'][cid] = 0
-                asyncio.create_task(send_img(upd, ctx))
+    if cnt >= freq and await spawn_state.begin_spawn(cid):
+        await spawn_state.reset_messages(cid)
+        asyncio.create_task(send_img(upd, ctx))
 
-async def sel_char(allowed: list, cid: int) -> dict:
-    try:
-        g_set = None
-        if gr_col and get_gr_ex:
-            g_set = await get_gr_ex(cid)
-
-        gl_rars = {}
-        if sp_set_col and get_sp_set:
-            sets = await get_sp_set()
-            gl_rars = sets.get('rarities', {}) if sets else {}
-
-        r_pools = {}
-        for c in allowed:
-            e = c.get('rarity', '🟢 Common').split()[0] if ' ' in str(c.get('rarity', '')) else '🟢'
-            r_pools.setdefault(e, []).append(c)
-
-        w_ch = []
-
-        if g_set and g_set['rarity_emoji'] in r_pools:
-            w_ch.append({
-                'chars': r_pools[g_set['rarity_emoji']],
-                'chance': g_set.get('chance', 10.0)
-            })
-
-        for e, r_d in gl_rars.items():
-            if not r_d.get('enabled', True):
-                continue
-            if g_set and e == g_set['rarity_emoji']:
-                continue
-            if e in r_pools:
-                w_ch.append({
-                    'chars': r_pools[e],
-                    'chance': r_d.get('chance', 5.0)
-                })
-
-        if w_ch:
-            tot = sum(c['chance'] for c in w_ch)
-            rnd = random.uniform(0, tot)
-            cum = 0
-            
-            for ch in w_ch:
-                cum += ch['chance']
-                if rnd <= cum:
-                    return random.choice(ch['chars'])
+async def reap_idle_chats() -> None:
+    while True:
+        await asyncio.sleep(REAP_INTERVAL)
+        try:
+            cutoff = time.monotonic() - IDLE_T
+            idle = [cid for cid in set().union(*st.values()) if st['seen'].get(cid, 0) < cutoff]
 
-    except Exception as e:
-        LOGGER.error(f"Char sel err: {e}")
+            for cid in idle:
+                for d in st.values():
+                    d.pop(cid, None)
+                await spawn_state.forget(cid)
+                if freq_table is not None:
+                    freq_table.forget(cid)
+
+            await spawn_state.prune()
+
+            if idle:
+                LOGGER.info(f"Reaped {len(idle)} idle chats")
+        except Exception as e:
+            LOGGER.error(f"Reaper err: {e}")
 
-    return random.choice(allowed)
+def get_matcher(cid: int, live: dict) -> NameMatcher:
+    cached = st['matchers'].get(cid)
+    if cached and cached[0] == live['id']:
+        return cached[1]
+    m = NameMatcher.from_character(live['char'])
+    st['matchers'][cid] = (live['id'], m)
+    return m
+
+def drop_matcher(cid: int, sp_id: str) -> None:
+    cached = st['matchers'].get(cid)
+    if cached and cached[0] == sp_id:
+        del st['matchers'][cid]
+
+async def sel_char(weights: tuple, accept) -> dict:
+    return await sampler.pick(weights, accept)
 
 async def send_img(upd: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     cid = upd.effective_chat.id
 
     try:
-        all_ch = await col.find({}).to_list(length=None)
+        all_ch = await catalog.all()
         
         if not all_ch:
-            st['sp_now'][str(cid)] = False
             return
 
-        if cid not in st['sent_ch']:
-            st['sent_ch'][cid] = []
+        if sent_tracker.count(cid) >= len(all_ch):
+            sent_tracker.reset(cid)
 
-        if len(st['sent_ch'][cid]) >= len(all_ch):
-            st['sent_ch'][cid] = []
+        weights, blocked = (), frozenset()
+        if rar_policy is not None:
+            weights, blocked = await rar_policy.for_chat(cid)
 
-        avail = [c for c in all_ch if c.get('id') not in st['sent_ch'][cid]]
-        
-        if not avail:
-            avail = all_ch
-            st['sent_ch'][cid] = []
+        def ok(c: dict) -> bool:
+            return not sent_tracker.has(cid, catalog.ordinal(c.get('id'))) and is_char_ok(c, cid, blocked)
 
-        allowed = [c for c in avail if await is_char_ok(c, cid)]
-        
-        if not allowed:
-            st['sp_now'][str(cid)] = False
-            return
+        ch = await sel_char(weights, ok)
 
-        ch = await sel_char(allowed, cid)
+        if not ch and sent_tracker.count(cid):
+            sent_tracker.reset(cid)
+            ch = await sel_char(weights, ok)
 
-        st['sent_ch'][cid].append(ch['id'])
-        st['last_ch'][cid] = ch
-        st['first_g'].pop(cid, None)
+        if not ch:
+            return
 
         cap = """<b><u>✨ LOOK! A WAIFU HAS APPEARED ✨</u>
 ✦ MAKE HER YOURS — TYPE /grab &lt;waifu_name&gt;
@@ -277,74 +218,98 @@ async def send_img(upd: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
         send_m = ctx.bot.send_video if ch.get('is_video') else ctx.bot.send_photo
         mk = 'video' if ch.get('is_video') else 'photo'
         
-        sp_msg = await send_m(
+        sp_msg = await outbox.send(cid, lambda: send_m(
             chat_id=cid,
             **{mk: ch.get('img_url')},
             caption=cap,
             parse_mode='HTML'
-        )
+        ), Priority.SPAWN, deadline=SPAWN_SEND_DEADLINE)
+        if sp_msg is None:
+            LOGGER.warning(f"Spawn in {cid} skipped: send backlog")
+            return
 
-        st['sp_msg'][cid] = sp_msg.message_id
+        sent_tracker.add(cid, catalog.ordinal(ch['id']))
 
         uname = upd.effective_chat.username
         if uname:
-            st['sp_link'][cid] = f"https://t.me/{uname}/{sp_msg.message_id}"
+            link = f"https://t.me/{uname}/{sp_msg.message_id}"
         else:
             cid_str = str(cid).replace('-100', '')
-            st['sp_link'][cid] = f"https://t.me/c/{cid_str}/{sp_msg.message_id}"
+            link = f"https://t.me/c/{cid_str}/{sp_msg.message_id}"
+
+        sp_id = uuid.uuid4().hex
+        await spawn_state.set_spawn(cid, {
+            'id': sp_id,
+            'char': ch,
+            'msg_id': sp_msg.message_id,
+            'link': link
+        }, SPAWN_TTL)
 
-        st['sp_now'][str(cid)] = False
+        st['matchers'][cid] = (sp_id, NameMatcher.from_character(ch))
 
-        asyncio.create_task(despawn_ch(cid, sp_msg.message_id, ch, ctx))
+        asyncio.create_task(despawn_ch(cid, sp_id, sp_msg.message_id, ch, ctx))
 
     except Exception as e:
         LOGGER.error(f"Spawn err: {e}\n{traceback.format_exc()}")
-        st['sp_now'][str(cid)] = False
+    finally:
+        await spawn_state.end_spawn(cid)
+
+async def reply_html(upd: Update, text: str, **kw):
+    """Successful /grab confirmation, sent ahead of everything else."""
+    return await outbox.send(
+        upd.effective_chat.id,
+        lambda: upd.message.reply_html(text, **kw),
+        Priority.GRAB_REPLY
+    )
+
+async def reply_hint(upd: Update, text: str, **kw):
+    """Cosmetic /grab reply: late ones are dropped and only the newest
+    pending hint per chat is kept."""
+    return await outbox.send(
+        upd.effective_chat.id,
+        lambda: upd.message.reply_html(text, **kw),
+        Priority.REPLY,
+        deadline=HINT_DEADLINE,
+        coalesce='grab-hint'
+    )
 
 async def guess(upd: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     cid = upd.effective_chat.id
     uid = upd.effective_user.id
 
     try:
-        if cid not in st['last_ch']:
-            await upd.message.reply_html('<b>NO CHARACTER HAS SPAWNED YET!</b>')
+        live = await spawn_state.get_spawn(cid)
+
+        if not live:
+            await reply_hint(upd, '<b>NO CHARACTER HAS SPAWNED YET!</b>')
             return
 
-        if cid in st['first_g']:
-            await upd.message.reply_html('<b>🚫 WAIFU ALREADY GRABBED BY SOMEONE ELSE ⚡</b>')
+        if await spawn_state.claimed_by(cid, live['id']) is not None:
+            await reply_hint(upd, '<b>🚫 WAIFU ALREADY GRABBED BY SOMEONE ELSE ⚡</b>')
             return
 
         g_txt = ' '.join(ctx.args).lower() if ctx.args else ''
 
         if not g_txt:
-            await upd.message.reply_html('<b>PLEASE PROVIDE A NAME!</b>')
+            await reply_hint(upd, '<b>PLEASE PROVIDE A NAME!</b>')
             return
 
         if "()" in g_txt or "&" in g_txt:
-            await upd.message.reply_html("<b>NAHH YOU CAN'T USE THIS TYPES OF WORDS...❌</b>")
+            await reply_hint(upd, "<b>NAHH YOU CAN'T USE THIS TYPES OF WORDS...❌</b>")
             return
 
-        ch_name = st['last_ch'][cid].get('name', '').lower()
-        n_parts = ch_name.split()
+        ch = live['char']
 
-        is_ok = (
-            sorted(n_parts) == sorted(g_txt.split()) or
-            any(p == g_txt for p in n_parts) or
-            g_txt == ch_name
-        )
-
-        if is_ok:
-            st['first_g'][cid] = uid
+        if get_matcher(cid, live).matches(g_txt, fuzzy=GRAB_FUZZY):
+            if not await spawn_state.claim(cid, live['id'], uid, SPAWN_TTL):
+                await reply_hint(upd, '<b>🚫 WAIFU ALREADY GRABBED BY SOMEONE ELSE ⚡</b>')
+                return
 
-            if cid in st['sp_msg']:
-                try:
-                    await ctx.bot.delete_message(chat_id=cid, message_id=st['sp_msg'][cid])
-                except BadRequest:
-                    pass
-                st['sp_msg'].pop(cid, None)
+            try:
+                await ctx.bot.delete_message(chat_id=cid, message_id=live['msg_id'])
+            except BadRequest:
+                pass
 
-            ch = st['last_ch'][cid]
-            
             await upd_user(
                 uid,
                 getattr(upd.effective_user, 'username', None),
@@ -352,7 +317,7 @@ async def guess(upd: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
                 ch
             )
 
-            await upd_grp_stats(
+            upd_grp_stats(
                 uid,
                 cid,
                 getattr(upd.effective_user, 'username', None),
@@ -379,20 +344,15 @@ async def guess(upd: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
 
             kb = [[InlineKeyboardButton("🪼 HAREM", switch_inline_query_current_chat=f"collection.{uid}")]]
 
-            await upd.message.reply_text(
-                msg,
-                parse_mode='HTML',
-                reply_markup=InlineKeyboardMarkup(kb)
-            )
-
-            st['sp_link'].pop(cid, None)
+            await reply_html(upd, msg, reply_markup=InlineKeyboardMarkup(kb))
 
         else:
             kb = []
-            if cid in st['sp_link']:
-                kb.append([InlineKeyboardButton("📍 VIEW SPAWN MESSAGE", url=st['sp_link'][cid])])
+            if live.get('link'):
+                kb.append([InlineKeyboardButton("📍 VIEW SPAWN MESSAGE", url=live['link'])])
 
-            await upd.message.reply_html(
+            await reply_hint(
+                upd,
                 '<b>PLEASE WRITE A CORRECT NAME..❌</b>',
                 reply_markup=InlineKeyboardMarkup(kb) if kb else None
             )
@@ -400,7 +360,18 @@ async def guess(upd: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     except Exception as e:
         LOGGER.error(f"Guess err: {e}\n{traceback.format_exc()}")
 
+def stop_on_signals() -> None:
+    """Turn SIGTERM/SIGINT into cancelling main(), so its cleanup runs."""
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, task.cancel)
+        except (NotImplementedError, RuntimeError):
+            pass
+
 async def main():
+    stop_on_signals()
     try:
         for mod in ALL_MODULES:
             try:
@@ -410,22 +381,27 @@ async def main():
                 LOGGER.error(f"❌ Failed: {mod} - {e}")
 
         try:
-            from shivu.modules.rarity import (
-                spawn_settings_collection as ssc,
-                group_rarity_collection as grc,
-                get_spawn_settings as gss,
-                get_group_exclusive as gge
-            )
-            global spawn_settings_collection, group_rarity_collection
-            global get_spawn_settings, get_group_exclusive
-            spawn_settings_collection = ssc
-            group_rarity_collection = grc
-            get_spawn_settings = gss
-            get_group_exclusive = gge
+            from shivu.modules.rarity import rarity_policy
+            global rar_policy
+            rar_policy = rarity_policy
             LOGGER.info("✅ Rarity system loaded")
         except Exception as e:
             LOGGER.warning(f"⚠️ Rarity system unavailable: {e}")
 
+        try:
+            from shivu.modules.changetime import frequency_table
+            global freq_table
+            freq_table = frequency_table
+        except Exception as e:
+            LOGGER.warning(f"⚠️ Spawn frequency table unavailable: {e}")
+
+        await catalog.load()
+        await search_index.warm()
+        await ownership.ensure_indexes()
+        # Summaries of unmigrated users are partial until this finishes.
+        asyncio.create_task(ownership.backfill())
+        asyncio.create_task(ownership.maintain_character_stats())
+
         try:
             from shivu.modules.backup import setup_backup_handlers
             setup_backup_handlers(application)
@@ -442,12 +418,23 @@ async def main():
         await application.initialize()
         await application.start()
         await application.updater.start_polling(drop_pending_updates=True)
+        grab_counters.start()
+        outbox.start()
+
+        try:
+            from shivu.modules.broadcast import resume_broadcasts
+            asyncio.create_task(resume_broadcasts(application.bot))
+        except Exception as e:
+            LOGGER.warning(f"⚠️ Broadcast resume unavailable: {e}")
+        asyncio.create_task(reap_idle_chats())
 
         LOGGER.info("✅ Bot started successfully")
 
         while True:
             await asyncio.sleep(3600)
 
+    except asyncio.CancelledError:
+        LOGGER.info("Stop signal received, shutting down")
     except Exception as e:
         LOGGER.error(f"❌ Fatal error: {e}\n{traceback.format_exc()}")
     finally:
@@ -458,6 +445,14 @@ async def main():
         except Exception as e:
             LOGGER.error(f"Cleanup error: {e}")
 
+        try:
+            await grab_counters.stop()
+            await ownership.drain()
+        except Exception as e:
+            LOGGER.error(f"Counter flush error: {e}")
+
+        await outbox.stop()
+
 if __name__ == "__main__":
     try:
         asyncio.run(main())
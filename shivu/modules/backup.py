@@ -1,7 +1,18 @@
 import os
 import json
+import gzip
+import time
+import shutil
+import asyncio
+import hashlib
 import logging
-from datetime import datetime
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import bson
+import bson.json_util
+from pymongo import InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -15,6 +26,22 @@ os.makedirs(BACKUP_DIR, exist_ok=True)
 OWNER_ID = 5147822244
 scheduler = None
 
+BACKUP_COLLECTIONS = [
+    'anime_characters_lol', 'user_collection_lmaoooo', 'user_totals_lmaoooo',
+    'group_user_totalsssssss', 'top_global_groups', 'safari_users_collection',
+    'safari_cooldown', 'sudo_users_collection', 'global_ban_users_collection',
+    'total_pm_users', 'Banned_Groups', 'Banned_Users', 'registered_users',
+    'set_on_data', 'set_off_data', 'refeer_collection', 'user_characters',
+    'character_stats'
+]
+BACKUP_BATCH = 1000
+BACKUP_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+
+# One worker: the collection files are written one after another, and the
+# event loop only ever waits on a single batch.
+_io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backup")
+
 def convert_objectid(obj):
     if isinstance(obj, ObjectId):
         return str(obj)
@@ -24,70 +51,430 @@ def convert_objectid(obj):
         return [convert_objectid(item) for item in obj]
     return obj
 
-async def create_backup():
+class CollectionWriter:
+    """gzip-compressed mongodump-style BSON file for one collection.
+
+    Encoding, hashing and compression all run in the backup thread; the
+    SHA-256 covers the uncompressed BSON stream.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.size = 0
+        self._sha = hashlib.sha256()
+        self._fh = gzip.open(path, 'wb', compresslevel=6)
+
+    def write(self, docs):
+        for doc in docs:
+            raw = bson.encode(doc)
+            self._sha.update(raw)
+            self._fh.write(raw)
+            self.size += len(raw)
+        self.count += len(docs)
+
+    def close(self):
+        self._fh.close()
+        return {
+            "file": os.path.basename(self.path),
+            "count": self.count,
+            "bytes": self.size,
+            "sha256": self._sha.hexdigest()
+        }
+
+async def run_io(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_io_pool, fn, *args)
+
+async def dump_collection(collection, path, query=None):
+    writer = await run_io(CollectionWriter, path)
     try:
-        from shivu import db
+        batch = []
+        async for doc in collection.find(query or {}).batch_size(BACKUP_BATCH):
+            batch.append(doc)
+            if len(batch) >= BACKUP_BATCH:
+                await run_io(writer.write, batch)
+                batch = []
+        if batch:
+            await run_io(writer.write, batch)
+    finally:
+        entry = await run_io(writer.close)
+    return entry
+
+def pack_backup(work_dir, archive):
+    # Stored uncompressed: every member is already gzip.
+    with tarfile.open(archive, 'w') as tar:
+        for name in sorted(os.listdir(work_dir)):
+            tar.add(os.path.join(work_dir, name), arcname=name)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+# --- full and delta snapshots ---
+# A full backup is a base; each delta holds only documents changed since the
+# previous file in its chain, found by replaying the database change stream
+# from the resume token saved with that file.
+STATE_FILE = os.path.join(BACKUP_DIR, "state.json")
+FULL_EVERY = timedelta(hours=24)
+KEEP_CHAINS = 2
+CHANGE_DRAIN_SECONDS = 120
+
+CHANGE_PIPELINE = [
+    {"$match": {"ns.coll": {"$in": BACKUP_COLLECTIONS}}},
+    {"$project": {"ns": 1, "documentKey": 1, "operationType": 1}}
+]
+
+class FullBackupNeeded(Exception):
+    pass
+
+def load_state():
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get("token"):
+            state["token"] = bson.json_util.loads(state["token"])
+        return state
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state):
+    data = dict(state)
+    if data.get("token") is not None:
+        data["token"] = bson.json_util.dumps(data["token"])
+    with open(STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+async def current_token(db):
+    stream = db.watch(CHANGE_PIPELINE)
+    try:
+        await stream.try_next()
+        return stream.resume_token
+    finally:
+        await stream.close()
+
+async def collect_changes(db, token):
+    """{collection: {encoded _id: _id}} changed since ``token``, and the new token."""
+    changed = {}
+    deadline = time.monotonic() + CHANGE_DRAIN_SECONDS
+    try:
+        stream = db.watch(CHANGE_PIPELINE, resume_after=token)
+    except Exception as e:
+        raise FullBackupNeeded(e)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_data = {}
+    try:
+        while time.monotonic() < deadline:
+            try:
+                change = await stream.try_next()
+            except Exception as e:
+                # Token fell off the oplog, or streams are unavailable.
+                raise FullBackupNeeded(e)
+            if change is None:
+                break
+            if change["operationType"] in ("drop", "rename", "dropDatabase", "invalidate"):
+                raise FullBackupNeeded(change["operationType"])
+            _id = change["documentKey"]["_id"]
+            changed.setdefault(change["ns"]["coll"], {})[bson.encode({"_id": _id})] = _id
+        return changed, stream.resume_token
+    finally:
+        await stream.close()
+
+async def dump_changed(collection, ids, work_dir):
+    """Write the current version of each id, and the ids that no longer exist."""
+    name = collection.name
+    docs = await run_io(CollectionWriter, os.path.join(work_dir, f"{name}.bson.gz"))
+    gone = await run_io(CollectionWriter, os.path.join(work_dir, f"{name}.deleted.bson.gz"))
+    try:
+        ids = list(ids)
+        for i in range(0, len(ids), BACKUP_BATCH):
+            chunk = ids[i:i + BACKUP_BATCH]
+            found = await collection.find({"_id": {"$in": chunk}}).to_list(length=None)
+            present = {bson.encode({"_id": d["_id"]}) for d in found}
+            missing = [{"_id": _id} for _id in chunk if bson.encode({"_id": _id}) not in present]
+            if found:
+                await run_io(docs.write, found)
+            if missing:
+                await run_io(gone.write, missing)
+    finally:
+        entry = await run_io(docs.close)
+        entry["deleted"] = await run_io(gone.close)
+    return entry
+
+async def create_backup(full=False):
+    work_dir = backup_file = None
+    try:
+        from shivu import db
 
-        collections = [
-            'anime_characters_lol', 'user_collection_lmaoooo', 'user_totals_lmaoooo',
-            'group_user_totalsssssss', 'top_global_groups', 'safari_users_collection',
-            'safari_cooldown', 'sudo_users_collection', 'global_ban_users_collection',
-            'total_pm_users', 'Banned_Groups', 'Banned_Users', 'registered_users',
-            'set_on_data', 'set_off_data', 'refeer_collection'
-        ]
+        state = load_state()
+        now = datetime.now(timezone.utc)
+        base_at = datetime.fromisoformat(state["base_at"]) if state.get("base_at") else None
+        delta = (
+            not full and state.get("token") is not None and state.get("last")
+            and os.path.exists(os.path.join(BACKUP_DIR, state["last"]))
+            and base_at is not None and now - base_at < FULL_EVERY
+        )
 
-        for col_name in collections:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        work_dir = os.path.join(BACKUP_DIR, f".tmp_{timestamp}")
+        os.makedirs(work_dir, exist_ok=True)
+
+        manifest = {
+            "format": BACKUP_FORMAT,
+            "kind": "full",
+            "created_at": now.isoformat(),
+            "collections": {}
+        }
+
+        token = None
+        if delta:
+            try:
+                changed, token = await collect_changes(db, state["token"])
+                manifest.update(kind="delta", parent=state["last"])
+                for col_name, ids in changed.items():
+                    manifest["collections"][col_name] = await dump_changed(db[col_name], ids.values(), work_dir)
+            except FullBackupNeeded as e:
+                LOGGER.warning(f"Delta backup unavailable, taking a full one: {e}")
+                shutil.rmtree(work_dir, ignore_errors=True)
+                os.makedirs(work_dir, exist_ok=True)
+                manifest["collections"] = {}
+                delta = False
+
+        if not delta:
             try:
-                collection = db[col_name]
-                documents = await collection.find({}).to_list(length=None)
-                backup_data[col_name] = [convert_objectid(doc) for doc in documents]
+                token = await current_token(db)
             except Exception as e:
-                LOGGER.error(f"Error backing up {col_name}: {e}")
-
-        backup_file = os.path.join(BACKUP_DIR, f"backup_{timestamp}.json")
-        with open(backup_file, 'w', encoding='utf-8') as f:
-            json.dump(backup_data, f, indent=2, ensure_ascii=False, default=str)
+                LOGGER.warning(f"Change streams unavailable, deltas disabled: {e}")
+                token = None
+            failed = []
+            for col_name in BACKUP_COLLECTIONS:
+                try:
+                    path = os.path.join(work_dir, f"{col_name}.bson.gz")
+                    manifest["collections"][col_name] = await dump_collection(db[col_name], path)
+                except Exception as e:
+                    LOGGER.error(f"Error backing up {col_name}: {e}")
+                    failed.append(col_name)
+            # A base missing a collection would silently drop it from every
+            # restore of its chain, so it is not kept.
+            if failed:
+                raise RuntimeError(f"could not dump {', '.join(failed)}")
+
+        with open(os.path.join(work_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        backup_file = os.path.join(BACKUP_DIR, f"backup_{timestamp}{'_delta' if delta else ''}.tar")
+        await run_io(pack_backup, work_dir, backup_file)
+
+        state.update(token=token, last=os.path.basename(backup_file))
+        if not delta:
+            state["base_at"] = now.isoformat()
+        save_state(state)
 
         file_size = os.path.getsize(backup_file) / (1024 * 1024)
-        cleanup_old_backups(24)
+        cleanup_old_backups(KEEP_CHAINS)
 
         return backup_file, file_size
     except Exception as e:
         LOGGER.error(f"Backup failed: {e}")
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        # A half-written archive never made it into the chain.
+        if backup_file and os.path.exists(backup_file) and load_state().get("last") != os.path.basename(backup_file):
+            os.remove(backup_file)
         return None, 0
 
-def cleanup_old_backups(keep=24):
+def is_delta(name):
+    return name.endswith('_delta.tar')
+
+def cleanup_old_backups(keep=KEEP_CHAINS):
+    """Keep the newest ``keep`` full backups and every delta after the oldest kept."""
     try:
         backups = sorted([f for f in os.listdir(BACKUP_DIR) if f.startswith('backup_')])
-        if len(backups) > keep:
-            for old_backup in backups[:-keep]:
+        bases = [i for i, name in enumerate(backups) if not is_delta(name)]
+        if len(bases) > keep:
+            for old_backup in backups[:bases[-keep]]:
                 os.remove(os.path.join(BACKUP_DIR, old_backup))
     except Exception as e:
         LOGGER.error(f"Cleanup error: {e}")
 
-async def restore_backup(backup_file):
-    try:
-        from shivu import db
-
+def read_manifest(backup_file):
+    if not tarfile.is_tarfile(backup_file):
+        return {"kind": "full", "collections": {}}
+    with tarfile.open(backup_file, 'r') as tar:
+        return json.load(tar.extractfile(MANIFEST_NAME))
+
+def backup_chain(backup_file):
+    """The full base and deltas needed to rebuild ``backup_file``, oldest first."""
+    chain = [backup_file]
+    manifest = read_manifest(backup_file)
+    while manifest.get("kind") == "delta":
+        parent = os.path.join(os.path.dirname(backup_file), manifest["parent"])
+        if not os.path.exists(parent):
+            raise FileNotFoundError(f"Missing {manifest['parent']} in the backup chain")
+        chain.append(parent)
+        manifest = read_manifest(parent)
+    return chain[::-1]
+
+def read_backup(backup_file):
+    """Yield (collection name, op, documents) from a backup, in batches.
+
+    ``op`` is ``"docs"`` for documents to store and ``"delete"`` for ``_id``
+    stubs a delta removed. Reads both the tar format written by
+    :func:`create_backup` and the older single-JSON backups. Runs in the
+    backup thread.
+    """
+    if not tarfile.is_tarfile(backup_file):
         with open(backup_file, 'r', encoding='utf-8') as f:
-            backup_data = json.load(f)
+            for name, docs in json.load(f).items():
+                yield name, "docs", docs
+        return
 
-        restored_collections = []
+    def members(tar, entry):
+        with gzip.open(tar.extractfile(entry["file"]), 'rb') as fh:
+            batch = []
+            for doc in bson.decode_file_iter(fh):
+                batch.append(doc)
+                if len(batch) >= BACKUP_BATCH:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+    with tarfile.open(backup_file, 'r') as tar:
+        manifest = json.load(tar.extractfile(MANIFEST_NAME))
+        for name, entry in manifest["collections"].items():
+            for batch in members(tar, entry):
+                yield name, "docs", batch
+            if entry.get("deleted"):
+                for batch in members(tar, entry["deleted"]):
+                    yield name, "delete", batch
+
+# --- restore ---
+# insert: add documents, skipping _ids that already exist
+# upsert: replace by _id, creating missing documents
+# replace: empty each restored collection first, then insert
+RESTORE_MODES = ("upsert", "insert", "replace")
+RESTORE_QUEUE = 4
+RESTORE_CONCURRENCY = 4
+PROGRESS_INTERVAL = 5
+
+def restore_id(doc):
+    # Old JSON backups stored ObjectIds as strings.
+    _id = doc.get("_id")
+    if isinstance(_id, str) and ObjectId.is_valid(_id):
+        doc["_id"] = ObjectId(_id)
+    return doc
+
+async def apply_batch(collection, op, documents, mode):
+    if op == "delete":
+        await collection.delete_many({"_id": {"$in": [d["_id"] for d in documents]}})
+        return 0
+
+    documents = [restore_id(d) for d in documents]
+    if mode == "upsert":
+        await collection.bulk_write(
+            [ReplaceOne({"_id": d["_id"]}, d, upsert=True) if "_id" in d else InsertOne(d) for d in documents],
+            ordered=False
+        )
+        return len(documents)
 
-        for collection_name, documents in backup_data.items():
+    try:
+        res = await collection.insert_many(documents, ordered=False)
+        return len(res.inserted_ids)
+    except BulkWriteError as e:
+        # Duplicate _ids are expected when inserting over live data.
+        fatal = [w for w in e.details.get("writeErrors", []) if w.get("code") != 11000]
+        if fatal:
+            raise
+        return e.details.get("nInserted", 0)
+
+class RestoreProgress:
+    def __init__(self):
+        self.counts = {}
+        self.errors = {}
+        self.files_done = 0
+        self.files = 0
+
+    def text(self):
+        lines = [f"{name}: {n}" for name, n in self.counts.items()]
+        return f"Restoring... file {self.files_done + 1}/{self.files}\n\n" + "\n".join(lines[-15:])
+
+async def restore_file(db, backup_file, mode, progress):
+    """Stream one backup file into the database.
+
+    The reader thread parses batches one at a time; each collection gets
+    its own writer task behind a small queue, so collections load in
+    parallel while memory stays at a few batches per collection.
+    """
+    queues = {}
+    workers = []
+    slots = asyncio.Semaphore(RESTORE_CONCURRENCY)
+
+    async def writer(name, queue):
+        collection = db[name]
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            op, documents = item
             try:
-                collection = db[collection_name]
-                if documents:
-                    for doc in documents:
-                        if '_id' in doc:
-                            del doc['_id']
-                    await collection.insert_many(documents)
-                    restored_collections.append(f"{collection_name} ({len(documents)} docs)")
+                async with slots:
+                    n = await apply_batch(collection, op, documents, mode)
+                progress.counts[name] = progress.counts.get(name, 0) + n
             except Exception as e:
-                LOGGER.error(f"Error restoring {collection_name}: {e}")
+                progress.errors[name] = str(e)
+                LOGGER.error(f"Error restoring {name}: {e}")
+
+    reader = read_backup(backup_file)
+    try:
+        while True:
+            item = await run_io(next, reader, None)
+            if item is None:
+                break
+            name, op, documents = item
+            if not documents:
+                continue
+            if name not in queues:
+                if mode == "replace":
+                    await db[name].delete_many({})
+                queues[name] = asyncio.Queue(maxsize=RESTORE_QUEUE)
+                workers.append(asyncio.create_task(writer(name, queues[name])))
+            await queues[name].put((op, documents))
+    finally:
+        for queue in queues.values():
+            await queue.put(None)
+        await asyncio.gather(*workers, return_exceptions=True)
+        await run_io(reader.close)
+
+async def restore_backup(backup_file, mode="upsert", on_progress=None):
+    try:
+        from shivu import db
+
+        chain = await run_io(backup_chain, backup_file)
+        progress = RestoreProgress()
+        progress.files = len(chain)
+
+        async def report():
+            while True:
+                await asyncio.sleep(PROGRESS_INTERVAL)
+                try:
+                    await on_progress(progress)
+                except Exception:
+                    pass
+
+        reporter = asyncio.create_task(report()) if on_progress else None
+        try:
+            for i, part in enumerate(chain):
+                # Deltas always replay by _id; only the base honours the mode.
+                await restore_file(db, part, mode if i == 0 else "upsert", progress)
+                progress.files_done += 1
+        finally:
+            if reporter:
+                reporter.cancel()
+
+        restored_collections = [f"{name} ({n} docs)" for name, n in progress.counts.items()]
+        restored_collections += [f"{name}: error {err}" for name, err in progress.errors.items()]
+        if len(chain) > 1:
+            restored_collections.append(f"chain: {len(chain)} files")
+
+        if 'anime_characters_lol' in progress.counts:
+            from shivu.modules.database.catalog import catalog
+            catalog.invalidate()
 
         return True, restored_collections
     except Exception as e:
@@ -103,7 +490,7 @@ async def backup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     msg = await update.message.reply_text("Creating backup...")
-    backup_file, file_size = await create_backup()
+    backup_file, file_size = await create_backup(full=True)
 
     if backup_file:
         await msg.edit_text(
@@ -125,27 +512,46 @@ async def restore_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Only owner can restore.")
         return
 
+    args = context.args or []
+    mode = next((a for a in args if a in RESTORE_MODES), "upsert")
+    local = next((a for a in args if a.startswith('backup_')), None)
+
+    async def run(backup_file, msg):
+        async def on_progress(progress):
+            await msg.edit_text(f"Mode: {mode}\n" + progress.text())
+
+        success, restored = await restore_backup(backup_file, mode, on_progress)
+        if success:
+            await msg.edit_text(f"Restore Completed ({mode})\n\n" + "\n".join(restored))
+        else:
+            await msg.edit_text("Restore failed.")
+
     if update.message.reply_to_message and update.message.reply_to_message.document:
         msg = await update.message.reply_text("Downloading backup file...")
         try:
             file = await update.message.reply_to_message.document.get_file()
-            backup_file = os.path.join(BACKUP_DIR, update.message.reply_to_message.document.file_name)
+            backup_file = os.path.join(BACKUP_DIR, os.path.basename(update.message.reply_to_message.document.file_name))
             await file.download_to_drive(backup_file)
 
             await msg.edit_text("Restoring database...")
-            success, restored = await restore_backup(backup_file)
-
-            if success:
-                await msg.edit_text("Restore Completed\n\n" + "\n".join(restored))
-            else:
-                await msg.edit_text("Restore failed.")
+            await run(backup_file, msg)
+        except Exception as e:
+            await msg.edit_text(f"Error: {e}")
+    elif local and os.path.exists(os.path.join(BACKUP_DIR, os.path.basename(local))):
+        msg = await update.message.reply_text("Restoring database...")
+        try:
+            await run(os.path.join(BACKUP_DIR, os.path.basename(local)), msg)
         except Exception as e:
             await msg.edit_text(f"Error: {e}")
     else:
         backups = sorted([f for f in os.listdir(BACKUP_DIR) if f.startswith('backup_')], reverse=True)
         if backups:
             backup_list = "\n".join(backups[:10])
-            await update.message.reply_text(f"Available Backups:\n\n{backup_list}\n\nReply to a file with /restore")
+            await update.message.reply_text(
+                f"Available Backups:\n\n{backup_list}\n\n"
+                f"Reply to a file with /restore, or /restore <name>\n"
+                f"Modes: {', '.join(RESTORE_MODES)} (default upsert)"
+            )
         else:
             await update.message.reply_text("No backups found.")
 
@@ -193,7 +599,7 @@ async def hourly_backup_job(application):
                         document=f,
                         filename=os.path.basename(backup_file),
                         caption=(
-                            f"Hourly Backup\n\n"
+                            f"Hourly {'Delta ' if is_delta(backup_file) else ''}Backup\n\n"
                             f"Size: {file_size:.2f} MB\n"
                             f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
                         )
@@ -1,11 +1,31 @@
 import asyncio
+import time
+from datetime import datetime, timezone
 from telegram import Update
 from telegram.ext import CallbackContext, CommandHandler
-from shivu import application, top_global_groups_collection, user_collection
+from shivu import application, db, top_global_groups_collection, user_collection, LOGGER
+from shivu.modules.database.outbox import outbox, Priority
+from shivu.modules.database import lease
 
 # --- CONFIGURATION ---
 OWNER_ID = 8420981179
 
+broadcast_jobs = db['broadcast_jobs']
+
+BROADCAST_BATCH = 200
+BROADCAST_WORKERS = 25
+PROGRESS_EVERY = 15
+# A job's worker must checkpoint within this many seconds or another worker
+# may take the job over; also how often idle workers look for such jobs.
+JOB_LEASE = 600
+
+# Set on users and groups the bot can no longer reach; cleared on their next grab.
+BLOCKED_FIELD = 'broadcast_blocked'
+
+# Only errors that mean the chat is gone for good; a muted bot or missing
+# rights is a plain failure.
+INVALID_ERRORS = ["chat not found", "bot was blocked", "bot was kicked", "user is deactivated"]
+
 # --- UNICODE SMALL CAPS STYLE ---
 class Style:
     HEADER = "📢 ʙʀᴏᴀᴅᴄᴀꜱᴛ ꜱʏꜱᴛᴇᴍ"
@@ -16,35 +36,189 @@ class Style:
     TOTAL = "👥 ᴛᴏᴛᴀʟ ᴛᴀʀɢᴇᴛꜱ :"
     LINE = "──────────────────"
 
-async def send_message(context, message, chat_id):
+async def send_message(bot, from_chat_id, message_id, chat_id):
     try:
-        await context.bot.forward_message(
-            chat_id=chat_id,
-            from_chat_id=message.chat_id,
-            message_id=message.message_id
+        await outbox.send(
+            chat_id,
+            lambda: bot.forward_message(
+                chat_id=chat_id,
+                from_chat_id=from_chat_id,
+                message_id=message_id
+            ),
+            Priority.BROADCAST
         )
         return {"status": "success", "chat_id": chat_id}
     except Exception as e:
         error_text = str(e).lower()
 
-        if "retry after" in error_text or "flood" in error_text:
-            await asyncio.sleep(5) # Flood ke liye thoda zyada wait behtar hai
-            try:
-                await context.bot.forward_message(
-                    chat_id=chat_id,
-                    from_chat_id=message.chat_id,
-                    message_id=message.message_id
-                )
-                return {"status": "success", "chat_id": chat_id}
-            except:
-                pass
-
-        if any(x in error_text for x in ["chat not found", "bot was blocked", "user is deactivated", "forbidden", "chat_write_forbidden"]):
+        if any(x in error_text for x in INVALID_ERRORS):
             # Invalid chats ko list se hatane ka status
             return {"status": "invalid", "chat_id": chat_id}
 
         return {"status": "failed", "chat_id": chat_id}
 
+# --- TARGETS ---
+# Groups first, then users, each in key order so a checkpoint is one key.
+# Every batch is a fresh keyed query, so no cursor has to outlive the
+# minutes a paced batch takes to send.
+PHASES = ("groups", "users")
+PHASE_SOURCES = {
+    "groups": (top_global_groups_collection, "group_id"),
+    "users": (user_collection, "id"),
+}
+
+async def ensure_indexes():
+    try:
+        await top_global_groups_collection.create_index([("group_id", 1)])
+    except Exception as e:
+        LOGGER.error(f"Broadcast index err: {e}")
+
+async def stream_targets(phase, after, limit):
+    col, key = PHASE_SOURCES[phase]
+    query = {key: {"$ne": None} if after is None else {"$gt": after}, BLOCKED_FIELD: {"$ne": True}}
+    last = None
+    async for doc in col.find(query, {"_id": 0, key: 1}).sort(key, 1).limit(limit):
+        # Older group counters may hold several documents per group.
+        if doc[key] != last:
+            last = doc[key]
+            yield last
+
+async def count_targets():
+    groups = await top_global_groups_collection.aggregate([
+        {"$match": {"group_id": {"$ne": None}, BLOCKED_FIELD: {"$ne": True}}},
+        {"$group": {"_id": "$group_id"}}, {"$count": "n"}
+    ]).to_list(1)
+    users = await user_collection.count_documents({"id": {"$ne": None}, BLOCKED_FIELD: {"$ne": True}})
+    return (groups[0]["n"] if groups else 0) + users
+
+async def prune_invalid(invalid):
+    groups = [c for c in invalid if c < 0]
+    users = [c for c in invalid if c > 0]
+    if groups:
+        await top_global_groups_collection.update_many({"group_id": {"$in": groups}}, {"$set": {BLOCKED_FIELD: True}})
+    if users:
+        await user_collection.update_many({"id": {"$in": users}}, {"$set": {BLOCKED_FIELD: True}})
+
+# --- JOB RUNNER ---
+def progress_text(job, done=False):
+    handled = job["sent"] + job["failed"] + job["invalid"]
+    return (
+        f"<b>{Style.STATUS}</b>\n"
+        f"{Style.LINE}\n"
+        f"<b>{Style.SENT}</b> <code>{job['sent']}</code>\n"
+        f"<b>{Style.FAILED}</b> <code>{job['failed']}</code>\n"
+        f"<b>{Style.INVALID}</b> <code>{job['invalid']}</code>\n"
+        f"{Style.LINE}\n"
+        f"<b>{Style.TOTAL}</b> <code>{handled}/{job['total']}</code>\n"
+        + ("✨ ʙʀᴏᴀᴅᴄᴀꜱᴛ ᴄᴏᴍᴘʟᴇᴛᴇᴅ!" if done else "🚀 ʙʀᴏᴀᴅᴄᴀꜱᴛɪɴɢ...")
+    )
+
+async def report(bot, job, done=False):
+    try:
+        await outbox.send(
+            job["status_chat_id"],
+            lambda: bot.edit_message_text(
+                progress_text(job, done),
+                chat_id=job["status_chat_id"],
+                message_id=job["status_message_id"],
+                parse_mode='HTML'
+            ),
+            Priority.REPLY if done else Priority.LOG
+        )
+    except Exception as e:
+        LOGGER.warning(f"Broadcast progress edit failed: {e}")
+
+async def run_batch(bot, job, chat_ids):
+    queue = asyncio.Queue()
+    for chat_id in chat_ids:
+        queue.put_nowait(chat_id)
+    results = []
+
+    async def worker():
+        while not queue.empty():
+            chat_id = queue.get_nowait()
+            results.append(await send_message(bot, job["from_chat_id"], job["message_id"], chat_id))
+
+    await asyncio.gather(*(worker() for _ in range(min(BROADCAST_WORKERS, len(chat_ids)))))
+    return results
+
+async def run_job(bot, job):
+    last_report = time.monotonic()
+    phases = PHASES[PHASES.index(job["phase"]):]
+
+    for phase in phases:
+        after = job["after"] if phase == job["phase"] else None
+        while True:
+            batch = [t async for t in stream_targets(phase, after, BROADCAST_BATCH)]
+            if not batch:
+                break
+
+            results = await run_batch(bot, job, batch)
+            invalid = [r["chat_id"] for r in results if r["status"] == "invalid"]
+            if invalid:
+                await prune_invalid(invalid)
+
+            for status, field in (("success", "sent"), ("failed", "failed"), ("invalid", "invalid")):
+                job[field] += sum(1 for r in results if r["status"] == status)
+            job["phase"], job["after"] = phase, batch[-1]
+            after = batch[-1]
+
+            # The checkpoint only lands while the job is still running and
+            # still ours; it also renews the lease.
+            if not await lease.renew(broadcast_jobs, {"_id": job["_id"], "status": "running"}, JOB_LEASE, {
+                "phase": job["phase"], "after": job["after"],
+                "sent": job["sent"], "failed": job["failed"], "invalid": job["invalid"]
+            }):
+                await report(bot, job)
+                return
+
+            if time.monotonic() - last_report >= PROGRESS_EVERY:
+                last_report = time.monotonic()
+                await report(bot, job)
+
+    await lease.release(
+        broadcast_jobs, {"_id": job["_id"]},
+        {"status": "done", "finished_at": datetime.now(timezone.utc)}
+    )
+    await report(bot, job, done=True)
+
+_running = set()
+
+def start_job(bot, job):
+    """Run a job this worker holds the lease on."""
+    if job["_id"] in _running:
+        return False
+    _running.add(job["_id"])
+
+    async def runner():
+        try:
+            await run_job(bot, job)
+        except Exception as e:
+            LOGGER.error(f"Broadcast {job['_id']} stopped: {e}")
+        finally:
+            _running.discard(job["_id"])
+
+    asyncio.create_task(runner())
+    return True
+
+async def resume_broadcasts(bot):
+    """Pick up running broadcasts whose worker stopped checkpointing, from
+    their last checkpoint. Each job is claimed through its lease, so only
+    one worker ever runs it."""
+    await ensure_indexes()
+    while True:
+        try:
+            async for pending in broadcast_jobs.find({"status": "running"}, {"_id": 1}):
+                if pending["_id"] in _running:
+                    continue
+                job = await lease.claim(broadcast_jobs, {"_id": pending["_id"], "status": "running"}, JOB_LEASE)
+                if job and start_job(bot, job):
+                    LOGGER.info(f"Resuming broadcast {job['_id']} at {job['phase']}:{job['after']}")
+        except Exception as e:
+            LOGGER.error(f"Broadcast resume err: {e}")
+        await asyncio.sleep(JOB_LEASE)
+
+# --- COMMANDS ---
 async def broadcast(update: Update, context: CallbackContext) -> None:
     if update.effective_user.id != OWNER_ID:
         await update.message.reply_text("<b>❌ ɴᴏᴛ ᴀᴜᴛʜᴏʀɪᴢᴇᴅ.</b>", parse_mode='HTML')
@@ -55,36 +229,43 @@ async def broadcast(update: Update, context: CallbackContext) -> None:
         await update.message.reply_text("<b>❌ ʀᴇᴘʟʏ ᴛᴏ ᴀ ᴍᴇꜱꜱᴀɢᴇ ᴛᴏ ʙʀᴏᴀᴅᴄᴀꜱᴛ.</b>", parse_mode='HTML')
         return
 
-    # Fetch targets
-    all_chats = await top_global_groups_collection.distinct("group_id")
-    all_users = await user_collection.distinct("id")
-    targets = list(set(all_chats + all_users))
+    total = await count_targets()
 
     start_msg = await update.message.reply_text(
-        f"<b>{Style.HEADER}</b>\n{Style.LINE}\n🚀 ʙʀᴏᴀᴅᴄᴀꜱᴛɪɴɢ ᴛᴏ {len(targets)} ᴛᴀʀɢᴇᴛꜱ...",
+        f"<b>{Style.HEADER}</b>\n{Style.LINE}\n🚀 ʙʀᴏᴀᴅᴄᴀꜱᴛɪɴɢ ᴛᴏ {total} ᴛᴀʀɢᴇᴛꜱ...",
         parse_mode='HTML'
     )
 
-    tasks = [send_message(context, message_to_broadcast, chat_id) for chat_id in targets]
-    results = await asyncio.gather(*tasks)
+    job = {
+        "from_chat_id": message_to_broadcast.chat_id,
+        "message_id": message_to_broadcast.message_id,
+        "status_chat_id": start_msg.chat_id,
+        "status_message_id": start_msg.message_id,
+        "phase": PHASES[0],
+        "after": None,
+        "total": total,
+        "sent": 0,
+        "failed": 0,
+        "invalid": 0,
+        "status": "running",
+        "started_at": datetime.now(timezone.utc),
+        **lease.lease_fields(JOB_LEASE)
+    }
+    res = await broadcast_jobs.insert_one(job)
+    job["_id"] = res.inserted_id
+    start_job(context.bot, job)
 
-    success = sum(1 for r in results if r["status"] == "success")
-    failed = sum(1 for r in results if r["status"] == "failed")
-    invalid = sum(1 for r in results if r["status"] == "invalid")
+async def cancel_broadcast(update: Update, context: CallbackContext) -> None:
+    if update.effective_user.id != OWNER_ID:
+        await update.message.reply_text("<b>❌ ɴᴏᴛ ᴀᴜᴛʜᴏʀɪᴢᴇᴅ.</b>", parse_mode='HTML')
+        return
 
-    # Final result with Small Caps font
-    final_text = (
-        f"<b>{Style.STATUS}</b>\n"
-        f"{Style.LINE}\n"
-        f"<b>{Style.SENT}</b> <code>{success}</code>\n"
-        f"<b>{Style.FAILED}</b> <code>{failed}</code>\n"
-        f"<b>{Style.INVALID}</b> <code>{invalid}</code>\n"
-        f"{Style.LINE}\n"
-        f"<b>{Style.TOTAL}</b> <code>{len(targets)}</code>\n"
-        f"✨ ʙʀᴏᴀᴅᴄᴀꜱᴛ ᴄᴏᴍᴘʟᴇᴛᴇᴅ!"
+    res = await broadcast_jobs.update_many({"status": "running"}, {"$set": {"status": "cancelled"}})
+    await update.message.reply_text(
+        f"<b>{Style.HEADER}</b>\n{Style.LINE}\n🛑 ᴄᴀɴᴄᴇʟʟᴇᴅ {res.modified_count} ʙʀᴏᴀᴅᴄᴀꜱᴛ(ꜱ)",
+        parse_mode='HTML'
     )
 
-    await start_msg.edit_text(final_text, parse_mode='HTML')
-
 # Registration
 application.add_handler(CommandHandler("broadcast", broadcast, block=False))
+application.add_handler(CommandHandler("cancelbroadcast", cancel_broadcast, block=False))
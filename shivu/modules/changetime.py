@@ -1,9 +1,16 @@
+import asyncio
+import time
+from typing import Dict, Optional, Set, Tuple
 from pymongo import ReturnDocument
 from telegram import Update
 from telegram.ext import CommandHandler, CallbackContext
 from shivu import application, OWNER_ID, user_totals_collection, LOGGER, collection
+from shivu.modules.database.spawn_state import spawn_state
 import random
 
+DEFAULT_FREQUENCY = 40
+FREQUENCY_TTL = 600
+
 # Import send_image at module level to avoid repeated imports
 try:
     from shivu.__main__ import send_image
@@ -17,6 +24,50 @@ except ImportError:
         LOGGER.warning("⚠️ Could not import send_image - /spawn command may not work")
 
 
+class FrequencyTable:
+    """Per-chat spawn frequency cache for the message counter.
+
+    ``get`` never awaits: a missing or stale entry is refreshed in the
+    background and the caller uses the default (or the stale value) until
+    it lands. /changetime and /ctime update the entry directly.
+    """
+
+    def __init__(self, ttl: float = FREQUENCY_TTL):
+        self._ttl = ttl
+        self._freq: Dict[int, Tuple[Optional[int], float]] = {}
+        self._loading: Set[int] = set()
+
+    def get(self, chat_id: int) -> Optional[int]:
+        entry = self._freq.get(chat_id)
+        if entry is None or time.monotonic() - entry[1] >= self._ttl:
+            if chat_id not in self._loading:
+                self._loading.add(chat_id)
+                asyncio.create_task(self._load(chat_id))
+        return entry[0] if entry else None
+
+    async def _load(self, chat_id: int) -> None:
+        try:
+            doc = await user_totals_collection.find_one(
+                {'chat_id': str(chat_id)},
+                {'message_frequency': 1}
+            )
+            freq = doc.get('message_frequency') if doc else None
+            self._freq[chat_id] = (freq, time.monotonic())
+        except Exception as e:
+            LOGGER.error(f"Error loading frequency for {chat_id}: {e}")
+        finally:
+            self._loading.discard(chat_id)
+
+    def set(self, chat_id: int, freq: Optional[int]) -> None:
+        self._freq[chat_id] = (freq, time.monotonic())
+
+    def forget(self, chat_id: int) -> None:
+        self._freq.pop(chat_id, None)
+
+
+frequency_table = FrequencyTable()
+
+
 async def change_time(update: Update, context: CallbackContext) -> None:
     user = update.effective_user
     chat = update.effective_chat
@@ -67,6 +118,7 @@ async def change_time(update: Update, context: CallbackContext) -> None:
             upsert=True,
             return_document=ReturnDocument.AFTER
         )
+        frequency_table.set(chat.id, new_frequency)
 
         await update.message.reply_text(
             f'✅ Successfully changed character spawn frequency to every {new_frequency} messages.\n\n'
@@ -123,6 +175,7 @@ async def change_time_sudo(update: Update, context: CallbackContext) -> None:
             upsert=True,
             return_document=ReturnDocument.AFTER
         )
+        frequency_table.set(update.effective_chat.id, new_frequency)
 
         await update.message.reply_text(
             f'✅ Successfully changed character spawn frequency to every {new_frequency} messages.\n\n'
@@ -143,14 +196,14 @@ async def check_frequency(update: Update, context: CallbackContext) -> None:
         chat_frequency = await user_totals_collection.find_one({'chat_id': chat_id})
 
         if chat_frequency:
-            freq = chat_frequency.get('message_frequency', 70)
+            freq = chat_frequency.get('message_frequency', DEFAULT_FREQUENCY)
             await update.message.reply_text(
                 f'📊 Current spawn frequency: Every {freq} messages\n\n'
                 f'Use /changetime NUMBER to change it (admin only)'
             )
         else:
             await update.message.reply_text(
-                f'📊 Current spawn frequency: Every 70 messages (default)\n\n'
+                f'📊 Current spawn frequency: Every {DEFAULT_FREQUENCY} messages (default)\n\n'
                 f'Use /changetime NUMBER to set a custom frequency (admin only)'
             )
 
@@ -207,18 +260,8 @@ async def reset_message_count(update: Update, context: CallbackContext) -> None:
             await update.message.reply_text('This command can only be used in groups.')
             return
 
-        # Import message_counts from main
-        try:
-            from shivu.__main__ import message_counts
-        except ImportError:
-            try:
-                from shivu.main import message_counts
-            except ImportError:
-                await update.message.reply_text('❌ Could not access message counter.')
-                return
-
-        chat_id = str(update.effective_chat.id)
-        message_counts[chat_id] = 0
+        chat_id = update.effective_chat.id
+        await spawn_state.reset_messages(chat_id)
         
         await update.message.reply_text('✅ Message counter reset to 0!')
         LOGGER.info(f"[RESET] Message counter reset for chat {chat_id} by user {user.id}")
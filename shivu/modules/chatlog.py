@@ -10,6 +10,7 @@ from pyrogram.errors import (
     UserIsBlocked, ChatWriteForbidden
 )
 from shivu import user_collection, shivuu as app, LEAVELOGS, JOINLOGS
+from shivu.modules.database.outbox import outbox, Priority
 
 
 class AdvancedBotAnalytics:
@@ -157,9 +158,14 @@ async def send_log_direct(chat_id: int, text: str, timeout: int = 5) -> bool:
 async def attempt_send(chat_id: int, text: str, timeout: int) -> bool:
     for attempt in range(2):
         try:
-            result = await asyncio.wait_for(
-                app.send_message(chat_id, text, disable_web_page_preview=True),
-                timeout=timeout
+            # The timeout covers the send itself, not the wait in the outbox queue.
+            result = await outbox.send(
+                chat_id,
+                lambda: asyncio.wait_for(
+                    app.send_message(chat_id, text, disable_web_page_preview=True),
+                    timeout=timeout
+                ),
+                Priority.LOG
             )
             print(f"✅ Log sent successfully to {chat_id}")
             return True
@@ -8,10 +8,11 @@ from telegram.ext import CommandHandler, CallbackQueryHandler, ContextTypes
 from telegram.constants import ParseMode
 from telegram.error import BadRequest, TelegramError
 
-from shivu import application, collection, user_collection
+from shivu import application, collection
+from shivu.modules.database.ownership import owner_stats, top_owners
+from shivu.modules.database.search_index import search_index
 
 character_cache = TTLCache(maxsize=2000, ttl=600)
-anime_cache = TTLCache(maxsize=1000, ttl=900)
 user_cache = TTLCache(maxsize=500, ttl=300)
 
 USERS_PER_PAGE = 10
@@ -100,31 +101,11 @@ class CharacterRepository:
     
     @staticmethod
     async def find_by_name(name: str) -> List[Dict]:
-        cache_key = f"name_{name.lower()}"
-        if cache_key in character_cache:
-            return character_cache[cache_key]
-        
-        results = await collection.find({
-            'name': {'$regex': name, '$options': 'i'}
-        }).to_list(length=None)
-        
-        if results:
-            character_cache[cache_key] = results
-        return results
+        return await search_index.search(name, ('name',))
     
     @staticmethod
     async def find_by_anime(anime: str) -> List[Dict]:
-        cache_key = f"anime_{anime.lower()}"
-        if cache_key in anime_cache:
-            return anime_cache[cache_key]
-        
-        results = await collection.find({
-            'anime': {'$regex': anime, '$options': 'i'}
-        }).to_list(length=None)
-        
-        if results:
-            anime_cache[cache_key] = results
-        return results
+        return await search_index.search(anime, ('anime',))
     
     @staticmethod
     async def get_global_count(character_id: str) -> int:
@@ -133,9 +114,8 @@ class CharacterRepository:
             return user_cache[cache_key]
         
         try:
-            count = await user_collection.count_documents({
-                'characters.id': character_id
-            })
+            stats = await owner_stats([character_id])
+            count = stats.get(character_id, {}).get('owners', 0)
             user_cache[cache_key] = count
             return count
         except:
@@ -150,19 +130,15 @@ class UserRepository:
             return user_cache[cache_key]
         
         try:
-            cursor = user_collection.find(
-                {'characters.id': character_id},
-                {'_id': 0, 'id': 1, 'first_name': 1, 'username': 1, 'characters': 1}
-            )
-            users = await cursor.to_list(length=None)
-            
-            owners = []
-            for user_data in users:
-                owner = UserOwnership.from_dict(user_data, character_id)
-                if owner.count > 0:
-                    owners.append(owner)
-            
-            owners.sort(key=lambda x: x.count, reverse=True)
+            owners = [
+                UserOwnership(
+                    id=o.get('id'),
+                    first_name=o.get('first_name', 'Unknown'),
+                    username=o.get('username'),
+                    count=o.get('count', 0)
+                )
+                for o in await top_owners(character_id, limit=None)
+            ]
             user_cache[cache_key] = owners
             return owners
         except:
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ReturnDocument
+
+from shivu import db, collection, LOGGER
+
+catalog_meta_collection = db['catalog_meta']
+
+CATALOG_KEY = 'characters'
+VERSION_CHECK_INTERVAL = 30
+
+
+class CharacterCatalog:
+    """In-memory copy of the character collection shared by the whole process.
+
+    The catalog is loaded once and then kept fresh through a version stamp in
+    ``catalog_meta``: every writer bumps the stamp via :meth:`mark_changed`, and
+    readers compare it at most once every ``check_interval`` seconds. Documents
+    handed out are shared and must be treated as read-only.
+    """
+
+    def __init__(self, col, meta_col, check_interval: float = VERSION_CHECK_INTERVAL):
+        self._col = col
+        self._meta = meta_col
+        self._check_interval = check_interval
+        self._by_id: Dict[str, dict] = {}
+        # Dense, append-only ordinals; never reused so they survive reloads.
+        self._ordinals: Dict[str, int] = {}
+        self._chars: List[dict] = []
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._loaded = False
+        self._attempts = 0
+        self._lock = asyncio.Lock()
+        # Local revision, bumped on every change so derived caches can key on it.
+        self.revision = 0
+
+    async def _remote_version(self) -> int:
+        doc = await self._meta.find_one({'_id': CATALOG_KEY})
+        return doc.get('version', 0) if doc else 0
+
+    def _rebuild(self) -> None:
+        self._chars = list(self._by_id.values())
+        self.revision += 1
+
+    async def load(self) -> None:
+        # Callers queued behind a load attempt that ended meanwhile reuse its
+        # outcome instead of reading the whole collection again.
+        attempt = self._attempts
+        async with self._lock:
+            if self._attempts != attempt:
+                return
+            self._attempts += 1
+            try:
+                version = await self._remote_version()
+                docs = await self._col.find({}).to_list(length=None)
+            except Exception as e:
+                LOGGER.error(f"Catalog load err: {e}")
+                return
+
+            self._by_id = {str(d.get('id')): d for d in docs}
+            self._version = version
+            self._checked_at = time.monotonic()
+            self._loaded = True
+            self._rebuild()
+            LOGGER.info(f"Catalog loaded: {len(self._chars)} characters (v{version})")
+
+    async def ensure_fresh(self) -> None:
+        if not self._loaded:
+            await self.load()
+            return
+
+        now = time.monotonic()
+        if now - self._checked_at < self._check_interval:
+            return
+        self._checked_at = now
+
+        try:
+            version = await self._remote_version()
+        except Exception as e:
+            LOGGER.error(f"Catalog version check err: {e}")
+            return
+
+        if version != self._version:
+            await self.load()
+
+    def invalidate(self) -> None:
+        """Force the next read to reload the whole catalog."""
+        self._loaded = False
+
+    async def all(self) -> List[dict]:
+        await self.ensure_fresh()
+        return self._chars
+
+    async def get(self, char_id) -> Optional[dict]:
+        await self.ensure_fresh()
+        return self._by_id.get(str(char_id))
+
+    async def by_rarity(self, rarities: Iterable) -> List[dict]:
+        await self.ensure_fresh()
+        wanted = set(rarities)
+        return [c for c in self._chars if c.get('rarity') in wanted]
+
+    def ordinal(self, char_id) -> int:
+        key = str(char_id)
+        o = self._ordinals.get(key)
+        if o is None:
+            o = self._ordinals[key] = len(self._ordinals)
+        return o
+
+    async def mark_changed(self, char_id) -> None:
+        """Re-read one character after a write and publish a new catalog version."""
+        char_id = str(char_id)
+        try:
+            doc = await self._col.find_one({'id': char_id})
+            stamp = await self._meta.find_one_and_update(
+                {'_id': CATALOG_KEY},
+                {'$inc': {'version': 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            LOGGER.error(f"Catalog update err for {char_id}: {e}")
+            self.invalidate()
+            return
+
+        if not self._loaded:
+            return
+
+        if doc:
+            self._by_id[char_id] = doc
+        else:
+            self._by_id.pop(char_id, None)
+        self._rebuild()
+
+        # Only adopt the new stamp if nobody else wrote in between, otherwise
+        # the next freshness check reloads and picks up their change too.
+        if self._version is not None and stamp['version'] == self._version + 1:
+            self._version = stamp['version']
+
+
+catalog = CharacterCatalog(collection, catalog_meta_collection)
@@ -0,0 +1,118 @@
+import asyncio
+from typing import Dict, Iterable, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, ServerSelectionTimeoutError, WaitQueueTimeoutError
+
+from shivu import LOGGER
+
+FLUSH_INTERVAL = 2.0
+MAX_PENDING_OPS = 500
+# Raised before a write reaches any server, so the batch is safe to retry.
+UNSENT_ERRORS = (ServerSelectionTimeoutError, WaitQueueTimeoutError)
+
+
+class CounterBuffer:
+    """Write-behind aggregator for upserted ``$inc`` counters.
+
+    Increments for the same (collection, filter) pair are merged in memory
+    and written as one unordered ``bulk_write`` per collection every
+    ``interval`` seconds, or sooner once ``max_ops`` increments are pending.
+    Writes the server reports as failed are merged back and retried on the
+    next cycle; the rest of a partially failed batch is not re-applied.
+    Other errors only re-queue the batch when it never left the client: a
+    timeout on a sent batch may have been applied, and losing those
+    increments beats counting them twice.
+    """
+
+    def __init__(self, interval: float = FLUSH_INTERVAL, max_ops: int = MAX_PENDING_OPS):
+        self._interval = interval
+        self._max_ops = max_ops
+        self._pending: Dict[Tuple, dict] = {}
+        self._ops = 0
+        self._task: Optional[asyncio.Task] = None
+        self._early: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def incr(self, col, flt: dict, fields: Optional[dict] = None, inc: Optional[dict] = None,
+             unset: Iterable[str] = ()) -> None:
+        key = (col.name, tuple(sorted(flt.items())))
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = {'col': col, 'filter': flt, 'set': {}, 'inc': {}, 'unset': set()}
+
+        if fields:
+            entry['set'].update(fields)
+        entry['unset'].update(unset)
+        for k, v in (inc or {'count': 1}).items():
+            entry['inc'][k] = entry['inc'].get(k, 0) + v
+
+        self._ops += 1
+        if self._ops >= self._max_ops and (self._early is None or self._early.done()):
+            self._early = asyncio.create_task(self.flush())
+
+    def _merge_back(self, batch: Dict[Tuple, dict]) -> None:
+        for key, entry in batch.items():
+            cur = self._pending.get(key)
+            if cur is None:
+                self._pending[key] = entry
+                continue
+            cur['set'] = {**entry['set'], **cur['set']}
+            cur['unset'] |= entry['unset']
+            for k, v in entry['inc'].items():
+                cur['inc'][k] = cur['inc'].get(k, 0) + v
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            batch, self._pending, self._ops = self._pending, {}, 0
+
+            by_col: Dict[str, list] = {}
+            for key, entry in batch.items():
+                update = {'$inc': entry['inc']}
+                if entry['set']:
+                    update['$set'] = entry['set']
+                if entry['unset']:
+                    update['$unset'] = dict.fromkeys(entry['unset'], '')
+                by_col.setdefault(key[0], []).append((key, entry, UpdateOne(entry['filter'], update, upsert=True)))
+
+            for items in by_col.values():
+                col = items[0][1]['col']
+                try:
+                    await col.bulk_write([op for _, _, op in items], ordered=False)
+                except BulkWriteError as e:
+                    failed = {err['index'] for err in e.details.get('writeErrors', [])}
+                    LOGGER.error(f"Counter flush err on {col.name}: {len(failed)} of {len(items)} writes failed")
+                    self._merge_back({key: entry for i, (key, entry, _) in enumerate(items) if i in failed})
+                except UNSENT_ERRORS as e:
+                    LOGGER.error(f"Counter flush err on {col.name}, retrying: {e}")
+                    self._merge_back({key: entry for key, entry, _ in items})
+                except Exception as e:
+                    LOGGER.error(f"Counter flush err on {col.name}, dropped {len(items)} writes: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                LOGGER.error(f"Counter flush loop err: {e}")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+grab_counters = CounterBuffer()
@@ -0,0 +1,64 @@
+import os
+import time
+from typing import Dict, Hashable
+
+COSMETIC_EDITS = os.getenv('COSMETIC_EDITS', 'adaptive')
+
+EDIT_RATE = 5.0
+EDIT_BURST = 10
+MESSAGE_GAP = 1.0
+
+MODES = ('on', 'adaptive', 'off')
+
+
+class EditBudget:
+    """Process-wide allowance for decorative message edits (spinners etc.).
+
+    In ``adaptive`` mode cosmetic edits draw from a token bucket refilled at
+    ``rate`` per second, and one message is edited at most once per ``gap``
+    seconds, so a burst of commands sheds its animation frames instead of
+    queueing them ahead of real replies. ``off`` drops them all and ``on``
+    lets them all through.
+    """
+
+    def __init__(self, mode: str = COSMETIC_EDITS, rate: float = EDIT_RATE,
+                 burst: int = EDIT_BURST, gap: float = MESSAGE_GAP):
+        self.mode = mode if mode in MODES else 'adaptive'
+        self._rate = rate
+        self._burst = burst
+        self._gap = gap
+        self._tokens = float(burst)
+        self._at = time.monotonic()
+        self._last: Dict[Hashable, float] = {}
+
+    def allow(self, key: Hashable) -> bool:
+        """Whether a cosmetic edit of message ``key`` may go out now."""
+        if self.mode == 'off':
+            return False
+        if self.mode == 'on':
+            return True
+
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._at) * self._rate)
+        self._at = now
+
+        last = self._last.get(key)
+        if last is not None and now - last < self._gap:
+            return False
+        if self._tokens < 1:
+            return False
+
+        self._tokens -= 1
+        self._last[key] = now
+        if len(self._last) > 1000:
+            self._last = {k: t for k, t in self._last.items() if now - t < self._gap}
+        return True
+
+    def set_mode(self, mode: str) -> bool:
+        if mode not in MODES:
+            return False
+        self.mode = mode
+        return True
+
+
+edit_budget = EditBudget()
@@ -0,0 +1,64 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Identifies this process as a lease holder; unique per start.
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+OWNER_FIELD = 'owner'
+LEASE_FIELD = 'lease_until'
+
+
+def lease_fields(ttl: float) -> dict:
+    """``$set`` fields making this worker the holder for ``ttl`` seconds."""
+    return {
+        OWNER_FIELD: WORKER_ID,
+        LEASE_FIELD: datetime.now(timezone.utc) + timedelta(seconds=ttl),
+    }
+
+
+async def claim(collection, query: dict, ttl: float, upsert: bool = False) -> Optional[dict]:
+    """Atomically take the lease on the document matching ``query``.
+
+    Succeeds when the lease is unset, expired or already ours, and returns
+    the claimed document; returns None when another worker holds it. With
+    ``upsert`` a missing document is created already leased.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        return await collection.find_one_and_update(
+            {**query, '$or': [
+                {LEASE_FIELD: None},
+                {LEASE_FIELD: {'$lt': now}},
+                {OWNER_FIELD: WORKER_ID},
+            ]},
+            {'$set': lease_fields(ttl)},
+            upsert=upsert,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # The upsert lost to a live lease on the same _id.
+        return None
+
+
+async def renew(collection, query: dict, ttl: float, fields: Optional[dict] = None) -> bool:
+    """Extend our lease on the document matching ``query``, setting
+    ``fields`` in the same write. False once the lease has been lost."""
+    res = await collection.update_one(
+        {**query, OWNER_FIELD: WORKER_ID},
+        {'$set': {**(fields or {}), **lease_fields(ttl)}},
+    )
+    return bool(res.matched_count)
+
+
+async def release(collection, query: dict, fields: Optional[dict] = None) -> None:
+    """Give up our lease, setting ``fields`` in the same write."""
+    await collection.update_one(
+        {**query, OWNER_FIELD: WORKER_ID},
+        {'$set': {**(fields or {}), LEASE_FIELD: None}},
+    )
@@ -0,0 +1,250 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from datetime import timedelta
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional
+
+from shivu import LOGGER
+
+GLOBAL_PER_SECOND = 30
+GROUP_PER_MINUTE = 20
+PRIVATE_GAP = 1.0
+SEND_WORKERS = 8
+MAX_FLOOD_RETRIES = 3
+# Group window slots only grab confirmations and spawns may use, so other
+# replies cannot starve them.
+SPAWN_RESERVE = 4
+# Droppable jobs beyond this many pending for one chat are refused outright.
+MAX_PENDING_PER_CHAT = 20
+
+
+class Priority(IntEnum):
+    GRAB_REPLY = 0
+    SPAWN = 1
+    REPLY = 2
+    LOG = 3
+    BROADCAST = 4
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds Telegram asked us to back off for, if ``exc`` is a flood error.
+
+    Understands python-telegram-bot's ``RetryAfter`` and Pyrogram's
+    ``FloodWait``.
+    """
+    value = getattr(exc, 'retry_after', None)
+    if value is None and type(exc).__name__ == 'FloodWait':
+        value = getattr(exc, 'value', None)
+    if isinstance(value, timedelta):
+        value = value.total_seconds()
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _Job:
+    __slots__ = ('chat_id', 'call', 'priority', 'future', 'attempts', 'deadline')
+
+    def __init__(self, chat_id: int, call: Callable[[], Awaitable[Any]], priority: int,
+                 future: asyncio.Future, deadline: Optional[float] = None):
+        self.chat_id = chat_id
+        self.call = call
+        self.priority = priority
+        self.future = future
+        self.attempts = 0
+        self.deadline = deadline
+
+    def expired(self, at: float) -> bool:
+        return self.deadline is not None and at > self.deadline
+
+
+class SendScheduler:
+    """Single outbound queue for Telegram sends.
+
+    Callers hand over a zero-argument coroutine factory and await its
+    result. Workers pick jobs by priority class and release them within a
+    global rate (``per_second``) and per-chat limits: ``per_minute`` for
+    groups, one message per ``private_gap`` seconds for private chats. A
+    job blocked by its chat's window is re-queued for when the window
+    opens, so it never stalls other chats. Flood errors pause the chat for
+    the requested time and retry the job.
+
+    The last ``reserve`` slots of a group's window are kept for GRAB_REPLY
+    and SPAWN jobs.
+    Cosmetic sends can pass a ``deadline`` after which they are dropped
+    rather than sent late, and a ``coalesce`` key so that only the newest
+    pending job per chat and key survives; a chat holding ``max_pending``
+    jobs refuses further droppable ones. Dropped jobs resolve to None.
+    """
+
+    def __init__(self, per_second: float = GLOBAL_PER_SECOND, per_minute: int = GROUP_PER_MINUTE,
+                 private_gap: float = PRIVATE_GAP, workers: int = SEND_WORKERS,
+                 max_retries: int = MAX_FLOOD_RETRIES, reserve: int = SPAWN_RESERVE,
+                 max_pending: int = MAX_PENDING_PER_CHAT):
+        self._rate = per_second
+        self._per_minute = per_minute
+        self._private_gap = private_gap
+        self._n_workers = workers
+        self._max_retries = max_retries
+        self._reserve = min(reserve, per_minute - 1)
+        self._max_pending = max_pending
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._seq = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._tokens = float(per_second)
+        self._at = time.monotonic()
+        self._bucket_lock: Optional[asyncio.Lock] = None
+        self._sent: Dict[int, Deque[float]] = {}
+        self._paused: Dict[int, float] = {}
+        self._pending: Dict[int, int] = {}
+        self._latest: Dict[tuple, _Job] = {}
+
+    def _window(self, chat_id: int, priority: int):
+        if chat_id > 0:
+            return 1, self._private_gap
+        if priority > Priority.SPAWN:
+            return self._per_minute - self._reserve, 60.0
+        return self._per_minute, 60.0
+
+    def _chat_wait(self, chat_id: int, priority: int, now: float) -> float:
+        wait = self._paused.get(chat_id, 0) - now
+        limit, span = self._window(chat_id, priority)
+        window = self._sent.get(chat_id)
+        if window:
+            while window and now - window[0] >= span:
+                window.popleft()
+            if len(window) >= limit:
+                wait = max(wait, window[0] + span - now)
+        return max(wait, 0.0)
+
+    def _record(self, chat_id: int, now: float) -> None:
+        self._sent.setdefault(chat_id, deque()).append(now)
+        if len(self._sent) > 10000:
+            self._sent = {c: w for c, w in self._sent.items() if w and now - w[-1] < 60}
+            self._paused = {c: t for c, t in self._paused.items() if t > now}
+
+    async def _take_token(self) -> None:
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._rate, self._tokens + (now - self._at) * self._rate)
+                self._at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    @staticmethod
+    def _drop(job: _Job) -> None:
+        if not job.future.done():
+            job.future.set_result(None)
+
+    def _put(self, job: _Job, delay: float = 0) -> None:
+        if delay > 0:
+            if job.expired(time.monotonic() + delay):
+                self._drop(job)
+                return
+            asyncio.get_running_loop().call_later(delay, self._put, job)
+            return
+        self._queue.put_nowait((job.priority, next(self._seq), job))
+
+    def _settled(self, chat_id: int) -> None:
+        n = self._pending.get(chat_id, 0) - 1
+        if n > 0:
+            self._pending[chat_id] = n
+        else:
+            self._pending.pop(chat_id, None)
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            if job.future.done():
+                continue
+            if job.expired(time.monotonic()):
+                self._drop(job)
+                continue
+
+            wait = self._chat_wait(job.chat_id, job.priority, time.monotonic())
+            if wait > 0:
+                self._put(job, wait)
+                continue
+            self._record(job.chat_id, time.monotonic())
+            await self._take_token()
+
+            try:
+                result = await job.call()
+            except Exception as e:
+                delay = retry_after(e)
+                if delay is not None and job.attempts < self._max_retries:
+                    job.attempts += 1
+                    self._paused[job.chat_id] = time.monotonic() + delay
+                    LOGGER.warning(f"Flood wait {delay:.0f}s for {job.chat_id}, retry {job.attempts}")
+                    self._put(job, delay)
+                elif not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                if not job.future.done():
+                    job.future.set_result(result)
+
+    def start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+            self._bucket_lock = asyncio.Lock()
+        self._workers = [t for t in self._workers if not t.done()]
+        while len(self._workers) < self._n_workers:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self) -> None:
+        for t in self._workers:
+            t.cancel()
+        for t in self._workers:
+            try:
+                await t
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+
+    async def send(self, chat_id: int, call: Callable[[], Awaitable[Any]],
+                   priority: int = Priority.LOG, deadline: Optional[float] = None,
+                   coalesce: Optional[Hashable] = None) -> Any:
+        """Run ``call()`` once ``chat_id``'s and the global budget allow it.
+
+        Returns what ``call`` returns, or None if the job was dropped: it
+        could not start within ``deadline`` seconds, a newer job with the
+        same ``coalesce`` key replaced it, or the chat's backlog was full.
+        Non-flood errors (and floods past the retry limit) are raised to the
+        caller.
+        """
+        self.start()
+        droppable = deadline is not None or coalesce is not None
+        if droppable and self._pending.get(chat_id, 0) >= self._max_pending:
+            return None
+
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(chat_id, call, priority, future,
+                   time.monotonic() + deadline if deadline is not None else None)
+        self._pending[chat_id] = self._pending.get(chat_id, 0) + 1
+        future.add_done_callback(lambda _: self._settled(chat_id))
+
+        if coalesce is not None:
+            key = (chat_id, coalesce)
+            previous = self._latest.get(key)
+            if previous is not None:
+                self._drop(previous)
+            self._latest[key] = job
+            future.add_done_callback(
+                lambda _: self._latest.pop(key, None) if self._latest.get(key) is job else None
+            )
+
+        self._put(job)
+        return await future
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+
+outbox = SendScheduler()
@@ -0,0 +1,764 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DeleteMany, ReturnDocument, UpdateOne
+
+from shivu import db, user_collection, LOGGER
+from shivu.modules.database import lease
+from shivu.modules.database.catalog import catalog
+from shivu.modules.database.users import users
+from shivu.modules.database.spawn_sampler import rarity_emoji
+
+user_characters_collection = db['user_characters']
+# Per-character counters: {_id: char_id, owner_count, copies, total_grabbed,
+# last_grabbed, updated_at}, moved alongside every row write below.
+character_stats_collection = db['character_stats']
+migrations_collection = db['migrations']
+
+# Set on a user document once its ownership rows have been backfilled from
+# the embedded ``characters`` array; only then are reads served from the store.
+MIGRATED_FIELD = 'ownership_v'
+OWNERSHIP_VERSION = 1
+MIGRATION_KEY = 'ownership'
+STATS_KEY = 'character_stats'
+MIGRATION_BATCH = 200
+MIGRATION_RETRIES = 3
+# How often to look again for a finished migration while it is still running.
+STORE_READY_RECHECK = 60
+# Counters drift when a migration races a grab; they are recomputed this often.
+STATS_REBUILD_INTERVAL = 3600
+# migrations document whose lease picks the one worker running the rebuild.
+STATS_REBUILD_LEASE = 'character_stats_rebuild'
+
+# Materialized per-user counts kept on the user document:
+# {total, unique, rarity: {emoji: n}, anime: {name: n}}, in copies.
+SUMMARY_FIELD = 'summary'
+# Bumped on every collection write so derived views can tell they are stale.
+REVISION_FIELD = 'collection_rev'
+
+# Projection for user reads that should not drag the embedded array along.
+SLIM_USER = {'characters': 0}
+
+# What the embedded array keeps per copy: 'ids' pushes only {'id': ...},
+# 'full' the whole character as before. Either way there is one element per
+# copy, which the size checks and ``characters.id`` lookups rely on; full
+# characters are served from the rows and the catalog.
+ARRAY_MODE = os.getenv('OWNERSHIP_ARRAY', 'ids')
+
+
+def _drop_one(cid: str) -> list:
+    """Update pipeline removing the first array element with id ``cid``."""
+    return [{'$set': {'characters': {'$let': {
+        'vars': {'i': {'$indexOfArray': [
+            {'$map': {'input': '$characters', 'as': 'c', 'in': '$$c.id'}}, cid
+        ]}},
+        'in': {'$cond': [
+            {'$lt': ['$$i', 0]},
+            '$characters',
+            {'$concatArrays': [
+                {'$slice': ['$characters', '$$i']},
+                {'$slice': ['$characters', {'$add': ['$$i', 1]}, {'$max': [{'$size': '$characters'}, 1]}]}
+            ]}
+        ]}
+    }}}}]
+
+
+def _snapshot(ch: dict) -> dict:
+    return {k: v for k, v in ch.items() if k != '_id'}
+
+
+def array_item(ch: dict) -> dict:
+    """Element pushed to the embedded array for one copy of ``ch``."""
+    if ARRAY_MODE == 'ids':
+        return {'id': ch.get('id')}
+    return ch
+
+
+async def _hydrate(chars: Iterable[dict]) -> List[dict]:
+    """Array elements as full characters, looking id-only ones up in the catalog."""
+    out = []
+    for ch in chars:
+        if isinstance(ch, dict) and ch.keys() == {'id'}:
+            ch = await catalog.get(ch['id']) or ch
+        out.append(ch)
+    return out
+
+
+def _counts(chars: Iterable[dict]) -> Dict[str, dict]:
+    grouped: Dict[str, dict] = {}
+    for ch in chars:
+        if not isinstance(ch, dict) or ch.get('id') is None:
+            continue
+        cid = str(ch['id'])
+        entry = grouped.get(cid)
+        if entry is None:
+            grouped[cid] = {'count': 1, 'char': _snapshot(ch)}
+        else:
+            entry['count'] += 1
+    return grouped
+
+
+def _field_key(value) -> str:
+    # Field names may not contain '.' or start with '$'.
+    key = str(value or 'Unknown').replace('.', '\uff0e')
+    return '\uff04' + key[1:] if key.startswith('$') else key
+
+
+def summary_delta(chars: Iterable[dict], sign: int = 1) -> Dict[str, int]:
+    """``$inc`` document moving the summary by ``chars`` (without unique)
+    and bumping the collection revision."""
+    inc: Dict[str, int] = {REVISION_FIELD: 1}
+    for ch in chars:
+        for path in (
+            f'{SUMMARY_FIELD}.total',
+            f'{SUMMARY_FIELD}.rarity.{_field_key(rarity_emoji(ch))}',
+            f'{SUMMARY_FIELD}.anime.{_field_key(ch.get("anime"))}',
+        ):
+            inc[path] = inc.get(path, 0) + sign
+    return inc
+
+
+def build_summary(chars: Iterable[dict]) -> dict:
+    summary = {'total': 0, 'unique': 0, 'rarity': {}, 'anime': {}}
+    seen = set()
+    for ch in chars:
+        if not isinstance(ch, dict):
+            continue
+        summary['total'] += 1
+        if ch.get('id') is not None:
+            seen.add(str(ch['id']))
+        r = _field_key(rarity_emoji(ch))
+        a = _field_key(ch.get('anime'))
+        summary['rarity'][r] = summary['rarity'].get(r, 0) + 1
+        summary['anime'][a] = summary['anime'].get(a, 0) + 1
+    summary['unique'] = len(seen)
+    return summary
+
+
+def with_summary(update: dict, chars: Iterable[dict], sign: int = 1) -> dict:
+    """Copy of ``update`` with the summary delta for ``chars`` merged in."""
+    update = dict(update)
+    inc = dict(update.get('$inc', {}))
+    for k, v in summary_delta(chars, sign).items():
+        inc[k] = inc.get(k, 0) + v
+    if inc:
+        update['$inc'] = inc
+    return update
+
+
+async def ensure_indexes() -> None:
+    try:
+        await user_characters_collection.create_index(
+            [('user_id', ASCENDING), ('char_id', ASCENDING)], unique=True
+        )
+        await user_characters_collection.create_index([('char_id', ASCENDING), ('count', -1)])
+        await user_collection.create_index([(f'{SUMMARY_FIELD}.total', -1)])
+        await character_stats_collection.create_index([('owner_count', ASCENDING)])
+    except Exception as e:
+        LOGGER.error(f"Ownership index err: {e}")
+
+
+# --- store-side writes -------------------------------------------------------
+
+async def _bump_stats(deltas: Dict[str, tuple], grabbed_at: Optional[datetime] = None) -> None:
+    """Move per-character counters by ``{char_id: (copies, owners)}``.
+
+    With ``grabbed_at`` the copies also count as acquisitions. Counters are
+    best effort next to the row writes; :func:`maintain_character_stats`
+    periodically recomputes them from the rows.
+    """
+    ops = []
+    now = datetime.now(timezone.utc)
+    for cid, (copies, owners) in deltas.items():
+        if not copies and not owners:
+            continue
+        update = {'$inc': {'copies': copies, 'owner_count': owners}, '$set': {'updated_at': now}}
+        if grabbed_at is not None and copies > 0:
+            update['$inc']['total_grabbed'] = copies
+            update['$max'] = {'last_grabbed': grabbed_at}
+        ops.append(UpdateOne({'_id': cid}, update, upsert=True))
+    if not ops:
+        return
+    try:
+        await character_stats_collection.bulk_write(ops, ordered=False)
+    except Exception as e:
+        LOGGER.error(f"Character stats update err: {e}")
+
+
+async def record_added(uid: int, chars: List[dict], unique: bool = True) -> None:
+    """Mirror characters already pushed to ``uid``'s array into the store.
+
+    The caller's user write carries :func:`summary_delta`; only the unique
+    count depends on the store and is bumped here, unless ``unique`` is
+    False because the caller's write already moved it (see :func:`grab_ops`).
+    """
+    now = datetime.now(timezone.utc)
+    grouped = list(_counts(chars).items())
+    ops = [
+        UpdateOne(
+            {'user_id': uid, 'char_id': cid},
+            {
+                '$inc': {'count': entry['count']},
+                '$setOnInsert': {'first_acquired': now, 'char': entry['char']}
+            },
+            upsert=True
+        )
+        for cid, entry in grouped
+    ]
+    if not ops:
+        return
+    res = await user_characters_collection.bulk_write(ops, ordered=False)
+    new_rows = res.upserted_ids or {}
+    if new_rows and unique:
+        await user_collection.update_one(
+            {'id': uid}, {'$inc': {f'{SUMMARY_FIELD}.unique': len(new_rows)}}
+        )
+    await _bump_stats(
+        {cid: (entry['count'], int(i in new_rows)) for i, (cid, entry) in enumerate(grouped)},
+        grabbed_at=now
+    )
+
+
+_background: set = set()
+
+
+async def _record_added_logged(uid: int, chars: List[dict], unique: bool) -> None:
+    try:
+        await record_added(uid, chars, unique)
+    except Exception as e:
+        LOGGER.error(f"Ownership row write err for {uid}: {e}")
+
+
+def record_added_later(uid: int, chars: List[dict], unique: bool = True) -> None:
+    """Run :func:`record_added` in the background, off the caller's reply
+    path. Reads that find the rows behind the array resync them, and
+    :func:`drain` waits for what is still in flight."""
+    task = asyncio.create_task(_record_added_logged(uid, chars, unique))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def drain() -> None:
+    """Wait for background row writes, e.g. before shutting down."""
+    if _background:
+        await asyncio.gather(*list(_background), return_exceptions=True)
+
+
+def grab_ops(uid: int, ch: dict, update: dict) -> List[UpdateOne]:
+    """User-document writes giving ``uid`` one copy of ``ch`` along with
+    ``update``, for an ordered ``bulk_write`` next to the caller's own ops.
+
+    The unique count is moved here from the array (whether ``ch`` was
+    already owned), so the rows can follow with
+    ``record_added(uid, [ch], unique=False)``.
+    """
+    cid = ch.get('id')
+    update = with_summary(update, [ch])
+    update['$push'] = {**update.get('$push', {}), 'characters': array_item(ch)}
+    update['$setOnInsert'] = {**update.get('$setOnInsert', {}), f'{SUMMARY_FIELD}.unique': 1}
+    return [
+        UpdateOne(
+            {'id': uid, 'characters.id': {'$ne': cid}},
+            {'$inc': {f'{SUMMARY_FIELD}.unique': 1}}
+        ),
+        UpdateOne({'id': uid}, update, upsert=True),
+    ]
+
+
+async def record_removed(uid: int, char_id, ch: Optional[dict] = None) -> None:
+    """Mirror the removal of one copy and move the summary with it."""
+    cid = str(char_id)
+    flt = {'user_id': uid, 'char_id': cid}
+    row = await user_characters_collection.find_one_and_update(
+        flt, {'$inc': {'count': -1}}, return_document=ReturnDocument.AFTER
+    )
+    gone = row is not None and row.get('count', 0) <= 0
+    if gone:
+        await user_characters_collection.delete_many({**flt, 'count': {'$lte': 0}})
+    if row is not None:
+        await _bump_stats({cid: (-1, -int(gone))})
+
+    ch = ch or (row or {}).get('char') or await catalog.get(cid) or {'id': cid}
+    inc = summary_delta([ch], -1)
+    if gone:
+        inc[f'{SUMMARY_FIELD}.unique'] = -1
+    await user_collection.update_one({'id': uid}, {'$inc': inc})
+
+
+# --- compatibility layer -----------------------------------------------------
+
+async def add_characters(uid: int, chars: List[dict], update: Optional[dict] = None,
+                         upsert: bool = True) -> bool:
+    """Give ``chars`` to ``uid``, merging any extra operators into the same
+    user write. Returns False if the user write matched nothing."""
+    update = dict(update or {})
+    if chars:
+        update['$push'] = {**update.get('$push', {}), 'characters': {'$each': [array_item(ch) for ch in chars]}}
+        update = with_summary(update, chars)
+    if not update:
+        return False
+
+    res = await users.update(uid, update, upsert=upsert)
+    if not res.matched_count and res.upserted_id is None:
+        return False
+    await record_added(uid, chars)
+    return True
+
+
+async def remove_character(uid: int, char_id, ch: Optional[dict] = None) -> bool:
+    """Take one copy of ``char_id`` from ``uid``. Returns False if not owned.
+
+    ``ch`` is the copy being removed, if the caller has it, so the summary
+    is moved by its rarity and anime.
+    """
+    cid = str(char_id)
+    res = await user_collection.update_one(
+        {'id': uid, 'characters.id': cid},
+        _drop_one(cid)
+    )
+    users.invalidate(uid)
+    if not res.modified_count:
+        return False
+    await record_removed(uid, cid, ch)
+    return True
+
+
+async def clear_characters(uid: int) -> List[dict]:
+    """Take every character from ``uid`` and return what was taken."""
+    user = await user_collection.find_one_and_update(
+        {'id': uid},
+        {'$set': {'characters': [], SUMMARY_FIELD: build_summary([])}, '$inc': {REVISION_FIELD: 1}},
+        projection={'characters': 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    users.invalidate(uid)
+    rows = await user_characters_collection.find(
+        {'user_id': uid, 'count': {'$gt': 0}}, {'_id': 0, 'char_id': 1, 'count': 1}
+    ).to_list(length=None)
+    await user_characters_collection.delete_many({'user_id': uid})
+    await _bump_stats({r['char_id']: (-r['count'], -1) for r in rows})
+    return await _hydrate((user or {}).get('characters') or [])
+
+
+async def _array_size(uid: int) -> Optional[tuple]:
+    """(migrated, array length) for ``uid`` without fetching the array."""
+    user = await user_collection.find_one(
+        {'id': uid},
+        {MIGRATED_FIELD: 1, 'n': {'$size': {'$ifNull': ['$characters', []]}}}
+    )
+    if user is None:
+        return None
+    return user.get(MIGRATED_FIELD) == OWNERSHIP_VERSION, user.get('n', 0)
+
+
+async def collection_version(uid: int) -> Optional[tuple]:
+    """Token that changes whenever ``uid``'s collection does; None if no user.
+
+    The array length is part of it so writers that bypass this module are
+    noticed too.
+    """
+    user = await user_collection.find_one(
+        {'id': uid},
+        {REVISION_FIELD: 1, 'n': {'$size': {'$ifNull': ['$characters', []]}}}
+    )
+    if user is None:
+        return None
+    return user.get(REVISION_FIELD, 0), user.get('n', 0)
+
+
+async def _fetch_rows(uid: int) -> List[dict]:
+    return await user_characters_collection.find(
+        {'user_id': uid}, {'_id': 0}
+    ).sort('first_acquired', ASCENDING).to_list(length=None)
+
+
+async def count_characters(uid: int) -> int:
+    """Total copies ``uid`` owns, counted server-side."""
+    state = await _array_size(uid)
+    return state[1] if state else 0
+
+
+async def _rows(uid: int) -> Optional[List[dict]]:
+    """``uid``'s ownership rows, migrating or resyncing them first if needed.
+
+    Modules that still write only the array leave the row total behind the
+    array length; such users are rebuilt from the array on their next read.
+    """
+    state = await _array_size(uid)
+    if state is None:
+        return None
+    migrated, size = state
+
+    if migrated:
+        rows = await _fetch_rows(uid)
+        if sum(r.get('count', 0) for r in rows) == size:
+            return rows
+
+    await migrate_user(uid)
+    return await _fetch_rows(uid)
+
+
+async def _expand(row: dict) -> dict:
+    return await catalog.get(row['char_id']) or row.get('char') or {'id': row['char_id']}
+
+
+async def get_counts(uid: int) -> Dict[str, int]:
+    """char_id -> copies owned by ``uid``."""
+    rows = await _rows(uid) or []
+    return {r['char_id']: r['count'] for r in rows if r.get('count', 0) > 0}
+
+
+async def get_characters(uid: int) -> Optional[List[dict]]:
+    """``uid``'s characters in the legacy array shape, one dict per copy.
+
+    Returns None when the user does not exist.
+    """
+    rows = await _rows(uid)
+    if rows is None:
+        return None
+
+    chars = []
+    for row in rows:
+        ch = await _expand(row)
+        chars.extend([ch] * max(row.get('count', 0), 0))
+    return chars
+
+
+async def get_character(uid: int, char_id) -> Optional[dict]:
+    """One owned copy of ``char_id``, or None if ``uid`` does not own it."""
+    cid = str(char_id)
+    row = await user_characters_collection.find_one(
+        {'user_id': uid, 'char_id': cid, 'count': {'$gt': 0}}, {'_id': 0}
+    )
+    if row:
+        return await _expand(row)
+
+    # Not in the store yet (unmigrated user or an array-only writer).
+    user = await user_collection.find_one(
+        {'id': uid, 'characters.id': cid}, {'characters.$': 1}
+    )
+    if not user or not user.get('characters'):
+        return None
+    return (await _hydrate(user['characters'][:1]))[0]
+
+
+async def get_summary(uid: int) -> Optional[dict]:
+    """``uid``'s collection summary, rebuilt first if it lags the array.
+
+    Returns None when the user does not exist.
+    """
+    projection = {
+        MIGRATED_FIELD: 1,
+        SUMMARY_FIELD: 1,
+        'n': {'$size': {'$ifNull': ['$characters', []]}}
+    }
+    user = await user_collection.find_one({'id': uid}, projection)
+    if user is None:
+        return None
+
+    summary = user.get(SUMMARY_FIELD) or {}
+    if user.get(MIGRATED_FIELD) != OWNERSHIP_VERSION or summary.get('total', 0) != user.get('n', 0):
+        await migrate_user(uid)
+        user = await user_collection.find_one({'id': uid}, projection) or {}
+        summary = user.get(SUMMARY_FIELD) or {}
+    return {**build_summary([]), **summary}
+
+
+# --- per-character reads -----------------------------------------------------
+
+_ready_at: Dict[str, float] = {}
+
+
+async def _completed(key: str) -> bool:
+    """Whether migration ``key`` has completed; a miss is re-checked at most
+    every ``STORE_READY_RECHECK`` seconds."""
+    at = _ready_at.get(key)
+    if at == float('inf'):
+        return True
+    now = time.monotonic()
+    if at is not None and now - at < STORE_READY_RECHECK:
+        return False
+    state = await migrations_collection.find_one({'_id': key}, {'completed_at': 1})
+    _ready_at[key] = float('inf') if state and state.get('completed_at') else now
+    return _ready_at[key] == float('inf')
+
+
+async def store_ready() -> bool:
+    """True once a full migration has run, so rows cover every owner."""
+    return await _completed(MIGRATION_KEY)
+
+
+async def stats_ready() -> bool:
+    """True once the per-character counters have been built from the rows."""
+    return await _completed(STATS_KEY)
+
+
+async def owner_stats(char_ids: Iterable) -> Dict[str, dict]:
+    """{char_id: {'owners': users, 'total': copies}} for a page of ids, in one query.
+
+    Served from the maintained counters once they are built, which also
+    carry ``total_grabbed`` and ``last_grabbed``.
+    """
+    ids = list({str(c) for c in char_ids if c is not None})
+    if not ids:
+        return {}
+
+    if await stats_ready():
+        docs = await character_stats_collection.find(
+            {'_id': {'$in': ids}, 'owner_count': {'$gt': 0}}
+        ).to_list(length=None)
+        return {
+            d['_id']: {
+                'owners': d['owner_count'],
+                'total': d.get('copies', 0),
+                'total_grabbed': d.get('total_grabbed', 0),
+                'last_grabbed': d.get('last_grabbed')
+            }
+            for d in docs
+        }
+
+    if await store_ready():
+        pipe = [
+            {'$match': {'char_id': {'$in': ids}, 'count': {'$gt': 0}}},
+            {'$group': {'_id': '$char_id', 'owners': {'$sum': 1}, 'total': {'$sum': '$count'}}}
+        ]
+        rows = await user_characters_collection.aggregate(pipe).to_list(length=None)
+    else:
+        pipe = [
+            {'$match': {'characters.id': {'$in': ids}}},
+            {'$project': {'id': 1, 'characters.id': 1}},
+            {'$unwind': '$characters'},
+            {'$match': {'characters.id': {'$in': ids}}},
+            {'$group': {'_id': {'c': '$characters.id', 'u': '$id'}, 'n': {'$sum': 1}}},
+            {'$group': {'_id': '$_id.c', 'owners': {'$sum': 1}, 'total': {'$sum': '$n'}}}
+        ]
+        rows = await user_collection.aggregate(pipe).to_list(length=None)
+    return {r['_id']: {'owners': r['owners'], 'total': r['total']} for r in rows}
+
+
+async def top_owners(char_id, limit: Optional[int] = 100) -> List[dict]:
+    """Largest holders of ``char_id`` as {id, first_name, username, count}.
+
+    ``limit=None`` returns every owner.
+    """
+    cid = str(char_id)
+    if not await store_ready():
+        pipe = [
+            {'$match': {'characters.id': cid}},
+            {'$project': {'_id': 0, 'id': 1, 'first_name': 1, 'username': 1, 'characters': {'$filter': {'input': '$characters', 'as': 'c', 'cond': {'$eq': ['$$c.id', cid]}}}}},
+            {'$addFields': {'count': {'$size': '$characters'}}},
+            {'$sort': {'count': -1}},
+            *([{'$limit': limit}] if limit else []),
+            {'$project': {'characters': 0}}
+        ]
+        return await user_collection.aggregate(pipe).to_list(length=limit)
+
+    rows = await user_characters_collection.find(
+        {'char_id': cid, 'count': {'$gt': 0}}, {'_id': 0, 'user_id': 1, 'count': 1}
+    ).sort('count', -1).limit(limit or 0).to_list(length=limit)
+    names = {
+        u['id']: u for u in await user_collection.find(
+            {'id': {'$in': [r['user_id'] for r in rows]}},
+            {'_id': 0, 'id': 1, 'first_name': 1, 'username': 1}
+        ).to_list(length=None)
+    }
+    return [{**names.get(r['user_id'], {'id': r['user_id']}), 'count': r['count']} for r in rows]
+
+
+async def owned_ids() -> set:
+    """Ids of every character at least one user currently owns."""
+    if await stats_ready():
+        return set(await character_stats_collection.distinct('_id', {'owner_count': {'$gt': 0}}))
+    if await store_ready():
+        return set(await user_characters_collection.distinct('char_id', {'count': {'$gt': 0}}))
+    return set(await user_collection.distinct('characters.id'))
+
+
+# --- migration ---------------------------------------------------------------
+
+async def migrate_user(uid: int) -> bool:
+    """Rebuild ``uid``'s ownership rows and summary from the embedded array.
+
+    The marker is only set if the array length is unchanged since it was
+    read; otherwise a concurrent write may have been overwritten and the
+    copy is retried.
+    """
+    for _ in range(MIGRATION_RETRIES):
+        user = await user_collection.find_one({'id': uid}, {'characters': 1})
+        if user is None:
+            return False
+        chars = await _hydrate(user.get('characters') or [])
+        grouped = _counts(chars)
+        now = datetime.now(timezone.utc)
+        before = {
+            r['char_id']: r.get('count', 0) for r in await user_characters_collection.find(
+                {'user_id': uid}, {'_id': 0, 'char_id': 1, 'count': 1}
+            ).to_list(length=None)
+        }
+
+        ops = [DeleteMany({'user_id': uid, 'char_id': {'$nin': list(grouped)}})]
+        ops.extend(
+            UpdateOne(
+                {'user_id': uid, 'char_id': cid},
+                {
+                    '$set': {'count': entry['count']},
+                    '$setOnInsert': {'first_acquired': now, 'char': entry['char']}
+                },
+                upsert=True
+            )
+            for cid, entry in grouped.items()
+        )
+        await user_characters_collection.bulk_write(ops, ordered=True)
+        deltas = {}
+        for cid in set(before) | set(grouped):
+            old = max(before.get(cid, 0), 0)
+            new = grouped[cid]['count'] if cid in grouped else 0
+            deltas[cid] = (new - old, int(new > 0) - int(old > 0))
+        await _bump_stats(deltas)
+
+        res = await user_collection.update_one(
+            {'id': uid, 'characters': {'$size': len(chars)}},
+            {
+                '$set': {MIGRATED_FIELD: OWNERSHIP_VERSION, SUMMARY_FIELD: build_summary(chars)},
+                '$inc': {REVISION_FIELD: 1}
+            }
+        )
+        if res.matched_count:
+            return True
+    LOGGER.warning(f"Ownership migration for {uid} kept racing with writes")
+    return False
+
+
+_migration_lock = asyncio.Lock()
+
+
+async def migrate_all(batch: int = MIGRATION_BATCH, progress=None) -> int:
+    """Backfill every unmigrated user, resuming from the stored checkpoint.
+
+    ``progress`` is an optional ``async (migrated_so_far) -> None`` callback
+    invoked after each batch. Concurrent runs are serialized.
+    """
+    async with _migration_lock:
+        return await _migrate_all(batch, progress)
+
+
+async def backfill() -> None:
+    """Start or resume the ownership backfill unless it has completed."""
+    if await store_ready():
+        return
+    try:
+        done = await migrate_all()
+        LOGGER.info(f"Ownership backfill complete: {done} users migrated")
+    except Exception as e:
+        LOGGER.error(f"Ownership backfill stopped: {e}")
+
+
+async def _migrate_all(batch: int, progress) -> int:
+    state = await migrations_collection.find_one({'_id': MIGRATION_KEY}) or {}
+    last = state.get('last_id')
+    done = 0
+
+    while True:
+        flt = {MIGRATED_FIELD: {'$ne': OWNERSHIP_VERSION}}
+        if last is not None:
+            flt['_id'] = {'$gt': last}
+        pending = await user_collection.find(flt, {'_id': 1, 'id': 1}) \
+            .sort('_id', ASCENDING).limit(batch).to_list(length=batch)
+        if not pending:
+            break
+
+        for user in pending:
+            try:
+                if await migrate_user(user['id']):
+                    done += 1
+            except Exception as e:
+                LOGGER.error(f"Ownership migration err for {user.get('id')}: {e}")
+
+        last = pending[-1]['_id']
+        await migrations_collection.update_one(
+            {'_id': MIGRATION_KEY},
+            {'$set': {'last_id': last, 'updated_at': datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        if progress is not None:
+            await progress(done)
+
+    await migrations_collection.update_one(
+        {'_id': MIGRATION_KEY},
+        {'$set': {'last_id': None, 'completed_at': datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    _ready_at[MIGRATION_KEY] = float('inf')
+    await rebuild_character_stats()
+    return done
+
+
+async def rebuild_character_stats() -> None:
+    """Recompute the per-character counters from the ownership rows.
+
+    ``total_grabbed`` cannot be recovered from current holdings, so it only
+    ever moves up to the copies in circulation. Characters nobody owns any
+    more are zeroed rather than dropped; counters first written while the
+    rebuild ran are left alone.
+    """
+    stamp = datetime.now(timezone.utc)
+    await user_characters_collection.aggregate([
+        {'$match': {'count': {'$gt': 0}}},
+        {'$group': {
+            '_id': '$char_id',
+            'owner_count': {'$sum': 1},
+            'copies': {'$sum': '$count'},
+            'last_grabbed': {'$max': '$first_acquired'}
+        }},
+        {'$set': {'total_grabbed': '$copies', 'built_at': stamp}},
+        {'$merge': {
+            'into': character_stats_collection.name,
+            'on': '_id',
+            'whenMatched': [{'$set': {
+                'owner_count': '$$new.owner_count',
+                'copies': '$$new.copies',
+                'total_grabbed': {'$max': [{'$ifNull': ['$total_grabbed', 0]}, '$$new.total_grabbed']},
+                'last_grabbed': {'$max': ['$last_grabbed', '$$new.last_grabbed']},
+                'built_at': '$$new.built_at'
+            }}],
+            'whenNotMatched': 'insert'
+        }}
+    ], allowDiskUse=True).to_list(length=None)
+
+    await character_stats_collection.update_many(
+        {
+            'built_at': {'$ne': stamp},
+            'owner_count': {'$ne': 0},
+            '$or': [{'updated_at': None}, {'updated_at': {'$lt': stamp}}]
+        },
+        {'$set': {'owner_count': 0, 'copies': 0}}
+    )
+    await migrations_collection.update_one(
+        {'_id': STATS_KEY},
+        {'$set': {'completed_at': datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    _ready_at[STATS_KEY] = float('inf')
+
+
+async def maintain_character_stats(interval: float = STATS_REBUILD_INTERVAL) -> None:
+    """Recompute the counters every ``interval`` seconds once rows are complete.
+
+    Row and counter writes are separate, so a grab racing a user's migration
+    can be counted twice; the rebuild bounds how long such drift lasts. The
+    worker holding the rebuild lease does it; the others skip the round.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        if not await store_ready():
+            continue
+        try:
+            if not await lease.claim(migrations_collection, {'_id': STATS_REBUILD_LEASE}, interval, upsert=True):
+                continue
+            async with _migration_lock:
+                await rebuild_character_stats()
+        except Exception as e:
+            LOGGER.error(f"Character stats rebuild err: {e}")
@@ -0,0 +1,147 @@
+import asyncio
+import bisect
+import time
+from typing import List, Optional
+
+from shivu import user_collection, LOGGER
+from shivu.modules.database.ownership import SUMMARY_FIELD, get_summary, store_ready
+
+RANK_SNAPSHOT_TTL = 30
+RANK_TOP_SIZE = 100
+
+TOTAL_FIELD = f'{SUMMARY_FIELD}.total'
+# Collection size read off the embedded array, for before every user has a summary.
+ARRAY_TOTAL = {'$size': {'$ifNull': ['$characters', []]}}
+
+
+class _Snapshot:
+    __slots__ = ('top', 'totals', 'above', 'population', 'copies', 'at')
+
+    def __init__(self, top: List[dict], hist: List[dict], at: float):
+        self.top = top
+        # Distinct totals ascending; above[i] counts users with a total
+        # greater than or equal to totals[i], above[-1] is 0.
+        self.totals: List[int] = [b['_id'] for b in hist]
+        self.above: List[int] = [0] * (len(hist) + 1)
+        for i in range(len(hist) - 1, -1, -1):
+            self.above[i] = self.above[i + 1] + hist[i]['n']
+        self.population = self.above[0]
+        self.copies = sum(b['_id'] * b['n'] for b in hist)
+        self.at = at
+
+
+class Rankings:
+    """Global collector ranking served from a periodically rebuilt snapshot.
+
+    A rebuild reads the top ``top_size`` users off the ``summary.total``
+    index and a histogram of totals; ``top`` and ``rank`` then answer from
+    memory. A stale snapshot keeps serving while one rebuild runs in the
+    background; only the very first call waits for it.
+
+    Until the ownership backfill has completed, summaries of unmigrated
+    users are partial, so snapshots are built from array sizes instead.
+    """
+
+    def __init__(self, col, ttl: float = RANK_SNAPSHOT_TTL, top_size: int = RANK_TOP_SIZE):
+        self._col = col
+        self._ttl = ttl
+        self._top_size = top_size
+        self._snap: Optional[_Snapshot] = None
+        self._refreshing: Optional[asyncio.Task] = None
+
+    async def _build(self) -> _Snapshot:
+        if not await store_ready():
+            return await self._build_from_arrays()
+
+        top = await self._col.find(
+            {TOTAL_FIELD: {'$gt': 0}},
+            {'_id': 0, 'id': 1, 'first_name': 1, TOTAL_FIELD: 1}
+        ).sort(TOTAL_FIELD, -1).limit(self._top_size).to_list(length=self._top_size)
+        hist = await self._col.aggregate([
+            {'$match': {TOTAL_FIELD: {'$gte': 0}}},
+            {'$group': {'_id': f'${TOTAL_FIELD}', 'n': {'$sum': 1}}},
+            {'$sort': {'_id': 1}}
+        ]).to_list(length=None)
+        return _Snapshot(
+            [{'id': u.get('id'), 'first_name': u.get('first_name', 'Unknown'),
+              'total': u.get(SUMMARY_FIELD, {}).get('total', 0)} for u in top],
+            hist,
+            time.monotonic()
+        )
+
+    async def _build_from_arrays(self) -> _Snapshot:
+        top = await self._col.aggregate([
+            {'$project': {'_id': 0, 'id': 1, 'first_name': 1, 'total': ARRAY_TOTAL}},
+            {'$match': {'total': {'$gt': 0}}},
+            {'$sort': {'total': -1}},
+            {'$limit': self._top_size}
+        ], allowDiskUse=True).to_list(length=self._top_size)
+        hist = await self._col.aggregate([
+            {'$group': {'_id': ARRAY_TOTAL, 'n': {'$sum': 1}}},
+            {'$sort': {'_id': 1}}
+        ], allowDiskUse=True).to_list(length=None)
+        return _Snapshot(
+            [{'id': u.get('id'), 'first_name': u.get('first_name', 'Unknown'),
+              'total': u['total']} for u in top],
+            hist,
+            time.monotonic()
+        )
+
+    async def refresh(self) -> None:
+        try:
+            self._snap = await self._build()
+        except Exception as e:
+            LOGGER.error(f"Rank snapshot err: {e}")
+
+    def _schedule(self) -> asyncio.Task:
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self.refresh())
+        return self._refreshing
+
+    async def _snapshot(self) -> Optional[_Snapshot]:
+        if self._snap is None:
+            await self._schedule()
+        elif time.monotonic() - self._snap.at >= self._ttl:
+            self._schedule()
+        return self._snap
+
+    async def top(self, n: int = 10) -> List[dict]:
+        """Up to ``n`` leaders as {id, first_name, total}, highest first."""
+        if n > self._top_size:
+            self._top_size = n
+            self._snap = None
+        snap = await self._snapshot()
+        return list(snap.top[:n]) if snap else []
+
+    async def rank_of(self, total: int) -> int:
+        """1-based position a collection of ``total`` copies holds."""
+        snap = await self._snapshot()
+        if snap is None:
+            if not await store_ready():
+                return await self._col.count_documents({'$expr': {'$gt': [ARRAY_TOTAL, total]}}) + 1
+            return await self._col.count_documents({TOTAL_FIELD: {'$gt': total}}) + 1
+        return snap.above[bisect.bisect_right(snap.totals, total)] + 1
+
+    async def rank(self, uid: int) -> Optional[int]:
+        """``uid``'s 1-based rank, or None if the user does not exist."""
+        summary = await get_summary(uid)
+        if summary is None:
+            return None
+        return await self.rank_of(summary['total'])
+
+    async def population(self) -> int:
+        """Number of users the ranking covers."""
+        snap = await self._snapshot()
+        if snap is None:
+            if not await store_ready():
+                return await self._col.count_documents({})
+            return await self._col.count_documents({TOTAL_FIELD: {'$gte': 0}})
+        return snap.population
+
+    async def copies(self) -> int:
+        """Characters held across every collection."""
+        snap = await self._snapshot()
+        return snap.copies if snap else 0
+
+
+rankings = Rankings(user_collection)
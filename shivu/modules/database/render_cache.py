@@ -0,0 +1,67 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from shivu import LOGGER
+
+RENDER_TTL = 60
+RENDER_MAX_STALE = 600
+
+
+class RenderCache:
+    """Stale-while-revalidate cache for rendered bot replies.
+
+    A value younger than ``ttl`` is served as is. An older one is still
+    served, and a single background ``loader`` call replaces it; past
+    ``max_stale`` the caller waits for the reload instead. Concurrent misses
+    on one key share one load.
+    """
+
+    def __init__(self, ttl: float = RENDER_TTL, max_stale: float = RENDER_MAX_STALE):
+        self._ttl = ttl
+        self._max_stale = max_stale
+        self._values: Dict[Hashable, Tuple[Any, float]] = {}
+        self._loading: Dict[Hashable, asyncio.Task] = {}
+        self._pruned_at = time.monotonic()
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+            now = time.monotonic()
+            self._values[key] = (value, now)
+            if now - self._pruned_at >= self._max_stale:
+                self.prune()
+            return value
+        finally:
+            self._loading.pop(key, None)
+
+    def _spawn(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._loading.get(key)
+        if task is None:
+            task = self._loading[key] = asyncio.create_task(self._load(key, loader))
+            task.add_done_callback(self._report)
+        return task
+
+    @staticmethod
+    def _report(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            LOGGER.error(f"Render refresh err: {task.exception()}")
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._values.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[1]
+            if age < self._ttl:
+                return entry[0]
+            if age < self._max_stale:
+                self._spawn(key, loader)
+                return entry[0]
+        return await asyncio.shield(self._spawn(key, loader))
+
+    def invalidate(self, key: Hashable) -> None:
+        self._values.pop(key, None)
+
+    def prune(self) -> None:
+        now = self._pruned_at = time.monotonic()
+        for k in [k for k, (_, at) in self._values.items() if now - at >= self._max_stale]:
+            del self._values[k]
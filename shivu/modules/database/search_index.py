@@ -0,0 +1,256 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from shivu import LOGGER
+from shivu.modules.database.catalog import catalog
+
+FIELDS = ('name', 'anime')
+# Name hits outrank anime hits when a query searches both.
+FIELD_WEIGHTS = {'name': 1.0, 'anime': 0.7}
+
+EXACT, PREFIX, INFIX, FUZZY = 1.0, 0.8, 0.5, 0.3
+# Bonus on top of the per-token scores when the field is, or starts with,
+# the whole multi-word query.
+PHRASE_EXACT, PHRASE_PREFIX = 2.0, 1.0
+# Upper bound on vocabulary tokens one query token may expand to.
+MAX_EXPANSIONS = 500
+
+_SPLIT = re.compile(r'[\W_]+')
+
+
+def normalize(text) -> str:
+    """Lower-case, accent-free, punctuation-free form of ``text``."""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(_SPLIT.split(text.casefold())).strip()
+
+
+def tokenize(text) -> List[str]:
+    return normalize(text).split()
+
+
+def trigrams(token: str) -> Set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def max_typos(token: str) -> int:
+    return 0 if len(token) < 4 else 1 if len(token) < 8 else 2
+
+
+def within_distance(a: str, b: str, k: int) -> bool:
+    """Levenshtein distance of ``a`` and ``b`` is at most ``k``."""
+    if abs(len(a) - len(b)) > k:
+        return False
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > k:
+            return False
+        prev = cur
+    return prev[-1] <= k
+
+
+class _FieldIndex:
+    """Token postings for one field plus the lookups over its vocabulary.
+
+    ``vocab`` is sorted so a prefix is one bisect followed by a scan; new
+    tokens are appended and the list re-sorted on next use, so a bulk build
+    sorts once. ``grams`` maps trigrams to the tokens containing them and
+    serves infix and typo-tolerant matches.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+        self.vocab: List[str] = []
+        self.grams: Dict[str, Set[str]] = {}
+        self._unsorted = False
+
+    def _sorted_vocab(self) -> List[str]:
+        if self._unsorted:
+            self.vocab.sort()
+            self._unsorted = False
+        return self.vocab
+
+    def add(self, cid: str, tokens: Iterable[str]) -> None:
+        for t in set(tokens):
+            ids = self.postings.get(t)
+            if ids is None:
+                ids = self.postings[t] = set()
+                self.vocab.append(t)
+                self._unsorted = True
+                for g in trigrams(t):
+                    self.grams.setdefault(g, set()).add(t)
+            ids.add(cid)
+
+    def remove(self, cid: str, tokens: Iterable[str]) -> None:
+        for t in set(tokens):
+            ids = self.postings.get(t)
+            if ids is None:
+                continue
+            ids.discard(cid)
+            if ids:
+                continue
+            del self.postings[t]
+            vocab = self._sorted_vocab()
+            i = bisect_left(vocab, t)
+            if i < len(vocab) and vocab[i] == t:
+                del vocab[i]
+            for g in trigrams(t):
+                holders = self.grams.get(g)
+                if holders is not None:
+                    holders.discard(t)
+                    if not holders:
+                        del self.grams[g]
+
+    def _expand(self, q: str) -> Dict[str, float]:
+        """Vocabulary tokens matching query token ``q``, with their score."""
+        found: Dict[str, float] = {}
+        if q in self.postings:
+            found[q] = EXACT
+
+        vocab = self._sorted_vocab()
+        i = bisect_left(vocab, q)
+        while i < len(vocab) and len(found) < MAX_EXPANSIONS:
+            t = vocab[i]
+            if not t.startswith(q):
+                break
+            found.setdefault(t, PREFIX)
+            i += 1
+
+        grams = trigrams(q)
+        if grams and len(found) < MAX_EXPANSIONS:
+            sets = sorted((self.grams.get(g, set()) for g in grams), key=len)
+            for t in set.intersection(*sets) if sets[0] else ():
+                if q in t:
+                    found.setdefault(t, INFIX)
+
+        k = max_typos(q)
+        if not found and k:
+            shared = Counter(t for g in grams for t in self.grams.get(g, ()))
+            need = max(1, len(grams) - 3 * k)
+            for t, n in shared.items():
+                if n >= need and within_distance(q, t, k):
+                    found[t] = FUZZY
+        return found
+
+    def match(self, q: str) -> Dict[str, float]:
+        """Best score per character id for query token ``q``."""
+        best: Dict[str, float] = {}
+        for t, score in self._expand(q).items():
+            for cid in self.postings[t]:
+                if best.get(cid, 0) < score:
+                    best[cid] = score
+        return best
+
+
+class SearchIndex:
+    """In-memory name/anime search over the shared character catalog.
+
+    The index follows the catalog revision and, when it moves, re-indexes
+    only the characters whose name or anime changed. Queries match every
+    token by exact word, word prefix, infix or (for longer words) a small
+    edit distance, and results are ranked by match quality with catalog
+    order breaking ties.
+    """
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+        self._revision = None
+        self._docs: Dict[str, dict] = {}
+        self._keys: Dict[str, Tuple[str, ...]] = {}
+        self._pos: Dict[str, int] = {}
+        self._fields = {f: _FieldIndex() for f in FIELDS}
+
+    def _index(self, cid: str, key: Tuple[str, ...]) -> None:
+        for f, text in zip(FIELDS, key):
+            self._fields[f].add(cid, text.split())
+        self._keys[cid] = key
+
+    def _unindex(self, cid: str) -> None:
+        key = self._keys.pop(cid, None)
+        if key is not None:
+            for f, text in zip(FIELDS, key):
+                self._fields[f].remove(cid, text.split())
+
+    async def _sync(self) -> None:
+        chars = await self._catalog.all()
+        if self._catalog.revision == self._revision:
+            return
+
+        docs: Dict[str, dict] = {}
+        for c in chars:
+            if c.get('id') is not None:
+                docs[str(c['id'])] = c
+
+        changed = 0
+        for cid in [cid for cid in self._docs if cid not in docs]:
+            self._unindex(cid)
+            changed += 1
+        for cid, doc in docs.items():
+            if self._docs.get(cid) is doc:
+                continue
+            key = tuple(normalize(doc.get(f)) for f in FIELDS)
+            if self._keys.get(cid) != key:
+                self._unindex(cid)
+                self._index(cid, key)
+                changed += 1
+
+        self._docs = docs
+        self._pos = {cid: i for i, cid in enumerate(docs)}
+        if self._revision is None or changed > 100:
+            LOGGER.info(f"Search index: {changed} characters re-indexed, {len(docs)} total")
+        self._revision = self._catalog.revision
+
+    async def warm(self) -> None:
+        await self._sync()
+
+    async def search(self, query: str, fields: Sequence[str] = FIELDS,
+                     limit: Optional[int] = None) -> List[dict]:
+        """Catalog documents matching every word of ``query`` in ``fields``.
+
+        Documents are the catalog's shared copies and must not be modified.
+        """
+        await self._sync()
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        scores: Optional[Dict[str, float]] = None
+        for q in tokens:
+            best: Dict[str, float] = {}
+            for f in fields:
+                w = FIELD_WEIGHTS.get(f, 1.0)
+                for cid, s in self._fields[f].match(q).items():
+                    if best.get(cid, 0) < s * w:
+                        best[cid] = s * w
+            if scores is None:
+                scores = best
+            else:
+                scores = {cid: s + best[cid] for cid, s in scores.items() if cid in best}
+            if not scores:
+                return []
+
+        phrase = ' '.join(tokens)
+        for cid in scores:
+            key = self._keys[cid]
+            for f, text in zip(FIELDS, key):
+                if f not in fields:
+                    continue
+                w = FIELD_WEIGHTS.get(f, 1.0)
+                if text == phrase:
+                    scores[cid] += PHRASE_EXACT * w
+                elif len(tokens) > 1 and text.startswith(phrase + ' '):
+                    scores[cid] += PHRASE_PREFIX * w
+
+        ranked = sorted(scores, key=lambda cid: (-scores[cid], self._pos[cid]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self._docs[cid] for cid in ranked]
+
+
+search_index = SearchIndex(catalog)
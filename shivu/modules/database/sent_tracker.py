@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from typing import Dict
+
+MAX_SENT_BYTES = 32 * 1024 * 1024
+
+
+class SentTracker:
+    """Per-chat "already spawned" bitsets indexed by catalog ordinal.
+
+    Each chat costs one bit per catalog ordinal. Chats are kept in LRU order
+    and the least recently spawned ones are dropped once the bitsets exceed
+    ``max_bytes``; an evicted chat simply starts a fresh no-repeat cycle.
+    """
+
+    def __init__(self, max_bytes: int = MAX_SENT_BYTES):
+        self._max_bytes = max_bytes
+        self._bits: 'OrderedDict[int, bytearray]' = OrderedDict()
+        self._counts: Dict[int, int] = {}
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._bits)
+
+    def has(self, cid: int, ordinal: int) -> bool:
+        bits = self._bits.get(cid)
+        if bits is None:
+            return False
+        i = ordinal >> 3
+        return i < len(bits) and bool(bits[i] & (1 << (ordinal & 7)))
+
+    def count(self, cid: int) -> int:
+        return self._counts.get(cid, 0)
+
+    def add(self, cid: int, ordinal: int) -> None:
+        bits = self._bits.get(cid)
+        if bits is None:
+            bits = self._bits[cid] = bytearray()
+            self._counts[cid] = 0
+        else:
+            self._bits.move_to_end(cid)
+
+        i = ordinal >> 3
+        if i >= len(bits):
+            grow = i + 1 - len(bits)
+            bits.extend(bytes(grow))
+            self._bytes += grow
+
+        mask = 1 << (ordinal & 7)
+        if not bits[i] & mask:
+            bits[i] |= mask
+            self._counts[cid] += 1
+
+        self._evict()
+
+    def reset(self, cid: int) -> None:
+        bits = self._bits.pop(cid, None)
+        if bits is not None:
+            self._bytes -= len(bits)
+        self._counts.pop(cid, None)
+
+    def _evict(self) -> None:
+        while self._bytes > self._max_bytes and len(self._bits) > 1:
+            old_cid, bits = self._bits.popitem(last=False)
+            self._bytes -= len(bits)
+            self._counts.pop(old_cid, None)
+
+
+sent_tracker = SentTracker()
@@ -0,0 +1,132 @@
+import bisect
+import random
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from shivu.modules.database.catalog import catalog
+
+MAX_REJECTIONS = 8
+MAX_TABLES = 256
+
+Weights = Tuple[Tuple[str, float], ...]
+Accept = Callable[[dict], bool]
+
+
+def rarity_emoji(ch: dict) -> str:
+    r = ch.get('rarity', '🟢 Common')
+    return str(r).split()[0] if ' ' in str(r) else '🟢'
+
+
+def build_weights(g_set: Optional[dict], gl_rars: dict) -> Weights:
+    """Turn a group exclusive and the global rarity settings into (emoji, chance) pairs."""
+    w = []
+    if g_set:
+        w.append((g_set['rarity_emoji'], g_set.get('chance', 10.0)))
+
+    for e, r_d in gl_rars.items():
+        if not r_d.get('enabled', True):
+            continue
+        if g_set and e == g_set['rarity_emoji']:
+            continue
+        w.append((e, r_d.get('chance', 5.0)))
+
+    return tuple(w)
+
+
+class CumulativeTable:
+    """Weighted choice over a fixed set of keys: cumulative array + bisect."""
+
+    def __init__(self, weighted: Iterable[Tuple[str, float]]):
+        self.keys: List[str] = []
+        self.cum: List[float] = []
+        total = 0.0
+        for k, w in weighted:
+            if w <= 0:
+                continue
+            total += w
+            self.keys.append(k)
+            self.cum.append(total)
+        self.total = total
+
+    def pick(self) -> Optional[str]:
+        if not self.keys:
+            return None
+        i = bisect.bisect_left(self.cum, random.uniform(0, self.total))
+        return self.keys[min(i, len(self.keys) - 1)]
+
+    def without(self, key: str) -> 'CumulativeTable':
+        prev = 0.0
+        weighted = []
+        for k, c in zip(self.keys, self.cum):
+            if k != key:
+                weighted.append((k, c - prev))
+            prev = c
+        return CumulativeTable(weighted)
+
+
+class SpawnSampler:
+    """Picks spawn characters from per-rarity buckets of the catalog.
+
+    Buckets are rebuilt only when the catalog revision changes and cumulative
+    tables are cached per weight signature, so a pick costs one bisect over
+    the rarities plus a few random draws inside the chosen bucket.
+    """
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+        self._revision = None
+        self._all: List[dict] = []
+        self._buckets: Dict[str, List[dict]] = {}
+        self._tables: Dict[Weights, CumulativeTable] = {}
+
+    async def _sync(self) -> None:
+        chars = await self._catalog.all()
+        if self._catalog.revision == self._revision:
+            return
+
+        buckets: Dict[str, List[dict]] = {}
+        for c in chars:
+            buckets.setdefault(rarity_emoji(c), []).append(c)
+
+        self._all = chars
+        self._buckets = buckets
+        self._tables.clear()
+        self._revision = self._catalog.revision
+
+    def _table(self, weights: Weights) -> CumulativeTable:
+        table = self._tables.get(weights)
+        if table is None:
+            if len(self._tables) >= MAX_TABLES:
+                self._tables.clear()
+            table = CumulativeTable((e, w) for e, w in weights if e in self._buckets)
+            self._tables[weights] = table
+        return table
+
+    @staticmethod
+    def _pick_from(pool: List[dict], accept: Accept) -> Optional[dict]:
+        if not pool:
+            return None
+
+        for _ in range(min(MAX_REJECTIONS, len(pool))):
+            c = random.choice(pool)
+            if accept(c):
+                return c
+
+        # Mostly-rejected pool: fall back to an exact scan of this bucket only.
+        cands = [c for c in pool if accept(c)]
+        return random.choice(cands) if cands else None
+
+    async def pick(self, weights: Weights, accept: Accept) -> Optional[dict]:
+        await self._sync()
+
+        table = self._table(weights)
+        while table.keys:
+            e = table.pick()
+            ch = self._pick_from(self._buckets[e], accept)
+            if ch:
+                return ch
+            table = table.without(e)
+
+        return self._pick_from(self._all, accept)
+
+
+sampler = SpawnSampler(catalog)
@@ -0,0 +1,178 @@
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from bson import json_util
+
+from shivu import LOGGER
+
+REDIS_URL = os.getenv('REDIS_URL')
+SPAWN_STATE_PREFIX = os.getenv('SPAWN_STATE_PREFIX', 'spawn')
+
+BUSY_TTL = 60
+COUNTER_TTL = 7 * 24 * 3600
+
+
+class MemorySpawnState:
+    """Default backend: per-process dicts, only valid for a single worker.
+
+    Every method runs without yielding to the event loop, so each call is
+    atomic with respect to other handlers in the same process.
+    """
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self._busy: Dict[int, float] = {}
+        self._live: Dict[int, Tuple[dict, float]] = {}
+        self._claims: Dict[Tuple[int, str], Tuple[int, float]] = {}
+
+    @staticmethod
+    def _alive(expires: float) -> bool:
+        return expires > time.monotonic()
+
+    async def incr_messages(self, cid: int) -> int:
+        self._counts[cid] = self._counts.get(cid, 0) + 1
+        return self._counts[cid]
+
+    async def reset_messages(self, cid: int) -> None:
+        self._counts.pop(cid, None)
+
+    async def begin_spawn(self, cid: int, ttl: float = BUSY_TTL) -> bool:
+        until = self._busy.get(cid)
+        if until is not None and self._alive(until):
+            return False
+        self._busy[cid] = time.monotonic() + ttl
+        return True
+
+    async def end_spawn(self, cid: int) -> None:
+        self._busy.pop(cid, None)
+
+    async def get_spawn(self, cid: int) -> Optional[dict]:
+        entry = self._live.get(cid)
+        if entry is None:
+            return None
+        if not self._alive(entry[1]):
+            self._live.pop(cid, None)
+            return None
+        return entry[0]
+
+    async def set_spawn(self, cid: int, spawn: dict, ttl: float) -> None:
+        # The previous spawn's claim is kept until it expires, as in Redis,
+        # so its despawn timer still sees who grabbed it.
+        self._live[cid] = (spawn, time.monotonic() + ttl)
+
+    async def clear_spawn(self, cid: int, spawn_id: str) -> None:
+        entry = self._live.get(cid)
+        if entry is not None and entry[0]['id'] == spawn_id:
+            del self._live[cid]
+        self._claims.pop((cid, spawn_id), None)
+
+    async def claim(self, cid: int, spawn_id: str, uid: int, ttl: float) -> bool:
+        key = (cid, spawn_id)
+        held = self._claims.get(key)
+        if held is not None and self._alive(held[1]):
+            return False
+        self._claims[key] = (uid, time.monotonic() + ttl)
+        return True
+
+    async def claimed_by(self, cid: int, spawn_id: str) -> Optional[int]:
+        held = self._claims.get((cid, spawn_id))
+        if held is None or not self._alive(held[1]):
+            return None
+        return held[0]
+
+    async def forget(self, cid: int) -> None:
+        self._counts.pop(cid, None)
+
+    async def prune(self) -> None:
+        now = time.monotonic()
+        for k in [k for k, until in self._busy.items() if until <= now]:
+            del self._busy[k]
+        for d in (self._live, self._claims):
+            for k in [k for k, v in d.items() if v[1] <= now]:
+                del d[k]
+
+
+class RedisSpawnState:
+    """Shared backend for running several workers against one Redis.
+
+    ``client`` is any ``redis.asyncio``-compatible client, so a local
+    stand-in can be injected for testing. Spawn records are stored as
+    extended JSON so ObjectIds in character documents round-trip.
+    """
+
+    CLEAR_LUA = """
+    if redis.call('GET', KEYS[2]) == ARGV[1] then
+        redis.call('DEL', KEYS[1], KEYS[2])
+    end
+    return redis.call('DEL', KEYS[3])
+    """
+
+    def __init__(self, client, prefix: str = SPAWN_STATE_PREFIX):
+        self._redis = client
+        self._prefix = prefix
+        self._clear = client.register_script(self.CLEAR_LUA)
+
+    def _k(self, cid: int, part: str) -> str:
+        return f"{self._prefix}:{cid}:{part}"
+
+    async def incr_messages(self, cid: int) -> int:
+        key = self._k(cid, 'cnt')
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, COUNTER_TTL)
+            count, _ = await pipe.execute()
+        return int(count)
+
+    async def reset_messages(self, cid: int) -> None:
+        await self._redis.delete(self._k(cid, 'cnt'))
+
+    async def begin_spawn(self, cid: int, ttl: float = BUSY_TTL) -> bool:
+        return bool(await self._redis.set(self._k(cid, 'busy'), 1, nx=True, ex=int(ttl)))
+
+    async def end_spawn(self, cid: int) -> None:
+        await self._redis.delete(self._k(cid, 'busy'))
+
+    async def get_spawn(self, cid: int) -> Optional[dict]:
+        raw = await self._redis.get(self._k(cid, 'live'))
+        return json_util.loads(raw) if raw else None
+
+    async def set_spawn(self, cid: int, spawn: dict, ttl: float) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._k(cid, 'live'), json_util.dumps(spawn), ex=int(ttl))
+            pipe.set(self._k(cid, 'sid'), spawn['id'], ex=int(ttl))
+            await pipe.execute()
+
+    async def clear_spawn(self, cid: int, spawn_id: str) -> None:
+        await self._clear(
+            keys=[self._k(cid, 'live'), self._k(cid, 'sid'), self._k(cid, f'claim:{spawn_id}')],
+            args=[spawn_id]
+        )
+
+    async def claim(self, cid: int, spawn_id: str, uid: int, ttl: float) -> bool:
+        return bool(await self._redis.set(self._k(cid, f'claim:{spawn_id}'), uid, nx=True, ex=int(ttl)))
+
+    async def claimed_by(self, cid: int, spawn_id: str) -> Optional[int]:
+        raw = await self._redis.get(self._k(cid, f'claim:{spawn_id}'))
+        return int(raw) if raw is not None else None
+
+    async def forget(self, cid: int) -> None:
+        # Keys carry their own TTLs; nothing is held in process memory.
+        pass
+
+    async def prune(self) -> None:
+        pass
+
+
+def create_spawn_state(url: Optional[str] = REDIS_URL) -> Any:
+    if url:
+        try:
+            from redis.asyncio import Redis
+            LOGGER.info("Spawn state: redis")
+            return RedisSpawnState(Redis.from_url(url))
+        except Exception as e:
+            LOGGER.warning(f"Redis spawn state unavailable, using memory: {e}")
+    return MemorySpawnState()
+
+
+spawn_state = create_spawn_state()
@@ -0,0 +1,139 @@
+import copy
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set
+
+from shivu import user_collection
+
+USER_CACHE_TTL = 10
+USER_CACHE_SIZE = 20000
+
+
+class _Entry:
+    __slots__ = ('doc', 'fields', 'at')
+
+    def __init__(self, doc: Optional[dict], fields: Set[str], at: float):
+        self.doc = doc
+        self.fields = fields
+        self.at = at
+
+
+class UserRepository:
+    """Field-level reads of user documents with a short per-user cache.
+
+    ``get`` fetches only the requested top-level fields and remembers them
+    for ``ttl`` seconds; later reads of a subset are served from memory and
+    reads of new fields fetch just those and merge them in. Writes made
+    through :meth:`update` drop the user's entry, so a handler reading back
+    its own write sees it, and a read still in flight across an
+    invalidation is not cached. Missing users are not cached, so a user
+    created elsewhere is seen at once; other outside writes are picked up
+    once the entry expires.
+    """
+
+    def __init__(self, col, ttl: float = USER_CACHE_TTL, maxsize: int = USER_CACHE_SIZE):
+        self._col = col
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._cache: 'OrderedDict[int, _Entry]' = OrderedDict()
+        # Invalidation stamps; a read only caches if its user's stamp is unchanged.
+        self._seq = 0
+        self._clears = 0
+        self._invalidated: Dict[int, int] = {}
+
+    def _fresh(self, uid: int) -> Optional[_Entry]:
+        entry = self._cache.get(uid)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.at >= self._ttl:
+            del self._cache[uid]
+            return None
+        self._cache.move_to_end(uid)
+        return entry
+
+    def _store(self, uid: int, entry: _Entry) -> None:
+        self._cache[uid] = entry
+        self._cache.move_to_end(uid)
+        while len(self._cache) > self._maxsize:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _pick(doc: dict, fields: Iterable[str]) -> dict:
+        # Callers mutate nested lists before writing them back; keep the cache clean.
+        return copy.deepcopy({f: doc[f] for f in fields if f in doc})
+
+    async def get(self, uid: int, *fields: str, fresh: bool = False) -> Optional[dict]:
+        """Return the named fields of ``uid``'s document, or None if absent.
+
+        Only the requested keys are present in the result (plus ``id``).
+        ``fresh`` bypasses the cache, for reads guarding a spend.
+        """
+        wanted = set(fields) | {'id'}
+        entry = None if fresh else self._fresh(uid)
+
+        if entry is not None:
+            missing = wanted - entry.fields
+            if not missing:
+                return self._pick(entry.doc, wanted)
+        else:
+            missing = wanted
+
+        stamp = self._stamp(uid)
+        doc = await self._col.find_one({'id': uid}, {'_id': 0, **{f: 1 for f in missing}})
+        if doc is None:
+            return None
+        if self._stamp(uid) != stamp:
+            # Written meanwhile: what we read may predate the write, so it is
+            # neither cached nor merged with the dropped entry.
+            if missing != wanted:
+                doc = await self._col.find_one({'id': uid}, {'_id': 0, **{f: 1 for f in wanted}})
+            return self._pick(doc, wanted) if doc is not None else None
+
+        if entry is not None:
+            entry.doc.update(doc)
+            entry.fields |= missing
+        else:
+            entry = _Entry(doc, set(missing), time.monotonic())
+            self._store(uid, entry)
+        return self._pick(entry.doc, wanted)
+
+    async def field(self, uid: int, name: str, default: Any = None, fresh: bool = False) -> Any:
+        doc = await self.get(uid, name, fresh=fresh)
+        if doc is None:
+            return default
+        value = doc.get(name)
+        return default if value is None else value
+
+    async def balance(self, uid: int, fresh: bool = False) -> int:
+        return int(await self.field(uid, 'balance', 0, fresh=fresh))
+
+    async def exists(self, uid: int) -> bool:
+        return await self.get(uid) is not None
+
+    async def update(self, uid: int, update: dict, upsert: bool = False):
+        self.invalidate(uid)
+        try:
+            return await self._col.update_one({'id': uid}, update, upsert=upsert)
+        finally:
+            self.invalidate(uid)
+
+    async def insert(self, doc: dict):
+        self.invalidate(doc.get('id'))
+        try:
+            return await self._col.insert_one(doc)
+        finally:
+            self.invalidate(doc.get('id'))
+
+    def _stamp(self, uid: int) -> tuple:
+        return self._clears, self._invalidated.get(uid, 0)
+
+    def invalidate(self, uid: int) -> None:
+        self._cache.pop(uid, None)
+        self._seq += 1
+        if len(self._invalidated) >= self._maxsize:
+            self._invalidated.clear()
+            self._clears += 1
+        self._invalidated[uid] = self._seq
+
+
+users = UserRepository(user_collection)
@@ -1,7 +1,9 @@
 from html import escape
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
-from shivu import application, user_collection, LOGGER
+from shivu import application, LOGGER
+from shivu.modules.database.users import users
+from shivu.modules.database.ownership import get_character
 
 async def fav(update: Update, context: CallbackContext) -> None:
     user_id = update.effective_user.id
@@ -13,12 +15,11 @@ async def fav(update: Update, context: CallbackContext) -> None:
     character_id = str(context.args[0])
 
     try:
-        user = await user_collection.find_one({'id': user_id})
-        if not user:
+        if not await users.exists(user_id):
             await update.message.reply_text('You have no characters')
             return
 
-        character = next((c for c in user.get('characters', []) if str(c.get('id')) == character_id), None)
+        character = await get_character(user_id, character_id)
 
         if not character:
             await update.message.reply_text('Character not in your collection')
@@ -76,18 +77,17 @@ async def handle_fav_callback(update: Update, context: CallbackContext) -> None:
                 await query.answer("Not your request", show_alert=True)
                 return
 
-            user = await user_collection.find_one({'id': user_id})
-            if not user:
+            if not await users.exists(user_id):
                 await query.answer("User not found", show_alert=True)
                 return
 
-            character = next((c for c in user.get('characters', []) if str(c.get('id')) == character_id), None)
+            character = await get_character(user_id, character_id)
 
             if not character:
                 await query.answer("Character not found", show_alert=True)
                 return
 
-            await user_collection.update_one({'id': user_id}, {'$set': {'favorites': character}})
+            await users.update(user_id, {'$set': {'favorites': character}})
 
             success_caption = (
                 f"<b>Successfully set as favorite</b>\n\n"
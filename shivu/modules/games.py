@@ -11,6 +11,7 @@ from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from telegram.ext import CommandHandler, CallbackQueryHandler, MessageHandler, filters, CallbackContext
 
 from shivu import application, user_collection
+from shivu.modules.database.users import users
 
 
 @dataclass(frozen=True)
@@ -103,10 +104,12 @@ GAME_NAMES = {
 
 
 class UserDB:
+    FIELDS = ('first_name', 'username', 'balance', 'tokens', 'last_daily_claim')
+
     @staticmethod
-    async def get(user_id: int) -> dict | None:
+    async def get(user_id: int, fresh: bool = False) -> dict | None:
         try:
-            return await user_collection.find_one({'id': user_id})
+            return await users.get(user_id, *UserDB.FIELDS, fresh=fresh)
         except Exception:
             return None
 
@@ -119,7 +122,7 @@ class UserDB:
             if first_name and first_name != doc.get('first_name'):
                 updates['first_name'] = first_name
             if updates:
-                await user_collection.update_one({'id': user_id}, {'$set': updates})
+                await users.update(user_id, {'$set': updates})
             return doc
 
         new_user = {
@@ -131,17 +134,17 @@ class UserDB:
             'characters': [],
             'created_at': datetime.utcnow()
         }
-        await user_collection.insert_one(new_user)
+        await users.insert(new_user)
         return new_user
 
     @staticmethod
     async def change_balance(user_id: int, delta: int) -> dict | None:
-        await user_collection.update_one({'id': user_id}, {'$inc': {'balance': delta}}, upsert=True)
+        await users.update(user_id, {'$inc': {'balance': delta}}, upsert=True)
         return await UserDB.get(user_id)
 
     @staticmethod
     async def change_tokens(user_id: int, delta: int) -> dict | None:
-        await user_collection.update_one({'id': user_id}, {'$inc': {'tokens': delta}}, upsert=True)
+        await users.update(user_id, {'$inc': {'tokens': delta}}, upsert=True)
         return await UserDB.get(user_id)
 
 
@@ -265,7 +268,7 @@ async def validate_amount(update: Update, amount: int, user_id: int) -> bool:
     if amount <= 0:
         await reply(update, "<b>❌ Invalid Amount</b>\n<blockquote>Amount must be positive</blockquote>")
         return False
-    if not (user := await UserDB.get(user_id)) or user.get('balance', 0) < amount:
+    if not (user := await UserDB.get(user_id, fresh=True)) or user.get('balance', 0) < amount:
         await reply(update, "<b>💰 Insufficient Balance</b>\n<blockquote>You don't have enough coins</blockquote>")
         return False
     return True
@@ -520,7 +523,7 @@ async def game_stats(update: Update, context: CallbackContext):
 
 async def leaderboard(update: Update, context: CallbackContext):
     try:
-        top = await user_collection.find().sort('balance', -1).limit(10).to_list(length=10)
+        top = await user_collection.find({}, {'id': 1, 'first_name': 1, 'username': 1, 'balance': 1, 'tokens': 1}).sort('balance', -1).limit(10).to_list(length=10)
         if not top:
             await reply(update, "<b>🏆 No Players</b>\n<blockquote>Be the first to play</blockquote>")
             return
@@ -557,7 +560,7 @@ async def daily_bonus(update: Update, context: CallbackContext):
     if tokens > 0:
         await UserDB.change_tokens(user_id, tokens)
     
-    await user_collection.update_one({'id': user_id}, {'$set': {'last_daily_claim': datetime.utcnow()}})
+    await users.update(user_id, {'$set': {'last_daily_claim': datetime.utcnow()}})
     
     text = f"<b>🎁 Daily Bonus</b>\n<blockquote expandable>Coins: <code>+{coins}</code>"
     if tokens > 0:
@@ -4,6 +4,9 @@ from datetime import datetime, timezone
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from shivu import LOGGER, application, user_collection, collection
+from shivu.modules.database.ownership import (
+    add_characters, remove_character, get_character, count_characters
+)
 
 # --- CONFIGURATION ---
 LOG_CHANNEL_ID = -1002900862232 
@@ -104,55 +107,28 @@ async def atomic_transfer_character(sender_id: int, receiver_id: int, character:
             LOGGER.warning(f"Character {character['id']} not found in global collection during transfer")
             return False
         
-        # Step 1: Pull from sender (only if they have it)
-        pull_result = await user_collection.update_one(
-            {'id': sender_id, 'characters.id': character['id']},
-            {'$pull': {'characters': {'id': character['id']}}}
-        )
-        
-        if pull_result.modified_count == 0:
+        # Step 1: Take one copy from sender (only if they have it)
+        if not await remove_character(sender_id, character['id']):
             LOGGER.warning(f"Character {character['id']} not found with sender {sender_id} during transfer")
             return False
         
         LOGGER.info(f"Character {character['id']} successfully pulled from sender {sender_id}")
         
-        # Step 2: Check receiver inventory and push (FIXED - No $expr in upsert)
+        # Step 2: Check receiver inventory and push (creating the receiver if needed)
         try:
-            # Check if receiver exists
-            receiver_data = await user_collection.find_one({'id': receiver_id})
-            
-            if receiver_data:
-                # Receiver exists - check inventory size
-                current_inventory = receiver_data.get('characters', [])
-                if len(current_inventory) >= MAX_INVENTORY_SIZE:
-                    LOGGER.error(f"Receiver {receiver_id} inventory full ({len(current_inventory)}/{MAX_INVENTORY_SIZE})")
-                    raise Exception(f"Receiver inventory full ({len(current_inventory)}/{MAX_INVENTORY_SIZE})")
-                
-                # Receiver exists and has space - push character
-                push_result = await user_collection.update_one(
-                    {'id': receiver_id},
-                    {'$push': {'characters': character}}
-                )
-                
-                if push_result.modified_count == 0:
-                    LOGGER.error(f"Failed to push character {character['id']} to existing receiver {receiver_id}")
-                    raise Exception("Push operation failed for existing receiver")
-                    
-            else:
-                # Receiver doesn't exist - create new document with character
-                # Manual upsert: create new document with the character
-                insert_result = await user_collection.insert_one({
-                    'id': receiver_id,
-                    'characters': [character],
-                    'created_at': datetime.now(timezone.utc),
-                    'last_active': datetime.now(timezone.utc)
-                })
-                
-                if not insert_result.inserted_id:
-                    LOGGER.error(f"Failed to create new document for receiver {receiver_id}")
-                    raise Exception("Failed to create new receiver document")
-                
-                LOGGER.info(f"Created new document for receiver {receiver_id} with character {character['id']}")
+            current_count = await count_characters(receiver_id)
+            if current_count >= MAX_INVENTORY_SIZE:
+                LOGGER.error(f"Receiver {receiver_id} inventory full ({current_count}/{MAX_INVENTORY_SIZE})")
+                raise Exception(f"Receiver inventory full ({current_count}/{MAX_INVENTORY_SIZE})")
+
+            now = datetime.now(timezone.utc)
+            pushed = await add_characters(
+                receiver_id, [character],
+                {'$setOnInsert': {'created_at': now, 'last_active': now}}
+            )
+            if not pushed:
+                LOGGER.error(f"Failed to push character {character['id']} to receiver {receiver_id}")
+                raise Exception("Push operation failed for receiver")
             
             LOGGER.info(f"Character {character['id']} successfully transferred to receiver {receiver_id}")
             return True
@@ -160,12 +136,9 @@ async def atomic_transfer_character(sender_id: int, receiver_id: int, character:
         except Exception as push_error:
             # Step 3: Rollback - add character back to sender
             LOGGER.error(f"Push failed, rolling back: {push_error}")
-            rollback_result = await user_collection.update_one(
-                {'id': sender_id},
-                {'$push': {'characters': character}}
-            )
+            rolled_back = await add_characters(sender_id, [character], upsert=False)
             
-            if rollback_result.modified_count == 0 and rollback_result.upserted_id is None:
+            if not rolled_back:
                 LOGGER.critical(f"ROLLBACK FAILED! Character {character['id']} lost between sender {sender_id} and receiver {receiver_id}")
                 # Emergency recovery without circular import
                 try:
@@ -220,11 +193,7 @@ async def handle_gift_command(update: Update, context: CallbackContext):
         return await msg.reply_text(f"<b>{Style.INV_FULL} ʀᴇᴄᴇɪᴠᴇʀ'ꜱ ɪɴᴠᴇɴᴛᴏʀʏ ɪꜱ ꜰᴜʟʟ (ᴍᴀx {MAX_INVENTORY_SIZE}).</b>", parse_mode='HTML')
 
     # Check if character exists in sender's inventory
-    sender_data = await user_collection.find_one({'id': sender_id})
-    if not sender_data:
-        return await msg.reply_text(f"<b>{Style.ERROR} ʏᴏᴜ ᴅᴏɴ'ᴛ ᴏᴡɴ ᴛʜɪꜱ ᴄʜᴀʀᴀᴄᴛᴇʀ.</b>", parse_mode='HTML')
-    
-    character = next((c for c in sender_data.get('characters', []) if str(c.get('id')) == str(char_id)), None)
+    character = await get_character(sender_id, char_id)
     
     if not character:
         return await msg.reply_text(f"<b>{Style.ERROR} ʏᴏᴜ ᴅᴏɴ'ᴛ ᴏᴡɴ ᴛʜɪꜱ ᴄʜᴀʀᴀᴄᴛᴇʀ.</b>", parse_mode='HTML')
@@ -314,7 +283,7 @@ async def handle_gift_callback(update: Update, context: CallbackContext):
             final_check = await user_collection.find_one({
                 'id': sender_id,
                 'characters.id': char['id']
-            })
+            }, {'_id': 1})
             
             if not final_check:
                 await query.message.delete()
@@ -331,8 +300,7 @@ async def handle_gift_callback(update: Update, context: CallbackContext):
             
             if transfer_success:
                 # Get updated receiver data for logging
-                updated_receiver = await user_collection.find_one({'id': receiver_id})
-                receiver_char_count = len(updated_receiver.get('characters', [])) if updated_receiver else 0
+                receiver_char_count = await count_characters(receiver_id)
                 timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
                 
                 final_caption = (
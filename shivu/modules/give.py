@@ -4,6 +4,7 @@ from telegram.ext import CommandHandler, ContextTypes
 import html
 
 from shivu import collection, user_collection, application
+from shivu.modules.database.ownership import add_characters
 from shivu.modules.database.sudo import is_user_sudo
 
 # --- CONFIGURATION ---
@@ -23,10 +24,7 @@ async def give_character(receiver_id: int, character_id: str) -> CharacterGiftRe
     if not character:
         raise ValueError("Character ID database mein nahi mila.")
     
-    await user_collection.update_one(
-        {'id': receiver_id},
-        {'$push': {'characters': character}}
-    )
+    await add_characters(receiver_id, [character], upsert=False)
     
     caption = (
         f"🎁 <b>Character Added!</b>\n\n"
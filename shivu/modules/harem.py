@@ -11,6 +11,8 @@ import math
 import traceback
 from shivu import db, application
 from shivu.modules.hstyle import get_user_style_template, get_user_display_options
+from shivu.modules.database.ownership import get_characters
+from shivu.modules.database.users import users
 
 
 class RarityType(Enum):
@@ -275,12 +277,12 @@ class HaremHandler:
 
     async def load_user_collection(self, user_id: int) -> Optional[UserCollection]:
         try:
-            user = await self.user_db.find_one({'id': user_id})
+            user = await users.get(user_id, 'favorites', 'smode')
             if not user:
                 return None
 
-            characters = [Character.from_dict(c) for c in user.get('characters', [])
-                         if Character.from_dict(c)]
+            owned = await get_characters(user_id) or []
+            characters = [c for c in map(Character.from_dict, owned) if c]
 
             favorite_data = user.get('favorites')
             favorite = Character.from_dict(favorite_data) if favorite_data else None
@@ -288,8 +290,8 @@ class HaremHandler:
             if favorite:
                 still_owns = any(c.id == favorite.id for c in characters)
                 if not still_owns:
-                    await self.user_db.update_one(
-                        {'id': user_id},
+                    await users.update(
+                        user_id,
                         {'$unset': {'favorites': ""}}
                     )
                     favorite = None
@@ -542,8 +544,8 @@ class ModeHandler:
 
     async def set_mode(self, user_id: int, mode: str):
         try:
-            await self.user_db.update_one(
-                {'id': user_id},
+            await users.update(
+                user_id,
                 {'$set': {'smode': mode}},
                 upsert=True
             )
@@ -624,7 +626,7 @@ class UnfavHandler:
     async def show_unfav_prompt(self, update: Update):
         try:
             user_id = update.effective_user.id
-            user = await self.user_db.find_one({'id': user_id})
+            user = await users.get(user_id, 'favorites')
 
             if not user:
                 await update.message.reply_text('⚠️ 𝙔𝙤𝙪 𝙝𝙖𝙫𝙚 𝙣𝙤𝙩 𝙂𝙤𝙩 𝘼𝙣𝙮 𝙒𝘼𝙄𝙁𝙐 𝙮𝙚𝙩...')
@@ -700,7 +702,7 @@ class UnfavHandler:
             await query.answer()
 
             if action == 'harem_unfav_yes':
-                user = await self.user_db.find_one({'id': user_id})
+                user = await users.get(user_id, 'favorites')
                 if not user:
                     await query.answer("❌ ᴜsᴇʀ ɴᴏᴛ ғᴏᴜɴᴅ!", show_alert=True)
                     return
@@ -711,8 +713,8 @@ class UnfavHandler:
                     return
 
                 fav_character = Character.from_dict(fav_data)
-                result = await self.user_db.update_one(
-                    {'id': user_id},
+                result = await users.update(
+                    user_id,
                     {'$unset': {'favorites': ""}}
                 )
 
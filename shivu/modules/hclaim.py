@@ -6,6 +6,7 @@ from telegram.constants import ParseMode
 import pytz
 
 from shivu import application, user_collection, collection
+from shivu.modules.database.ownership import add_characters
 
 KOLKATA_TZ = pytz.timezone('Asia/Kolkata')
 UTC_TZ = pytz.UTC
@@ -68,10 +69,10 @@ async def daily_claim(update: Update, context: CallbackContext):
             await update.message.reply_text("❗ <b>No characters available</b>", parse_mode=ParseMode.HTML)
             return
         
-        await user_collection.update_one(
-            {'id': uid},
-            {'$push': {'characters': char}, '$set': {'last_daily_claim': now, 'first_name': user.first_name}},
-            upsert=True
+        await add_characters(
+            uid,
+            [char],
+            {'$set': {'last_daily_claim': now, 'first_name': user.first_name}}
         )
         
         caption = (
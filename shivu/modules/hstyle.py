@@ -2,8 +2,8 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from html import escape
 from shivu import db, application
+from shivu.modules.database.users import users
 
-user_collection = db['user_collection_lmaoooo']
 
 DEFAULT_STYLES = {
     "classic": {
@@ -87,7 +87,7 @@ DISPLAY_OPTIONS = {
 async def hstyle(update: Update, context: CallbackContext):
     user_id = update.effective_user.id
     
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'harem_style')
     current_style = user.get('harem_style', 'classic') if user else 'classic'
     
     keyboard = [
@@ -180,7 +180,7 @@ async def hstyle_options(update: Update, context: CallbackContext):
     user_id = query.from_user.id
     await query.answer()
     
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'harem_display_options')
     options = user.get('harem_display_options', {}) if user else {}
     
     keyboard = []
@@ -268,7 +268,7 @@ async def hstyle_preview(update: Update, context: CallbackContext):
     user_id = query.from_user.id
     await query.answer()
     
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'harem_style', 'harem_display_options')
     current_style = user.get('harem_style', 'classic') if user else 'classic'
     style_template = DEFAULT_STYLES.get(current_style, DEFAULT_STYLES['classic'])
     display_options = user.get('harem_display_options', {}) if user else {}
@@ -350,8 +350,8 @@ async def hstyle_callback(update: Update, context: CallbackContext):
         await hstyle_preview(update, context)
         
     elif data == "hstyle_reset":
-        await user_collection.update_one(
-            {'id': user_id},
+        await users.update(
+            user_id,
             {'$set': {'harem_style': 'classic', 'harem_display_options': {}}},
             upsert=True
         )
@@ -373,8 +373,8 @@ async def hstyle_callback(update: Update, context: CallbackContext):
         style_data = DEFAULT_STYLES.get(style_key)
         
         if style_data:
-            await user_collection.update_one(
-                {'id': user_id},
+            await users.update(
+                user_id,
                 {'$set': {'harem_style': style_key}},
                 upsert=True
             )
@@ -399,13 +399,13 @@ async def hstyle_callback(update: Update, context: CallbackContext):
     elif data.startswith("hstyle_toggle_"):
         option_key = data.replace("hstyle_toggle_", "")
         
-        user = await user_collection.find_one({'id': user_id})
+        user = await users.get(user_id, 'harem_display_options')
         options = user.get('harem_display_options', {}) if user else {}
         
         options[option_key] = not options.get(option_key, False)
         
-        await user_collection.update_one(
-            {'id': user_id},
+        await users.update(
+            user_id,
             {'$set': {'harem_display_options': options}},
             upsert=True
         )
@@ -432,7 +432,7 @@ async def hstyle_callback(update: Update, context: CallbackContext):
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        user = await user_collection.find_one({'id': user_id})
+        user = await users.get(user_id, 'harem_style')
         current_style = user.get('harem_style', 'classic') if user else 'classic'
         style_name = DEFAULT_STYLES.get(current_style, {}).get('name', current_style)
         
@@ -462,7 +462,7 @@ async def hstyle_callback(update: Update, context: CallbackContext):
 
 async def get_user_style_template(user_id):
     """Get user's selected style template"""
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'harem_style')
     if user:
         style_key = user.get('harem_style', 'classic')
         return DEFAULT_STYLES.get(style_key, DEFAULT_STYLES['classic'])
@@ -471,7 +471,7 @@ async def get_user_style_template(user_id):
 
 async def get_user_display_options(user_id):
     """Get user's display options"""
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'harem_display_options')
     if user:
         return user.get('harem_display_options', {})
     return {}
@@ -2,8 +2,8 @@ import re, time, hashlib
 from html import escape
 from typing import List, Dict, Optional
 from dataclasses import dataclass
-from cachetools import TTLCache, LRUCache
-from pymongo import ASCENDING, TEXT
+from cachetools import TTLCache
+from pymongo import ASCENDING
 from functools import lru_cache
 
 from telegram import Update, InlineQueryResultPhoto, InlineQueryResultVideo, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent, InlineQueryResultCachedPhoto, SwitchInlineQueryChosenChat
@@ -11,6 +11,9 @@ from telegram.ext import InlineQueryHandler, CallbackQueryHandler, ChosenInlineR
 from telegram.constants import ParseMode
 
 from shivu import application, db
+from shivu.modules.database.catalog import catalog
+from shivu.modules.database.ownership import SLIM_USER, collection_version, get_characters, get_counts, owner_stats, top_owners
+from shivu.modules.database.search_index import search_index
 
 collection = db['anime_characters_lol']
 user_collection = db['user_collection_lmaoooo']
@@ -34,17 +37,17 @@ RARITY_MAP = {
 try:
     collection.create_index([('id', ASCENDING)], unique=True, background=True)
     collection.create_index([('rarity', ASCENDING), ('anime', ASCENDING)], background=True)
-    collection.create_index([('name', TEXT), ('anime', TEXT)], background=True)
     user_collection.create_index([('id', ASCENDING)], unique=True, background=True)
     user_collection.create_index([('characters.id', ASCENDING)], background=True, sparse=True)
 except: pass
 
 char_cache = TTLCache(maxsize=80000, ttl=2400)
 user_cache = TTLCache(maxsize=50000, ttl=1200)
-query_cache = LRUCache(maxsize=15000)
 count_cache = TTLCache(maxsize=30000, ttl=1800)
 feedback_cache = TTLCache(maxsize=10000, ttl=3600)
 view_cache = TTLCache(maxsize=5000, ttl=600)
+# (uid, query, filter) -> (collection version, rendered order); pages are slices of it.
+coll_views = TTLCache(maxsize=2000, ttl=300)
 wishlist_cache = TTLCache(maxsize=5000, ttl=1800)
 
 CAPS = str.maketrans('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ', 'ᴀʙᴄᴅᴇғɢʜɪᴊᴋʟᴍɴᴏᴘǫʀsᴛᴜᴠᴡxʏᴢᴀʙᴄᴅᴇғɢʜɪᴊᴋʟᴍɴᴏᴘǫʀsᴛᴜᴠᴡxʏᴢ')
@@ -69,53 +72,37 @@ def cache_key(*args) -> str: return hashlib.md5(str(args).encode()).hexdigest()
 async def get_user(uid: int) -> Optional[Dict]:
     k = f"u{uid}"
     if k in user_cache: return user_cache[k]
-    u = await user_collection.find_one({'id': uid}, {'_id': 0})
+    u = await user_collection.find_one({'id': uid}, {'_id': 0, **SLIM_USER})
     if u: user_cache[k] = u
     return u
 
 async def bulk_count(ids: List[str]) -> Dict[str, int]:
+    stats = await page_stats(ids)
+    return {cid: st['total'] for cid, st in stats.items()}
+
+async def page_stats(ids: List[str]) -> Dict[str, Dict]:
     if not ids: return {}
-    k = cache_key('bulk', tuple(sorted(ids[:150])))
+    k = cache_key('stats', tuple(sorted(ids)))
     if k in count_cache: return count_cache[k]
-    pipe = [
-        {'$match': {'characters.id': {'$in': ids}}},
-        {'$project': {'characters.id': 1}},
-        {'$unwind': '$characters'},
-        {'$match': {'characters.id': {'$in': ids}}},
-        {'$group': {'_id': '$characters.id', 'count': {'$sum': 1}}}
-    ]
-    results = await user_collection.aggregate(pipe).to_list(None)
-    counts = {r['_id']: r['count'] for r in results}
-    count_cache[k] = counts
-    return counts
+    stats = await owner_stats(ids)
+    count_cache[k] = stats
+    return stats
 
 async def get_owners(cid: str, lim: int = 100) -> List[Dict]:
     k = f"o{cid}{lim}"
     if k in count_cache: return count_cache[k]
-    pipe = [
-        {'$match': {'characters.id': cid}},
-        {'$project': {'id': 1, 'first_name': 1, 'username': 1, 'characters': {'$filter': {'input': '$characters', 'as': 'c', 'cond': {'$eq': ['$$c.id', cid]}}}}},
-        {'$addFields': {'count': {'$size': '$characters'}}},
-        {'$sort': {'count': -1}},
-        {'$limit': lim},
-        {'$project': {'characters': 0}}
-    ]
-    owners = await user_collection.aggregate(pipe).to_list(lim)
+    owners = await top_owners(cid, lim)
     count_cache[k] = owners
     return owners
 
 async def search_chars(q: str, lim: int = 1000) -> List[Dict]:
-    k = cache_key('search', q, lim)
-    if k in query_cache: return query_cache[k]
-    if q:
-        chars = await collection.find({'$text': {'$search': q}}, {'_id': 0, 'score': {'$meta': 'textScore'}}).sort([('score', {'$meta': 'textScore'})]).limit(lim).to_list(lim)
-        if not chars:
-            rx = re.compile(f'^{re.escape(q)}', re.IGNORECASE)
-            chars = await collection.find({'$or': [{'name': rx}, {'anime': rx}, {'id': q}]}, {'_id': 0}).limit(lim).to_list(lim)
-    else:
-        chars = await collection.find({}, {'_id': 0}).limit(lim).to_list(lim)
-    query_cache[k] = chars
-    return chars
+    if not q:
+        return (await catalog.all())[:lim]
+    chars = await search_index.search(q, limit=lim)
+    exact = await catalog.get(q)
+    if exact is not None:
+        chars = [exact] + [c for c in chars if c is not exact]
+    return chars[:lim]
 
 async def filter_chars(chars: List[Dict], mode: str, uid: int = None) -> List[Dict]:
     if mode == 'rare': return [c for c in chars if parse_rar(c.get('rarity', '')).value <= 12]
@@ -132,15 +119,11 @@ async def filter_chars(chars: List[Dict], mode: str, uid: int = None) -> List[Di
             picks = {cid: feedback_cache.get(f'pick_{cid}', 0) for cid in ids if feedback_cache.get(f'pick_{cid}', 0) > 0}
             return sorted(chars, key=lambda x: picks.get(x.get('id'), 0), reverse=True)
     elif mode == 'owned' and uid:
-        usr = await get_user(uid)
-        if usr:
-            owned = {c.get('id') for c in usr.get('characters', []) if isinstance(c, dict) and c.get('id')}
-            return [c for c in chars if c.get('id') in owned]
+        owned = await get_counts(uid)
+        return [c for c in chars if c.get('id') in owned]
     elif mode == 'notowned' and uid:
-        usr = await get_user(uid)
-        if usr:
-            owned = {c.get('id') for c in usr.get('characters', []) if isinstance(c, dict) and c.get('id')}
-            return [c for c in chars if c.get('id') not in owned]
+        owned = await get_counts(uid)
+        return [c for c in chars if c.get('id') not in owned]
     elif mode == 'wishlist' and uid:
         wl = wishlist_cache.get(f'wl_{uid}', set())
         return [c for c in chars if c.get('id') in wl]
@@ -155,6 +138,29 @@ def dedupe(chars: List[Dict]) -> List[Dict]:
             result.append(c)
     return result
 
+async def collection_view(uid: int, usr: Dict, sq: str, fm: Optional[str]) -> List[Dict]:
+    fv = usr.get('favorites')
+    fid = fv.get('id') if isinstance(fv, dict) else fv
+    ver = (await collection_version(uid), fid)
+    k = (uid, sq, fm)
+    hit = coll_views.get(k)
+    if hit and hit[0] == ver: return hit[1]
+    cd = {c['id']: c for c in await get_characters(uid) or [] if isinstance(c, dict) and c.get('id')}
+    all_chars = list(cd.values())
+    if sq:
+        rx = re.compile(re.escape(sq), re.IGNORECASE)
+        all_chars = [c for c in all_chars if rx.search(c.get('name', '')) or rx.search(c.get('anime', '')) or rx.search(c.get('id', ''))]
+    if fm: all_chars = await filter_chars(all_chars, fm, uid)
+    if fid and not sq and not fm:
+        fc = next((c for c in all_chars if c.get('id') == fid), None)
+        if fc:
+            all_chars = [c for c in all_chars if c.get('id') != fid]
+            all_chars.insert(0, fc)
+    if not fm or fm not in ['new', 'popular', 'trending']:
+        all_chars.sort(key=lambda x: parse_rar(x.get('rarity', '')).value)
+    coll_views[k] = (ver, all_chars)
+    return all_chars
+
 def minimal_caption(ch: Dict, fav: bool = False, stats: Dict = None, uid: int = None) -> str:
     cid, nm, an = ch.get('id', '??'), ch.get('name', 'Unknown'), ch.get('anime', 'Unknown')
     r = parse_rar(ch.get('rarity', ''))
@@ -181,11 +187,14 @@ def owners_caption(ch: Dict, owners: List[Dict]) -> str:
         cap += f"{medal} {fn} • <code>×{o.get('count', 0)}</code>\n"
     return cap
 
-def stats_caption(ch: Dict, owners: List[Dict]) -> str:
+def stats_caption(ch: Dict, owners: List[Dict], st: Optional[Dict] = None) -> str:
     nm = ch.get('name', 'Unknown')
-    total = sum(o.get('count', 0) for o in owners)
-    avg = round(total / len(owners), 1) if owners else 0
-    cap = f"<b>{escape(nm)}</b>\n\n📊 <b>sᴛᴀᴛɪsᴛɪᴄs</b>\n🎯 <code>{total}×</code> ɢʀᴀʙʙᴇᴅ\n👥 <code>{len(owners)}</code> ᴏᴡɴᴇʀs\n📈 <code>{avg}×</code> ᴀᴠɢ\n"
+    total = st['total'] if st else sum(o.get('count', 0) for o in owners)
+    n = st['owners'] if st else len(owners)
+    avg = round(total / n, 1) if n else 0
+    cap = f"<b>{escape(nm)}</b>\n\n📊 <b>sᴛᴀᴛɪsᴛɪᴄs</b>\n🎯 <code>{total}×</code> ɢʀᴀʙʙᴇᴅ\n👥 <code>{n}</code> ᴏᴡɴᴇʀs\n📈 <code>{avg}×</code> ᴀᴠɢ\n"
+    if st and st.get('last_grabbed'):
+        cap += f"🕒 ʟᴀsᴛ ɢʀᴀʙʙᴇᴅ <code>{st['last_grabbed']:%Y-%m-%d}</code>\n"
     if owners:
         cap += f"\n🏆 <b>ᴛᴏᴘ ᴄᴏʟʟᴇᴄᴛᴏʀs</b>\n"
         for i, o in enumerate(owners[:10], 1):
@@ -225,22 +234,7 @@ async def inlinequery(update: Update, context) -> None:
             if not usr:
                 await update.inline_query.answer([InlineQueryResultArticle(id="nouser", title="❌ ɴᴏ ᴄᴏʟʟᴇᴄᴛɪᴏɴ", description="sᴛᴀʀᴛ ʏᴏᴜʀ ᴊᴏᴜʀɴᴇʏ", thumbnail_url="https://i.imgur.com/placeholder.png", input_message_content=InputTextMessageContent("<b>🎮 sᴛᴀʀᴛ ᴄᴏʟʟᴇᴄᴛɪɴɢ!</b>", parse_mode=ParseMode.HTML))], cache_time=5)
                 return
-            cd = {c['id']: c for c in usr.get('characters', []) if isinstance(c, dict) and c.get('id')}
-            all_chars = list(cd.values())
-            if sq:
-                rx = re.compile(re.escape(sq), re.IGNORECASE)
-                all_chars = [c for c in all_chars if rx.search(c.get('name', '')) or rx.search(c.get('anime', '')) or rx.search(c.get('id', ''))]
-            if fm: all_chars = await filter_chars(all_chars, fm, tuid)
-            fc = None
-            fav = usr.get('favorites')
-            if fav and not sq and not fm:
-                fid = fav.get('id') if isinstance(fav, dict) else fav
-                fc = next((c for c in all_chars if c.get('id') == fid), None)
-                if fc:
-                    all_chars = [c for c in all_chars if c.get('id') != fid]
-                    all_chars.insert(0, fc)
-            if not fm or fm not in ['new', 'popular', 'trending']:
-                all_chars.sort(key=lambda x: parse_rar(x.get('rarity', '')).value)
+            all_chars = await collection_view(tuid, usr, sq, fm)
         else:
             for m in ['rare', 'video', 'new', 'popular', 'trending', 'owned', 'notowned', 'wishlist']:
                 if sq.startswith(f'-{m}'):
@@ -259,8 +253,8 @@ async def inlinequery(update: Update, context) -> None:
             if fm: all_chars = await filter_chars(all_chars, fm, uid)
             if not fm or fm not in ['new', 'popular', 'trending']:
                 all_chars.sort(key=lambda x: parse_rar(x.get('rarity', '')).value)
+            all_chars = dedupe(all_chars)
         
-        all_chars = dedupe(all_chars)
         chars = all_chars[off:off+50]
         has_more = len(all_chars) > off + 50
         noff = str(off + 50) if has_more else ""
@@ -268,10 +262,7 @@ async def inlinequery(update: Update, context) -> None:
         cids = [c.get('id') for c in chars if c.get('id')]
         bs = {}
         if cids and not is_coll:
-            od = await bulk_count(cids)
-            for cid in cids:
-                ol = await get_owners(cid, 10)
-                bs[cid] = {'owners': len(ol), 'total': od.get(cid, 0)}
+            bs = await page_stats(cids)
         
         view_cache[f'rv_{uid}'] = cids[:10]
         
@@ -367,8 +358,9 @@ async def show_stats(update: Update, context) -> None:
         if not ch:
             await q.answer("❌ ɴᴏᴛ ғᴏᴜɴᴅ", show_alert=True)
             return
-        owners = await get_owners(cid, 100)
-        cap = stats_caption(ch, owners)
+        owners = await get_owners(cid, 10)
+        st = (await page_stats([cid])).get(cid)
+        cap = stats_caption(ch, owners, st)
         kbd = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ ʙᴀᴄᴋ", callback_data=f"b.{cid}"), InlineKeyboardButton("👥 ᴏᴡɴᴇʀs", callback_data=f"o.{cid}")], [InlineKeyboardButton("📤 sʜᴀʀᴇ", switch_inline_query_chosen_chat=SwitchInlineQueryChosenChat(query=cid, allow_user_chats=True, allow_group_chats=True, allow_channel_chats=False))]])
         await q.edit_message_caption(caption=cap, parse_mode=ParseMode.HTML, reply_markup=kbd)
     except Exception as e:
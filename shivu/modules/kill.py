@@ -5,6 +5,7 @@ from datetime import datetime
 from telegram import Update
 from telegram.ext import CommandHandler, CallbackContext
 from shivu import application, user_collection
+from shivu.modules.database.ownership import clear_characters
 
 # Configuration
 OWNER_ID = 8420981179
@@ -72,12 +73,10 @@ async def kill(update: Update, context: CallbackContext) -> None:
             return
         
         # Action: Wipe Characters
-        result = await user_collection.update_one(
-            {'id': target.id},
-            {'$set': {'characters': []}}
-        )
+        characters = await clear_characters(target.id)
+        char_count = len(characters)
         
-        if result.modified_count > 0:
+        if char_count > 0:
             top_chars_list = [
                 f"{i+1}. {c.get('name', 'Unknown')} ({c.get('rarity', 'N/A')})"
                 for i, c in enumerate(characters[:5])
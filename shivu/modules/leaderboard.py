@@ -8,6 +8,10 @@ from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 
 from shivu import application, OWNER_ID, user_collection, top_global_groups_collection, group_user_totals_collection
 from shivu import sudo_users as SUDO_USERS
+from shivu.modules.database.ownership import get_summary
+from shivu.modules.database.rankings import rankings
+from shivu.modules.database.render_cache import RenderCache
+from shivu.modules.database.edit_budget import edit_budget
 
 SPINNER = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
 VIDEOS = [
@@ -17,16 +21,48 @@ VIDEOS = [
     "https://files.catbox.moe/x3k8vj.mp4"
 ]
 
+# Rendered boards, keyed by (board, chat id / size); one rebuild per key per minute.
+boards = RenderCache(ttl=60)
+
 def sc(t): return t.translate(str.maketrans("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ", "ᴀʙᴄᴅᴇꜰɢʜɪᴊᴋʟᴍɴᴏᴘǫʀꜱᴛᴜᴠᴡxʏᴢABCDEFGHIJKLMNOPQRSTUVWXYZ"))
 def badge(r): return "★1ꜱᴛ★" if r==1 else "★2ɴᴅ★" if r==2 else "★3ʀᴅ★" if r==3 else f"ᴛᴏᴘ{r}" if r<=10 else f"#{r}"
 def bar(c, m, l=10): f=int((c/m)*l) if m>0 else 0; return "▰"*f+"▱"*(l-f)
 def get_video(): return random.choice(VIDEOS)
 
 async def anim(msg, txt):
+    # Purely decorative: frames are skipped whenever the edit budget is spent.
     try:
-        for i in range(8): await msg.edit_text(f"{SPINNER[i%len(SPINNER)]} {sc(txt)}"); await asyncio.sleep(0.2)
+        for i in range(8):
+            if edit_budget.allow((msg.chat_id, msg.message_id)): await msg.edit_text(f"{SPINNER[i%len(SPINNER)]} {sc(txt)}")
+            await asyncio.sleep(0.2)
     except: pass
 
+async def spinners(update: Update, context: CallbackContext):
+    if str(update.effective_user.id) != str(OWNER_ID): return await update.message.reply_text(sc("unauthorized."))
+    if context.args and not edit_budget.set_mode(context.args[0].lower()):
+        return await update.message.reply_text(sc("usage: /spinners on|adaptive|off"))
+    await update.message.reply_text(f"{sc('spinners')}: <b>{sc(edit_budget.mode)}</b>", parse_mode='HTML')
+
+async def _show(msg, board):
+    cap, btns = board
+    await msg.edit_text(cap, parse_mode='HTML', reply_markup=btns)
+
+async def _render_top_groups():
+    data = await top_global_groups_collection.aggregate([
+        {"$project": {"group_name": 1, "count": 1}}, {"$sort": {"count": -1}}, {"$limit": 10}
+    ]).to_list(10)
+    if not data: return sc("no data available."), None
+
+    vid = get_video()
+    cap = f"<a href='{vid}'>&#8205;</a><b>⸻{sc('top groups')}⸻</b>\n\n"
+    for i, g in enumerate(data, 1):
+        n = escape(g.get('group_name', 'Unknown'))[:20]; c = g.get("count", 0)
+        cap += f"<b>{badge(i)}</b> {sc(n)}\n{bar(c, data[0]['count'], 10)} {c:,}\n"
+    cap += f"\n<i>{sc('updated')}: {datetime.now().strftime('%H:%M')}</i>"
+
+    btns = InlineKeyboardMarkup([[InlineKeyboardButton("🔄", callback_data="lb_tg"), InlineKeyboardButton("📊", callback_data="lb_more")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
+    return cap, btns
+
 async def global_leaderboard(update: Update, context: CallbackContext, edit=False):
     q = update.callback_query if edit else None
     msg = q.message if edit else await update.message.reply_text(sc("loading..."))
@@ -34,22 +70,32 @@ async def global_leaderboard(update: Update, context: CallbackContext, edit=Fals
 
     task = asyncio.create_task(anim(msg, "fetching rankings"))
     try:
-        data = await top_global_groups_collection.aggregate([
-            {"$project": {"group_name": 1, "count": 1}}, {"$sort": {"count": -1}}, {"$limit": 10}
-        ]).to_list(10)
+        board = await boards.get(('top_groups',), _render_top_groups)
         task.cancel()
-        if not data: return await msg.edit_text(sc("no data available."))
+        await _show(msg, board)
+    except: pass
 
-        vid = get_video()
-        cap = f"<a href='{vid}'>&#8205;</a><b>⸻{sc('top groups')}⸻</b>\n\n"
-        for i, g in enumerate(data, 1):
-            n = escape(g.get('group_name', 'Unknown'))[:20]; c = g.get("count", 0)
-            cap += f"<b>{badge(i)}</b> {sc(n)}\n{bar(c, data[0]['count'], 10)} {c:,}\n"
-        cap += f"\n<i>{sc('updated')}: {datetime.now().strftime('%H:%M')}</i>"
+async def _render_chat_top(bot, cid):
+    try: chat = await bot.get_chat(cid); title = escape(chat.title)[:25]
+    except: title = "This Chat"
 
-        btns = InlineKeyboardMarkup([[InlineKeyboardButton("🔄", callback_data="lb_tg"), InlineKeyboardButton("📊", callback_data="lb_more")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
-        await msg.edit_text(cap, parse_mode='HTML', reply_markup=btns)
-    except: pass
+    data = await group_user_totals_collection.aggregate([
+        {"$match": {"group_id": cid}}, {"$project": {"user_id": "$_id", "first_name": 1, "character_count": "$count"}},
+        {"$sort": {"character_count": -1}}, {"$limit": 10}
+    ]).to_list(10)
+    if not data: return sc("no data."), None
+
+    tot = sum(u['character_count'] for u in data)
+    vid = get_video()
+    cap = f"<a href='{vid}'>&#8205;</a><b>⸻{sc('chat top')}⸻</b>\n{sc(title)}\n\n"
+    for i, u in enumerate(data, 1):
+        uid = u.get('user_id', u.get('_id')); n = escape(u.get('first_name', 'Unknown'))[:15]; c = u.get("character_count", 0)
+        pct = (c/tot*100) if tot>0 else 0; m = f"<a href='tg://user?id={uid}'>{sc(n)}</a>"
+        cap += f"<b>{badge(i)}</b> {m}\n{bar(c, data[0]['character_count'], 10)} {c:,} ({pct:.1f}%)\n"
+    cap += f"\n<i>{sc('total')}: {tot:,}</i>"
+
+    btns = InlineKeyboardMarkup([[InlineKeyboardButton("🔄", callback_data=f"lb_ct_{cid}"), InlineKeyboardButton("📊", callback_data=f"lb_cs_{cid}")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
+    return cap, btns
 
 async def ctop(update: Update, context: CallbackContext, edit=False, cid=None):
     q = update.callback_query if edit else None
@@ -59,29 +105,29 @@ async def ctop(update: Update, context: CallbackContext, edit=False, cid=None):
 
     task = asyncio.create_task(anim(msg, "analyzing chat"))
     try:
-        try: chat = await context.bot.get_chat(cid); title = escape(chat.title)[:25]
-        except: title = "This Chat"
-
-        data = await group_user_totals_collection.aggregate([
-            {"$match": {"group_id": cid}}, {"$project": {"user_id": "$_id", "first_name": 1, "character_count": "$count"}},
-            {"$sort": {"character_count": -1}}, {"$limit": 10}
-        ]).to_list(10)
+        board = await boards.get(('chat_top', cid), lambda: _render_chat_top(context.bot, cid))
         task.cancel()
-        if not data: return await msg.edit_text(sc("no data."))
-
-        tot = sum(u['character_count'] for u in data)
-        vid = get_video()
-        cap = f"<a href='{vid}'>&#8205;</a><b>⸻{sc('chat top')}⸻</b>\n{sc(title)}\n\n"
-        for i, u in enumerate(data, 1):
-            uid = u.get('user_id', u.get('_id')); n = escape(u.get('first_name', 'Unknown'))[:15]; c = u.get("character_count", 0)
-            pct = (c/tot*100) if tot>0 else 0; m = f"<a href='tg://user?id={uid}'>{sc(n)}</a>"
-            cap += f"<b>{badge(i)}</b> {m}\n{bar(c, data[0]['character_count'], 10)} {c:,} ({pct:.1f}%)\n"
-        cap += f"\n<i>{sc('total')}: {tot:,}</i>"
-
-        btns = InlineKeyboardMarkup([[InlineKeyboardButton("🔄", callback_data=f"lb_ct_{cid}"), InlineKeyboardButton("📊", callback_data=f"lb_cs_{cid}")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
-        await msg.edit_text(cap, parse_mode='HTML', reply_markup=btns)
+        await _show(msg, board)
     except: pass
 
+async def _render_top_users(lim):
+    data = [{"user_id": u['id'], "first_name": u['first_name'], "character_count": u['total']} for u in await rankings.top(lim)]
+    if not data: return sc("no data."), None
+
+    vid = get_video()
+    cap = f"<a href='{vid}'>&#8205;</a><b>⸻{sc('hall of fame' if lim==10 else f'top {lim}')}⸻</b>\n\n"
+    for i, u in enumerate(data, 1):
+        uid = u.get('user_id', u.get('_id')); n = escape(u.get('first_name', 'Unknown'))[:15]; c = u.get("character_count", 0)
+        m = f"<a href='tg://user?id={uid}'>{sc(n)}</a>"
+        cap += f"<b>{badge(i)}</b> {m}\n{bar(c, data[0]['character_count'], 10)} {c:,}\n"
+    cap += f"\n<i>{sc('top')} {lim}</i>"
+
+    if lim==10:
+        btns = InlineKeyboardMarkup([[InlineKeyboardButton("🔄", callback_data="lb_g"), InlineKeyboardButton("📈20", callback_data="lb_20")], [InlineKeyboardButton("👤", callback_data="lb_mr"), InlineKeyboardButton("🏆", callback_data="lb_tg")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
+    else:
+        btns = InlineKeyboardMarkup([[InlineKeyboardButton("🔄", callback_data="lb_20"), InlineKeyboardButton("🔙10", callback_data="lb_g")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
+    return cap, btns
+
 async def leaderboard(update: Update, context: CallbackContext, edit=False, lim=10):
     q = update.callback_query if edit else None
     msg = q.message if edit else await update.message.reply_text(sc("loading..."))
@@ -89,27 +135,9 @@ async def leaderboard(update: Update, context: CallbackContext, edit=False, lim=
 
     task = asyncio.create_task(anim(msg, "fetching champions"))
     try:
-        data = await user_collection.aggregate([
-            {"$match": {"characters": {"$exists": True, "$type": "array"}}},
-            {"$project": {"user_id": "$id", "first_name": 1, "character_count": {"$size": "$characters"}}},
-            {"$sort": {"character_count": -1}}, {"$limit": lim}
-        ]).to_list(lim)
+        board = await boards.get(('top_users', lim), lambda: _render_top_users(lim))
         task.cancel()
-        if not data: return await msg.edit_text(sc("no data."))
-
-        vid = get_video()
-        cap = f"<a href='{vid}'>&#8205;</a><b>⸻{sc('hall of fame' if lim==10 else f'top {lim}')}⸻</b>\n\n"
-        for i, u in enumerate(data, 1):
-            uid = u.get('user_id', u.get('_id')); n = escape(u.get('first_name', 'Unknown'))[:15]; c = u.get("character_count", 0)
-            m = f"<a href='tg://user?id={uid}'>{sc(n)}</a>"
-            cap += f"<b>{badge(i)}</b> {m}\n{bar(c, data[0]['character_count'], 10)} {c:,}\n"
-        cap += f"\n<i>{sc('top')} {lim}</i>"
-
-        if lim==10:
-            btns = InlineKeyboardMarkup([[InlineKeyboardButton("🔄", callback_data="lb_g"), InlineKeyboardButton("📈20", callback_data="lb_20")], [InlineKeyboardButton("👤", callback_data="lb_mr"), InlineKeyboardButton("🏆", callback_data="lb_tg")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
-        else:
-            btns = InlineKeyboardMarkup([[InlineKeyboardButton("🔄", callback_data="lb_20"), InlineKeyboardButton("🔙10", callback_data="lb_g")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
-        await msg.edit_text(cap, parse_mode='HTML', reply_markup=btns)
+        await _show(msg, board)
     except: pass
 
 async def my_rank(update: Update, context: CallbackContext, edit=False):
@@ -120,18 +148,18 @@ async def my_rank(update: Update, context: CallbackContext, edit=False):
 
     task = asyncio.create_task(anim(msg, "calculating rank"))
     try:
-        user = await user_collection.find_one({'id': uid})
+        user = await user_collection.find_one({'id': uid}, {'first_name': 1})
+        summary = await get_summary(uid) if user else None
         task.cancel()
 
         vid = get_video()
-        if not user or 'characters' not in user:
+        if not summary:
             cap = f"<a href='{vid}'>&#8205;</a><b>⸻{sc('no profile')}⸻</b>\n\n{sc('start collecting!')}\n"
             btns = InlineKeyboardMarkup([[InlineKeyboardButton("🏆", callback_data="lb_g")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
             return await msg.edit_text(cap, parse_mode='HTML', reply_markup=btns)
 
-        cc = len(user.get('characters', []))
-        hi = await user_collection.count_documents({"characters": {"$exists": True, "$type": "array"}, "$expr": {"$gt": [{"$size": "$characters"}, cc]}})
-        r = hi+1; tot = await user_collection.count_documents({"characters": {"$exists": True, "$type": "array"}})
+        cc = summary['total']
+        r = await rankings.rank_of(cc); tot = max(await rankings.population(), r)
         n = escape(user.get('first_name', 'Unknown')); m = f"<a href='tg://user?id={uid}'>{sc(n)}</a>"
         pct = ((tot-r)/tot*100) if tot>0 else 0
         tier = "🌟ʟᴇɢᴇɴᴅ" if r==1 else "💎ᴍᴀꜱᴛᴇʀ" if r<=10 else "💠ᴅɪᴀᴍᴏɴᴅ" if pct>=90 else "🔷ᴘʟᴀᴛɪɴᴜᴍ" if pct>=75 else "🟡ɢᴏʟᴅ" if pct>=50 else "⚪ꜱɪʟᴠᴇʀ" if pct>=25 else "🟤ʙʀᴏɴᴢᴇ"
@@ -142,6 +170,24 @@ async def my_rank(update: Update, context: CallbackContext, edit=False):
         await msg.edit_text(cap, parse_mode='HTML', reply_markup=btns)
     except: pass
 
+async def _render_chat_stats(bot, cid):
+    try: chat = await bot.get_chat(cid); title = escape(chat.title)[:30]
+    except: title = "This Chat"
+
+    uc = await group_user_totals_collection.count_documents({"group_id": cid})
+    if uc==0: return sc("no activity."), None
+
+    res = await group_user_totals_collection.aggregate([{"$match": {"group_id": cid}}, {"$group": {"_id": None, "total": {"$sum": "$count"}}}]).to_list(1)
+    tot = res[0]['total'] if res else 0
+    top = await group_user_totals_collection.find_one({"group_id": cid}, sort=[("count", -1)])
+
+    vid = get_video()
+    cap = f"<a href='{vid}'>&#8205;</a><b>⸻{sc('chat stats')}⸻</b>\n\n{sc(title)}\n\n{sc('users')}: <b>{uc:,}</b>\n{sc('chars')}: <b>{tot:,}</b>\n{sc('avg')}: <b>{tot/uc:.1f}</b>"
+    if top: cap += f"\n\n{sc('top')}: {sc(escape(top.get('first_name', 'Unknown'))[:18])}\n{sc('count')}: <b>{top.get('count', 0):,}</b>"
+
+    btns = InlineKeyboardMarkup([[InlineKeyboardButton("🔄", callback_data=f"lb_cs_{cid}"), InlineKeyboardButton("👥", callback_data=f"lb_ct_{cid}")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
+    return cap, btns
+
 async def chat_stats(update: Update, context: CallbackContext, edit=False, cid=None):
     q = update.callback_query if edit else None
     msg = q.message if edit else await update.message.reply_text(sc("loading..."))
@@ -150,24 +196,24 @@ async def chat_stats(update: Update, context: CallbackContext, edit=False, cid=N
 
     task = asyncio.create_task(anim(msg, "computing stats"))
     try:
-        try: chat = await context.bot.get_chat(cid); title = escape(chat.title)[:30]
-        except: title = "This Chat"
-
-        uc = await group_user_totals_collection.count_documents({"group_id": cid})
+        board = await boards.get(('chat_stats', cid), lambda: _render_chat_stats(context.bot, cid))
         task.cancel()
-        if uc==0: return await msg.edit_text(sc("no activity."))
+        await _show(msg, board)
+    except: pass
 
-        res = await group_user_totals_collection.aggregate([{"$match": {"group_id": cid}}, {"$group": {"_id": None, "total": {"$sum": "$count"}}}]).to_list(1)
-        tot = res[0]['total'] if res else 0
-        top = await group_user_totals_collection.find_one({"group_id": cid}, sort=[("count", -1)])
+async def _render_stats():
+    u = await user_collection.count_documents({})
+    g = len(await group_user_totals_collection.distinct('group_id'))
+    c = await rankings.population()
+    tc = await rankings.copies()
+    avg = tc / c if c else 0
+    rate = c / u * 100 if u else 0
 
-        vid = get_video()
-        cap = f"<a href='{vid}'>&#8205;</a><b>⸻{sc('chat stats')}⸻</b>\n\n{sc(title)}\n\n{sc('users')}: <b>{uc:,}</b>\n{sc('chars')}: <b>{tot:,}</b>\n{sc('avg')}: <b>{tot/uc:.1f}</b>"
-        if top: cap += f"\n\n{sc('top')}: {sc(escape(top.get('first_name', 'Unknown'))[:18])}\n{sc('count')}: <b>{top.get('count', 0):,}</b>"
+    vid = get_video()
+    cap = f"<a href='{vid}'>&#8205;</a><b>⸻{sc('system stats')}⸻</b>\n\n{sc('users')}: <b>{u:,}</b>\n{sc('collectors')}: <b>{c:,}</b>\n{sc('groups')}: <b>{g:,}</b>\n{sc('chars')}: <b>{tc:,}</b>\n\n{sc('avg')}: <b>{avg:.1f}</b>\n{sc('rate')}: <b>{rate:.1f}%</b>\n\n<i>{datetime.now().strftime('%H:%M:%S')}</i>"
 
-        btns = InlineKeyboardMarkup([[InlineKeyboardButton("🔄", callback_data=f"lb_cs_{cid}"), InlineKeyboardButton("👥", callback_data=f"lb_ct_{cid}")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
-        await msg.edit_text(cap, parse_mode='HTML', reply_markup=btns)
-    except: pass
+    btns = InlineKeyboardMarkup([[InlineKeyboardButton("🔄", callback_data="lb_st")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
+    return cap, btns
 
 async def stats(update: Update, context: CallbackContext, edit=False):
     # FIXED: Check both command and callback
@@ -181,18 +227,9 @@ async def stats(update: Update, context: CallbackContext, edit=False):
 
     task = asyncio.create_task(anim(msg, "computing"))
     try:
-        u = await user_collection.count_documents({})
-        g = len(await group_user_totals_collection.distinct('group_id'))
-        c = await user_collection.count_documents({"characters": {"$exists": True, "$type": "array"}})
-        res = await user_collection.aggregate([{"$match": {"characters": {"$exists": True, "$type": "array"}}}, {"$project": {"cc": {"$size": "$characters"}}}, {"$group": {"_id": None, "tot": {"$sum": "$cc"}}}]).to_list(1)
-        tc = res[0]['tot'] if res else 0
+        board = await boards.get(('stats',), _render_stats)
         task.cancel()
-
-        vid = get_video()
-        cap = f"<a href='{vid}'>&#8205;</a><b>⸻{sc('system stats')}⸻</b>\n\n{sc('users')}: <b>{u:,}</b>\n{sc('collectors')}: <b>{c:,}</b>\n{sc('groups')}: <b>{g:,}</b>\n{sc('chars')}: <b>{tc:,}</b>\n\n{sc('avg')}: <b>{tc/c:.1f}</b>\n{sc('rate')}: <b>{(c/u*100):.1f}%</b>\n\n<i>{datetime.now().strftime('%H:%M:%S')}</i>"
-
-        btns = InlineKeyboardMarkup([[InlineKeyboardButton("🔄", callback_data="lb_st")], [InlineKeyboardButton("❌", callback_data="lb_close")]])
-        await msg.edit_text(cap, parse_mode='HTML', reply_markup=btns)
+        await _show(msg, board)
     except: pass
 
 async def export_users(update: Update, context: CallbackContext):
@@ -248,4 +285,5 @@ application.add_handler(CommandHandler('chatstats', chat_stats, block=False))
 application.add_handler(CommandHandler('stats', stats, block=False))
 application.add_handler(CommandHandler('list', export_users, block=False))
 application.add_handler(CommandHandler('groups', export_groups, block=False))
-application.add_handler(CallbackQueryHandler(cb, pattern="^lb_"))
\ No newline at end of file
+application.add_handler(CallbackQueryHandler(cb, pattern="^lb_"))
+application.add_handler(CommandHandler('spinners', spinners, block=False))
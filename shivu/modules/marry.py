@@ -6,6 +6,8 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CommandHandler, CallbackContext 
 from telegram.error import TelegramError 
 from shivu import application, user_collection, collection 
+from shivu.modules.database.ownership import add_characters
+from shivu.modules.database.users import users
  
 # --- CONFIGURATION ---
 PROPOSAL_COST = 2000 
@@ -56,12 +58,11 @@ async def get_unique_chars(user_id, rarities=None, count=1):
 
 async def add_char_to_user(user_id, username, first_name, char): 
     try: 
-        await user_collection.update_one(
-            {'id': user_id}, 
-            {'$push': {'characters': char}, '$set': {'username': username, 'first_name': first_name}}, 
-            upsert=True
+        return await add_characters(
+            user_id,
+            [char],
+            {'$set': {'username': username, 'first_name': first_name}}
         )
-        return True
     except: return False
 
 async def send_win_log(context: CallbackContext, user, char, method):
@@ -124,7 +125,7 @@ async def propose(update: Update, context: CallbackContext):
         return await update.message.reply_text(f"⏳ ᴄᴏᴏʟᴅᴏᴡɴ: <code>{rem//60}ᴍ {rem%60}s</code>", parse_mode='HTML') 
 
     # Deduction
-    await user_collection.update_one({'id': user.id}, {'$inc': {'balance': -PROPOSAL_COST}}) 
+    await users.update(user.id, {'$inc': {'balance': -PROPOSAL_COST}}) 
     
     # Randomly pick ONE image for proposing
     selected_p_img = random.choice(PROPOSE_IMAGES)
@@ -143,7 +144,7 @@ async def propose(update: Update, context: CallbackContext):
     else: 
         chars = await get_unique_chars(user.id, rarities=['💮 Special Edition', '💫 Neon', '✨ Manga', '🎐 Celestial']) 
         if not chars:
-            await user_collection.update_one({'id': user.id}, {'$inc': {'balance': PROPOSAL_COST}})
+            await users.update(user.id, {'$inc': {'balance': PROPOSAL_COST}})
             return await msg.edit_caption(caption="ʀᴇғᴜɴᴅᴇᴅ! ɴᴏ ʀᴀʀᴇ ᴄʜᴀʀs ʟᴇғᴛ.")
         
         char = chars[0]
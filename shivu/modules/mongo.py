@@ -9,6 +9,7 @@ from shivu import (
     sudo_users,
     LOGGER
 )
+from shivu.modules.database.ownership import migrate_all
 
 OWNER_ID = 5147822244
 
@@ -56,5 +57,31 @@ async def db_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
         LOGGER.error(f"Error getting DB stats: {e}")
         await update.message.reply_text(f"Error: {str(e)}")
 
+async def migrate_ownership(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Backfill the ownership store from embedded character arrays.
+
+    Safe to run while the bot is live and to re-run after an interruption:
+    it resumes from the last checkpoint and skips users already migrated.
+    """
+    if update.effective_user.id != OWNER_ID:
+        await update.message.reply_text("You don't have permission to use this command.")
+        return
+
+    status = await update.message.reply_text("🔄 Migrating ownership data...")
+
+    async def progress(done: int):
+        try:
+            await status.edit_text(f"🔄 Migrating ownership data... {done} users done")
+        except Exception:
+            pass
+
+    try:
+        done = await migrate_all(progress=progress)
+        await status.edit_text(f"✅ Ownership migration complete: {done} users migrated")
+    except Exception as e:
+        LOGGER.error(f"Ownership migration failed: {e}")
+        await status.edit_text(f"❌ Migration stopped: {e}\nRun /migrateowners again to resume.")
+
 # Add handler
-application.add_handler(CommandHandler("dbstats", db_stats))
\ No newline at end of file
+application.add_handler(CommandHandler("dbstats", db_stats))
+application.add_handler(CommandHandler("migrateowners", migrate_ownership, block=False))
\ No newline at end of file
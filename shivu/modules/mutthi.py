@@ -13,6 +13,8 @@ from telegram.error import BadRequest, TimedOut, NetworkError
 from telegram.constants import ParseMode, ChatAction
 
 from shivu import application, db, user_collection
+from shivu.modules.database.ownership import add_characters
+from shivu.modules.database.outbox import outbox, Priority
 
 collection = db['anime_characters_lol']
 giveaway_collection = db['giveaways']
@@ -418,11 +420,7 @@ class GiveawayManager:
         winner_ids = [w['user_id'] for w in winners]
         
         for winner in winners:
-            await user_collection.update_one(
-                {"id": winner['user_id']},
-                {"$push": {"characters": character}},
-                upsert=True
-            )
+            await add_characters(winner['user_id'], [character])
         
         await giveaway_collection.update_one(
             {"_id": giveaway_data["_id"]},
@@ -509,12 +507,12 @@ async def render_giveaway(message, context: CallbackContext,
         else:
             send_func = message.reply_video if character.is_video else message.reply_photo
             media_param = "video" if character.is_video else "photo"
-            await send_func(
+            await outbox.send(message.chat_id, lambda: send_func(
                 **{media_param: character.img_url},
                 caption=caption,
                 parse_mode=ParseMode.HTML,
                 reply_markup=keyboard
-            )
+            ), Priority.REPLY)
     except (BadRequest, TimedOut, NetworkError) as e:
         logger.error(f"Error rendering giveaway: {e}")
         if not edit:
@@ -2,7 +2,10 @@ from datetime import datetime, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from html import escape
-from shivu import application, user_collection, collection, user_totals_collection, LOGGER
+from shivu import application, user_totals_collection, LOGGER
+from shivu.modules.database.catalog import catalog
+from shivu.modules.database.users import users
+from shivu.modules.database.ownership import add_characters
 
 OWNER_ID = 8420981179
 
@@ -24,14 +27,17 @@ def to_small_caps(text):
     m = {'a':'ᴀ','b':'ʙ','c':'ᴄ','d':'ᴅ','e':'ᴇ','f':'ғ','g':'ɢ','h':'ʜ','i':'ɪ','j':'ᴊ','k':'ᴋ','l':'ʟ','m':'ᴍ','n':'ɴ','o':'ᴏ','p':'ᴘ','q':'ǫ','r':'ʀ','s':'s','t':'ᴛ','u':'ᴜ','v':'ᴠ','w':'ᴡ','x':'x','y':'ʏ','z':'ᴢ'}
     return ''.join(m.get(c.lower(), c) for c in text)
 
+async def get_mythic_chars(limit: int):
+    return (await catalog.by_rarity(['🏵 Mythic']))[:limit]
+
 async def get_or_create_pass_data(user_id: int):
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'pass_data')
     if not user:
         user = {'id': user_id, 'characters': [], 'balance': 0}
-        await user_collection.insert_one(user)
+        await users.insert(user)
     if 'pass_data' not in user:
         pass_data = {'tier': 'free', 'weekly_claims': 0, 'last_weekly_claim': None, 'streak_count': 0, 'last_streak_claim': None, 'tasks': {'invites': 0, 'weekly_claims': 0, 'grabs': 0}, 'mythic_unlocked': False, 'premium_expires': None, 'elite_expires': None, 'pending_elite_payment': None, 'invited_users': [], 'total_invite_earnings': 0}
-        await user_collection.update_one({'id': user_id}, {'$set': {'pass_data': pass_data}})
+        await users.update(user_id, {'$set': {'pass_data': pass_data}})
         return pass_data
     return user.get('pass_data', {})
 
@@ -41,18 +47,18 @@ async def check_and_update_tier(user_id: int):
     if tier == 'elite':
         elite_expires = pass_data.get('elite_expires')
         if elite_expires and isinstance(elite_expires, datetime) and elite_expires < datetime.utcnow():
-            await user_collection.update_one({'id': user_id}, {'$set': {'pass_data.tier': 'free'}})
+            await users.update(user_id, {'$set': {'pass_data.tier': 'free'}})
             return 'free'
     elif tier == 'premium':
         premium_expires = pass_data.get('premium_expires')
         if premium_expires and isinstance(premium_expires, datetime) and premium_expires < datetime.utcnow():
-            await user_collection.update_one({'id': user_id}, {'$set': {'pass_data.tier': 'free'}})
+            await users.update(user_id, {'$set': {'pass_data.tier': 'free'}})
             return 'free'
     return tier
 
 async def update_grab_task(user_id: int):
     try:
-        await user_collection.update_one({'id': user_id}, {'$inc': {'pass_data.tasks.grabs': 1}})
+        await users.update(user_id, {'$inc': {'pass_data.tasks.grabs': 1}})
         LOGGER.info(f"Grab task updated for user {user_id}")
     except Exception as e:
         LOGGER.error(f"Error updating grab task: {e}")
@@ -62,7 +68,7 @@ async def pass_command(update: Update, context: CallbackContext):
     try:
         tier = await check_and_update_tier(user_id)
         pass_data = await get_or_create_pass_data(user_id)
-        user = await user_collection.find_one({'id': user_id})
+        user = await users.get(user_id, 'balance')
         tier_name = PASS_CONFIG[tier]['name']
         weekly_claims = pass_data.get('weekly_claims', 0)
         streak_count = pass_data.get('streak_count', 0)
@@ -122,21 +128,21 @@ async def pclaim_command(update: Update, context: CallbackContext):
         reward = PASS_CONFIG[tier]['weekly_reward']
         mythic_chars_count = PASS_CONFIG[tier]['mythic_characters']
         new_claims = pass_data.get('weekly_claims', 0) + 1
-        await user_collection.update_one({'id': user_id}, {'$set': {'pass_data.last_weekly_claim': datetime.utcnow(), 'pass_data.weekly_claims': new_claims, 'pass_data.tasks.weekly_claims': new_claims}, '$inc': {'balance': reward}})
+        await users.update(user_id, {'$set': {'pass_data.last_weekly_claim': datetime.utcnow(), 'pass_data.weekly_claims': new_claims, 'pass_data.tasks.weekly_claims': new_claims}, '$inc': {'balance': reward}})
         last_streak = pass_data.get('last_streak_claim')
         if last_streak and isinstance(last_streak, datetime):
             days_since = (datetime.utcnow() - last_streak).days
             if 6 <= days_since <= 8:
-                await user_collection.update_one({'id': user_id}, {'$inc': {'pass_data.streak_count': 1}, '$set': {'pass_data.last_streak_claim': datetime.utcnow()}})
+                await users.update(user_id, {'$inc': {'pass_data.streak_count': 1}, '$set': {'pass_data.last_streak_claim': datetime.utcnow()}})
             elif days_since > 8:
-                await user_collection.update_one({'id': user_id}, {'$set': {'pass_data.streak_count': 0}})
+                await users.update(user_id, {'$set': {'pass_data.streak_count': 0}})
         else:
-            await user_collection.update_one({'id': user_id}, {'$set': {'pass_data.streak_count': 1, 'pass_data.last_streak_claim': datetime.utcnow()}})
+            await users.update(user_id, {'$set': {'pass_data.streak_count': 1, 'pass_data.last_streak_claim': datetime.utcnow()}})
         premium_msg = ""
         if mythic_chars_count > 0:
-            mythic_chars = await collection.find({'rarity': '🏵 Mythic'}).limit(mythic_chars_count).to_list(length=mythic_chars_count)
+            mythic_chars = await get_mythic_chars(mythic_chars_count)
             if mythic_chars:
-                await user_collection.update_one({'id': user_id}, {'$push': {'characters': {'$each': mythic_chars}}})
+                await add_characters(user_id, mythic_chars, upsert=False)
                 await user_totals_collection.update_one({'id': user_id}, {'$inc': {'count': len(mythic_chars)}}, upsert=True)
                 premium_msg = f"\n{to_small_caps('bonus')}: {len(mythic_chars)} {to_small_caps('mythic added')}"
         await update.message.reply_text(f"{to_small_caps('claimed')}\n{to_small_caps('reward')}: <code>{reward:,}</code>\n{to_small_caps('claims')}: {new_claims}/6{premium_msg}", parse_mode='HTML')
@@ -154,11 +160,9 @@ async def sweekly_command(update: Update, context: CallbackContext):
             await update.message.reply_text(f"{to_small_caps('need 6 claims')}: {weekly_claims}/6")
             return
         bonus = PASS_CONFIG[tier]['streak_bonus']
-        mythic_char = await collection.find_one({'rarity': '🏵 Mythic'})
+        mythic_char = next(iter(await get_mythic_chars(1)), None)
         update_data = {'$inc': {'balance': bonus}, '$set': {'pass_data.weekly_claims': 0}}
-        if mythic_char:
-            update_data['$push'] = {'characters': mythic_char}
-        await user_collection.update_one({'id': user_id}, update_data)
+        await add_characters(user_id, [mythic_char] if mythic_char else [], update_data, upsert=False)
         if mythic_char:
             await user_totals_collection.update_one({'id': user_id}, {'$inc': {'count': 1}}, upsert=True)
         char_msg = f"\n{to_small_caps('bonus char')}: {mythic_char.get('name', 'unknown')}" if mythic_char else ""
@@ -184,9 +188,9 @@ async def tasks_command(update: Update, context: CallbackContext):
                 all_completed = False
             task_list.append(f"{to_small_caps(k)}: {current}/{required} {'█' * (progress // 10)}{'░' * (10 - progress // 10)} {progress}% {status}")
         if all_completed and not mythic_unlocked:
-            mythic_char = await collection.find_one({'rarity': '🏵 Mythic'})
+            mythic_char = next(iter(await get_mythic_chars(1)), None)
             if mythic_char:
-                await user_collection.update_one({'id': user_id}, {'$push': {'characters': mythic_char}, '$set': {'pass_data.mythic_unlocked': True}})
+                await add_characters(user_id, [mythic_char], {'$set': {'pass_data.mythic_unlocked': True}}, upsert=False)
                 await user_totals_collection.update_one({'id': user_id}, {'$inc': {'count': 1}}, upsert=True)
                 mythic_unlocked = True
         mythic_status = to_small_caps('unlocked') if mythic_unlocked else to_small_caps('locked')
@@ -214,7 +218,7 @@ async def upgrade_command(update: Update, context: CallbackContext):
     user_id = update.effective_user.id
     try:
         tier = await check_and_update_tier(user_id)
-        user = await user_collection.find_one({'id': user_id})
+        user = await users.get(user_id, 'balance')
         balance = user.get('balance', 0)
         caption = f"{to_small_caps('upgrade')}\n\n{to_small_caps('balance')}: <code>{balance:,}</code>\n{to_small_caps('tier')}: {PASS_CONFIG[tier]['name']}\n\n{to_small_caps('premium')}: 50,000 {to_small_caps('gold')} 30d\n{to_small_caps('elite')}: 50 INR 30d"
         keyboard = [[InlineKeyboardButton(to_small_caps("premium"), callback_data="ps_buypremium")], [InlineKeyboardButton(to_small_caps("elite"), callback_data="ps_buyelite")]]
@@ -238,7 +242,7 @@ async def addinvite_command(update: Update, context: CallbackContext):
             return
         await get_or_create_pass_data(target_user_id)
         gold_reward = invite_count * INVITE_REWARD
-        await user_collection.update_one({'id': target_user_id}, {'$inc': {'pass_data.tasks.invites': invite_count, 'pass_data.total_invite_earnings': gold_reward, 'balance': gold_reward}})
+        await users.update(target_user_id, {'$inc': {'pass_data.tasks.invites': invite_count, 'pass_data.total_invite_earnings': gold_reward, 'balance': gold_reward}})
         await update.message.reply_text(f"{to_small_caps('added')}\n{to_small_caps('user')}: <code>{target_user_id}</code>\n{to_small_caps('invites')}: {invite_count}\n{to_small_caps('gold')}: <code>{gold_reward:,}</code>", parse_mode='HTML')
         try:
             await context.bot.send_message(chat_id=target_user_id, text=f"{to_small_caps('invite reward')}\n{invite_count} {to_small_caps('credits')}\n<code>{gold_reward:,}</code> {to_small_caps('gold')}", parse_mode='HTML')
@@ -264,7 +268,7 @@ async def addgrab_command(update: Update, context: CallbackContext):
             await update.message.reply_text(to_small_caps('invalid count'))
             return
         await get_or_create_pass_data(target_user_id)
-        await user_collection.update_one({'id': target_user_id}, {'$inc': {'pass_data.tasks.grabs': grab_count}})
+        await users.update(target_user_id, {'$inc': {'pass_data.tasks.grabs': grab_count}})
         await update.message.reply_text(f"{to_small_caps('added')}\n{to_small_caps('user')}: <code>{target_user_id}</code>\n{to_small_caps('grabs')}: {grab_count}", parse_mode='HTML')
         try:
             await context.bot.send_message(chat_id=target_user_id, text=f"{grab_count} {to_small_caps('grab credits added')}", parse_mode='HTML')
@@ -285,7 +289,7 @@ async def approve_elite_command(update: Update, context: CallbackContext):
             await update.message.reply_text(f"{to_small_caps('usage')}: /approveelite <user_id>")
             return
         target_user_id = int(context.args[0])
-        target_user = await user_collection.find_one({'id': target_user_id})
+        target_user = await users.get(target_user_id, 'pass_data')
         if not target_user:
             await update.message.reply_text(to_small_caps('user not found'))
             return
@@ -295,8 +299,8 @@ async def approve_elite_command(update: Update, context: CallbackContext):
             return
         expires = datetime.utcnow() + timedelta(days=30)
         activation_bonus = PASS_CONFIG['elite']['activation_bonus']
-        mythic_chars = await collection.find({'rarity': '🏵 Mythic'}).limit(5).to_list(length=5)
-        await user_collection.update_one({'id': target_user_id}, {'$set': {'pass_data.tier': 'elite', 'pass_data.elite_expires': expires, 'pass_data.pending_elite_payment': None}, '$inc': {'balance': activation_bonus}, '$push': {'characters': {'$each': mythic_chars}}})
+        mythic_chars = await get_mythic_chars(5)
+        await add_characters(target_user_id, mythic_chars, {'$set': {'pass_data.tier': 'elite', 'pass_data.elite_expires': expires, 'pass_data.pending_elite_payment': None}, '$inc': {'balance': activation_bonus}}, upsert=False)
         await user_totals_collection.update_one({'id': target_user_id}, {'$inc': {'count': len(mythic_chars)}}, upsert=True)
         await update.message.reply_text(f"{to_small_caps('elite activated')}\n{to_small_caps('user')}: <code>{target_user_id}</code>\n{to_small_caps('gold')}: <code>{activation_bonus:,}</code>\n{to_small_caps('mythics')}: {len(mythic_chars)}", parse_mode='HTML')
         try:
@@ -331,7 +335,7 @@ async def pass_callback(update: Update, context: CallbackContext):
                     return
             reward = PASS_CONFIG[tier]['weekly_reward']
             new_claims = pass_data.get('weekly_claims', 0) + 1
-            await user_collection.update_one({'id': user_id}, {'$set': {'pass_data.last_weekly_claim': datetime.utcnow(), 'pass_data.weekly_claims': new_claims}, '$inc': {'balance': reward}})
+            await users.update(user_id, {'$set': {'pass_data.last_weekly_claim': datetime.utcnow(), 'pass_data.weekly_claims': new_claims}, '$inc': {'balance': reward}})
             await query.message.reply_text(f"{to_small_caps('claimed')}: <code>{reward:,}</code>", parse_mode='HTML')
         elif action == 'tasks':
             pass_data = await get_or_create_pass_data(user_id)
@@ -355,7 +359,7 @@ async def pass_callback(update: Update, context: CallbackContext):
             await query.edit_message_caption(caption=caption, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='HTML')
         elif action == 'upgrade':
             tier = await check_and_update_tier(user_id)
-            user = await user_collection.find_one({'id': user_id})
+            user = await users.get(user_id, 'balance')
             balance = user.get('balance', 0)
             caption = f"{to_small_caps('upgrade')}\n\n{to_small_caps('balance')}: <code>{balance:,}</code>\n{to_small_caps('tier')}: {PASS_CONFIG[tier]['name']}\n\n{to_small_caps('premium')}: 50,000 {to_small_caps('gold')}\n{to_small_caps('elite')}: 50 INR"
             keyboard = [[InlineKeyboardButton(to_small_caps("premium"), callback_data="ps_buypremium")], [InlineKeyboardButton(to_small_caps("elite"), callback_data="ps_buyelite")], [InlineKeyboardButton(to_small_caps("back"), callback_data="ps_back")]]
@@ -363,7 +367,7 @@ async def pass_callback(update: Update, context: CallbackContext):
         elif action == 'back':
             tier = await check_and_update_tier(user_id)
             pass_data = await get_or_create_pass_data(user_id)
-            user = await user_collection.find_one({'id': user_id})
+            user = await users.get(user_id, 'balance')
             tier_name = PASS_CONFIG[tier]['name']
             weekly_claims = pass_data.get('weekly_claims', 0)
             streak_count = pass_data.get('streak_count', 0)
@@ -387,27 +391,27 @@ async def pass_callback(update: Update, context: CallbackContext):
             keyboard = [[InlineKeyboardButton(to_small_caps("claim"), callback_data="ps_claim"), InlineKeyboardButton(to_small_caps("tasks"), callback_data="ps_tasks")], [InlineKeyboardButton(to_small_caps("upgrade"), callback_data="ps_upgrade"), InlineKeyboardButton(to_small_caps("invite"), callback_data="ps_invite")]]
             await query.edit_message_caption(caption=caption, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='HTML')
         elif action == 'buypremium':
-            user = await user_collection.find_one({'id': user_id})
+            user = await users.get(user_id, 'balance')
             cost = PASS_CONFIG['premium']['cost']
             balance = user.get('balance', 0)
             caption = f"{to_small_caps('premium')}\n\n{to_small_caps('cost')}: <code>{cost:,}</code>\n{to_small_caps('balance')}: <code>{balance:,}</code>"
             keyboard = [[InlineKeyboardButton(to_small_caps("confirm"), callback_data="ps_confirmprem"), InlineKeyboardButton(to_small_caps("cancel"), callback_data="ps_upgrade")]]
             await query.edit_message_caption(caption=caption, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='HTML')
         elif action == 'confirmprem':
-            user = await user_collection.find_one({'id': user_id})
+            user = await users.get(user_id, 'balance', fresh=True)
             cost = PASS_CONFIG['premium']['cost']
             if user.get('balance', 0) < cost:
                 await query.answer(to_small_caps("insufficient balance"), show_alert=True)
                 return
             expires = datetime.utcnow() + timedelta(days=30)
-            await user_collection.update_one({'id': user_id}, {'$inc': {'balance': -cost}, '$set': {'pass_data.tier': 'premium', 'pass_data.premium_expires': expires}})
+            await users.update(user_id, {'$inc': {'balance': -cost}, '$set': {'pass_data.tier': 'premium', 'pass_data.premium_expires': expires}})
             await query.edit_message_caption(caption=f"{to_small_caps('premium activated')}\n{to_small_caps('expires')}: {expires.strftime('%Y-%m-%d')}", parse_mode='HTML')
         elif action == 'buyelite':
             caption = f"{to_small_caps('elite payment')}\n\n{to_small_caps('amount')}: 50 INR\n{to_small_caps('upi')}: <code>{PASS_CONFIG['elite']['upi_id']}</code>\n\n{to_small_caps('send payment then click submit')}"
             keyboard = [[InlineKeyboardButton(to_small_caps("submit"), callback_data="ps_submitelite")], [InlineKeyboardButton(to_small_caps("cancel"), callback_data="ps_upgrade")]]
             await query.edit_message_caption(caption=caption, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='HTML')
         elif action == 'submitelite':
-            await user_collection.update_one({'id': user_id}, {'$set': {'pass_data.pending_elite_payment': datetime.utcnow()}})
+            await users.update(user_id, {'$set': {'pass_data.pending_elite_payment': datetime.utcnow()}})
             try:
                 await context.bot.send_message(chat_id=OWNER_ID, text=f"{to_small_caps('elite payment')}\n{to_small_caps('user')}: <code>{user_id}</code>\n/approveelite {user_id}", parse_mode='HTML')
             except:
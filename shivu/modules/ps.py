@@ -4,6 +4,8 @@ from datetime import datetime, timedelta
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, InputMediaPhoto 
 from telegram.ext import CallbackContext, CommandHandler, CallbackQueryHandler 
 from shivu import application, db, user_collection 
+from shivu.modules.database.ownership import add_characters
+from shivu.modules.database.users import users
 
 # --- DATABASE & CONFIG ---
 collection = db['anime_characters_lol'] 
@@ -109,7 +111,7 @@ async def luv(update: Update, context: CallbackContext):
     if not last_reset or (now - last_reset).total_seconds() >= (cfg['cooldown_hours'] * 3600):
         chars = await generate_chars(uid, cfg)
         luv_data = {'characters': chars, 'last_reset': now.isoformat(), 'purchased': [], 'refresh_count': 0}
-        await user_collection.update_one({"id": uid}, {"$set": {"private_store": luv_data}}, upsert=True)
+        await users.update(uid, {"$set": {"private_store": luv_data}}, upsert=True)
 
     chars = luv_data['characters']
     context.user_data['luv_chars'] = chars
@@ -160,12 +162,12 @@ async def luv_callback(update: Update, context: CallbackContext):
         cost = cfg['refresh_cost']
         if user.get('balance', 0) < cost: return await q.answer(f"❌ ɴᴇᴇᴅ {cost:,} ɢᴏʟᴅ!", show_alert=True)
         
-        await user_collection.update_one({"id": uid}, {"$inc": {"balance": -cost}})
+        await users.update(uid, {"$inc": {"balance": -cost}})
         new_chars = await generate_chars(uid, cfg)
         new_count = current_refreshes + 1
         
         luv_data.update({'characters': new_chars, 'refresh_count': new_count, 'purchased': []})
-        await user_collection.update_one({"id": uid}, {"$set": {"private_store": luv_data}})
+        await users.update(uid, {"$set": {"private_store": luv_data}})
         
         await q.answer(f"🔄 sᴛᴏʀᴇ ʀᴇғʀᴇsʜᴇᴅ ({new_count}/3)!")
         char = new_chars[0]
@@ -182,7 +184,7 @@ async def luv_callback(update: Update, context: CallbackContext):
         deal = market_deals.get(uid, {}).get(cid)
         if user.get('balance', 0) < deal['final']: return await q.answer("❌ ɴᴏᴛ ᴇɴᴏᴜɢʜ ɢᴏʟᴅ!", show_alert=True)
         char = next(c for c in luv_data['characters'] if str(c.get("id")) == cid)
-        await user_collection.update_one({"id": uid}, {"$inc": {"balance": -deal['final']}, "$push": {"characters": char, "private_store.purchased": cid}})
+        await add_characters(uid, [char], {"$inc": {"balance": -deal['final']}, "$push": {"private_store.purchased": cid}}, upsert=False)
         await q.answer("🎊 ᴘᴜʀᴄʜᴀsᴇᴅ!", show_alert=True)
         await q.message.delete()
 
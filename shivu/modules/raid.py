@@ -10,7 +10,10 @@ from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQ
 from pyrogram.errors import MessageNotModified, BadRequest
 
 from shivu.config import Development as Config
-from shivu import shivuu, db, user_collection, collection
+from shivu import shivuu, db, user_collection
+from shivu.modules.database.catalog import catalog
+from shivu.modules.database.ownership import add_characters
+from shivu.modules.database.users import users
 
 class Rarity(IntEnum):
     COMMON = 1
@@ -144,12 +147,12 @@ class UserManager:
         user = await user_collection.find_one({"id": user_id})
         if not user:
             user = {"id": user_id, "balance": 0, "characters": []}
-            await user_collection.insert_one(user)
+            await users.insert(user)
         return user
 
     @staticmethod
     async def update_balance(user_id: int, amount: int) -> None:
-        await user_collection.update_one({"id": user_id}, {"$inc": {"balance": amount}}, upsert=True)
+        await users.update(user_id, {"$inc": {"balance": amount}}, upsert=True)
 
     @staticmethod
     async def add_character(user_id: int, char: Dict) -> None:
@@ -157,14 +160,10 @@ class UserManager:
         if isinstance(rarity, int):
             rarity = RARITY_DISPLAY.get(rarity, "🟢 Common")
         
-        await user_collection.update_one(
-            {"id": user_id},
-            {"$push": {"characters": {
-                "id": char.get("id"), "name": char.get("name"),
-                "anime": char.get("anime"), "rarity": rarity, "img_url": char.get("img_url", "")
-            }}},
-            upsert=True
-        )
+        await add_characters(user_id, [{
+            "id": char.get("id"), "name": char.get("name"),
+            "anime": char.get("anime"), "rarity": rarity, "img_url": char.get("img_url", "")
+        }])
 
 class RaidExecutor:
     def __init__(self, db_mgr: RaidDatabase, usr_mgr: UserManager):
@@ -232,10 +231,10 @@ class RaidExecutor:
         return results
 
     async def _get_char(self, rarities: List[int]) -> Optional[Dict]:
-        chars = await collection.find({"rarity": {"$in": rarities}}).to_list(None)
+        chars = await catalog.by_rarity(rarities)
         if not chars:
             rarity_strings = [RARITY_DISPLAY.get(r, f"R{r}") for r in rarities]
-            chars = await collection.find({"rarity": {"$in": rarity_strings}}).to_list(None)
+            chars = await catalog.by_rarity(rarity_strings)
         return random.choice(chars) if chars else None
 
     async def _send_results(self, client: Client, msg: Message, raid: ActiveRaid, results: List[Dict], config: RaidConfig) -> None:
@@ -1,7 +1,11 @@
+import asyncio
+import time
 import traceback
+from typing import Dict, FrozenSet, Optional, Tuple
 from telegram import Update
 from telegram.ext import CommandHandler, CallbackContext
 from shivu import application, db, LOGGER
+from shivu.modules.database.spawn_sampler import Weights, build_weights
 
 spawn_settings_collection = db['spawn_settings']
 group_rarity_collection = db['group_rarity_spawns']
@@ -48,6 +52,8 @@ EMOJI_TO_NAME = {
 }
 NAME_TO_EMOJI = {v: k for k, v in EMOJI_TO_NAME.items()}
 
+RARITY_POLICY_TTL = 60
+
 
 async def get_spawn_settings():
     try:
@@ -68,6 +74,7 @@ async def update_spawn_settings(rarities):
             {'$set': {'rarities': rarities}},
             upsert=True
         )
+        rarity_policy.invalidate()
         return True
     except Exception as e:
         LOGGER.error(f"Error updating spawn settings: {e}")
@@ -82,6 +89,74 @@ async def get_group_exclusive(chat_id):
         return None
 
 
+class RarityPolicy:
+    """Cached view of spawn_settings and group_rarity_spawns for the spawn path.
+
+    Both documents are reloaded together at most every ``ttl`` seconds, so edits
+    made on another worker show up, and immediately after any rarity command on
+    this worker through :meth:`invalidate`.
+    """
+
+    def __init__(self, ttl: float = RARITY_POLICY_TTL):
+        self._ttl = ttl
+        self._rarities: Dict[str, dict] = {}
+        self._exclusives: Dict[int, dict] = {}
+        self._owners: Dict[str, int] = {}
+        self._per_chat: Dict[int, Tuple[Weights, FrozenSet[str]]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self._ttl
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    async def _ensure(self):
+        if self._fresh():
+            return
+
+        async with self._lock:
+            if self._fresh():
+                return
+            try:
+                settings = await get_spawn_settings()
+                groups = await group_rarity_collection.find({}).to_list(length=None)
+            except Exception as e:
+                LOGGER.error(f"Error loading rarity policy: {e}")
+                # Keep serving the previous snapshot until the next TTL window.
+                self._loaded_at = time.monotonic()
+                return
+
+            self._rarities = settings.get('rarities', {}) if settings else {}
+            self._exclusives = {g['chat_id']: g for g in groups}
+            self._owners = {g['rarity_emoji']: g['chat_id'] for g in groups}
+            self._per_chat = {}
+            self._loaded_at = time.monotonic()
+
+    async def for_chat(self, chat_id: int) -> Tuple[Weights, FrozenSet[str]]:
+        """Return the spawn weights for ``chat_id`` and the rarity emojis it must never get."""
+        await self._ensure()
+
+        cached = self._per_chat.get(chat_id)
+        if cached is not None:
+            return cached
+
+        own = self._exclusives.get(chat_id)
+        own_e = own['rarity_emoji'] if own else None
+
+        blocked = {e for e, c in self._owners.items() if c != chat_id}
+        blocked |= {e for e, r in self._rarities.items() if not r.get('enabled', True) and e != own_e}
+        blocked = frozenset(blocked)
+
+        weights = tuple((e, w) for e, w in build_weights(own, self._rarities) if e not in blocked)
+        self._per_chat[chat_id] = (weights, blocked)
+        return weights, blocked
+
+
+rarity_policy = RarityPolicy()
+
+
 def normalize_chances(rarities):
     enabled = {k: v for k, v in rarities.items() if v['enabled']}
     if not enabled:
@@ -167,6 +242,7 @@ async def setg_command(update: Update, context: CallbackContext):
             }},
             upsert=True
         )
+        rarity_policy.invalidate()
 
         await update.message.reply_text(
             f"✅ Group exclusive set!\n"
@@ -202,6 +278,7 @@ async def unsetg_command(update: Update, context: CallbackContext):
 
         chat_id = int(context.args[0])
         result = await group_rarity_collection.delete_one({'chat_id': chat_id})
+        rarity_policy.invalidate()
 
         if result.deleted_count > 0:
             await update.message.reply_text(
@@ -420,4 +497,4 @@ try:
 except Exception as e:
     LOGGER.error(f"❌ Failed to register handlers: {e}")
 
-__all__ = ['spawn_settings_collection', 'group_rarity_collection', 'get_spawn_settings', 'get_group_exclusive']
+__all__ = ['spawn_settings_collection', 'group_rarity_collection', 'get_spawn_settings', 'get_group_exclusive', 'rarity_policy']
@@ -18,6 +18,7 @@ from telegram.ext import CommandHandler, ContextTypes
 from shivu import collection, user_collection, application
 from shivu import db 
 from shivu.modules.database.sudo import is_user_sudo
+from shivu.modules.database.ownership import add_characters, get_character
 
 # --- CONFIGURATION ---
 LOG_GROUP_ID = -1003110990230  # Channel ID for logging activities
@@ -477,11 +478,9 @@ async def redeem_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             # Handle character reward
             waifu_data = code_info['waifu_data']
             
-            await user_collection.update_one(
-                {'id': user_id},
-                {'$addToSet': {'characters': waifu_data}},  # Prevent duplicates
-                upsert=True
-            )
+            # Prevent duplicates
+            if not await get_character(user_id, waifu_data.get('id')):
+                await add_characters(user_id, [waifu_data])
             
             # Try to send character card with image
             try:
@@ -4,6 +4,7 @@ from telegram.error import BadRequest
 from datetime import datetime, timedelta
 from bson import ObjectId
 from shivu import application, db, user_collection
+from shivu.modules.database.ownership import add_characters, remove_character, get_character
 import asyncio
 from typing import Optional, Dict, List
 
@@ -36,11 +37,11 @@ async def get_cached_user(bot, user_id: int) -> Optional[str]:
         return "Unknown"
 
 async def validate_listing_ownership(user_id: int, char_id: str) -> tuple:
-    user_data = await user_collection.find_one({"id": user_id}, {"characters": 1})
+    user_data = await user_collection.find_one({"id": user_id}, {"_id": 1})
     if not user_data:
         return False, None, "⚠️ <b>ɴᴏ ᴄʜᴀʀᴀᴄᴛᴇʀs ғᴏᴜɴᴅ ɪɴ ʏᴏᴜʀ ᴄᴏʟʟᴇᴄᴛɪᴏɴ</b>"
     
-    char_to_sell = next((c for c in user_data.get("characters", []) if str(c.get("id", c.get("_id"))) == char_id), None)
+    char_to_sell = await get_character(user_id, char_id)
     
     if not char_to_sell:
         return False, None, f"⚠️ <b>ᴄʜᴀʀᴀᴄᴛᴇʀ ɴᴏᴛ ғᴏᴜɴᴅ</b>\n\n<blockquote>ʏᴏᴜ ᴅᴏɴ'ᴛ ᴏᴡɴ ᴄʜᴀʀᴀᴄᴛᴇʀ ɪᴅ: <code>{char_id}</code>\n\n💡 ᴜsᴇ /collection ᴛᴏ ᴠɪᴇᴡ ʏᴏᴜʀ ᴄʜᴀʀᴀᴄᴛᴇʀs</blockquote>"
@@ -165,6 +166,10 @@ async def sell(update: Update, context: CallbackContext):
             await update.message.reply_text(error, parse_mode="HTML")
             return
         
+        if not await remove_character(user_id, char_id):
+            await update.message.reply_text("⚠️ <b>ᴄʜᴀʀᴀᴄᴛᴇʀ ɴᴏᴛ ғᴏᴜɴᴅ</b>", parse_mode="HTML")
+            return
+        
         await sell_listings.insert_one({
             "seller_id": user_id,
             "character": char_to_sell,
@@ -173,8 +178,6 @@ async def sell(update: Update, context: CallbackContext):
             "views": 0
         })
         
-        await user_collection.update_one({"id": user_id}, {"$pull": {"characters": char_to_sell}})
-        
         fee = int(price * MARKET_FEE)
         you_get = price - fee
         
@@ -219,7 +222,7 @@ async def unsell(update: Update, context: CallbackContext):
             )
             return
         
-        await user_collection.update_one({"id": user_id}, {"$push": {"characters": listing["character"]}}, upsert=True)
+        await add_characters(user_id, [listing["character"]])
         await sell_listings.delete_one({"_id": listing["_id"]})
         
         await update.message.reply_text(
@@ -510,11 +513,7 @@ async def market_callback(update: Update, context: CallbackContext):
         fee = int(price * MARKET_FEE)
         seller_gets = price - fee
         
-        update_buyer = user_collection.update_one(
-            {"id": user_id},
-            {"$inc": {"balance": -price}, "$push": {"characters": char}},
-            upsert=True
-        )
+        update_buyer = add_characters(user_id, [char], {"$inc": {"balance": -price}})
         
         update_seller = user_collection.update_one(
             {"id": listing["seller_id"]},
@@ -587,11 +586,7 @@ async def market_callback(update: Update, context: CallbackContext):
             await query.answer("⚠️ ʟɪsᴛɪɴɢ ɴᴏᴛ ғᴏᴜɴᴅ", show_alert=True)
             return
         
-        restore_char = user_collection.update_one(
-            {"id": user_id},
-            {"$push": {"characters": listing["character"]}},
-            upsert=True
-        )
+        restore_char = add_characters(user_id, [listing["character"]])
         delete_list = sell_listings.delete_one({"_id": listing["_id"]})
         
         await asyncio.gather(restore_char, delete_list)
@@ -12,6 +12,7 @@ from telegram.error import BadRequest, TimedOut, NetworkError
 from telegram.constants import ParseMode, ChatAction
 
 from shivu import application, db, user_collection
+from shivu.modules.database.ownership import add_characters
 
 collection = db['anime_characters_lol']
 shop_collection = db['shop']
@@ -388,17 +389,16 @@ class ShopManager:
                 if current_item.get('sold', 0) >= current_item['limit']:
                     return False, "🚫 Item just sold out"
             
-            await user_collection.update_one(
-                {"id": user_id},
+            await add_characters(
+                user_id,
+                [character_data],
                 {
                     "$inc": {
                         "balance": -shop_item.final_price,
                         "purchase_count": 1,
                         "total_spent": shop_item.final_price
-                    },
-                    "$push": {"characters": character_data}
-                },
-                upsert=True
+                    }
+                }
             )
             
             await shop_collection.update_one(
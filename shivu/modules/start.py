@@ -6,6 +6,8 @@ from telegram.ext import CallbackContext, CallbackQueryHandler, CommandHandler
 from shivu import application, SUPPORT_CHAT, BOT_USERNAME, LOGGER, user_collection, collection
 from shivu.modules.chatlog import track_bot_start
 from shivu.modules.database.sudo import fetch_sudo_users
+from shivu.modules.database.ownership import add_characters
+from shivu.modules.database.users import users
 import asyncio
 
 VIDEOS = [
@@ -46,8 +48,8 @@ async def give_milestone_reward(user_id: int, milestone: int, context: CallbackC
         char_count = reward["characters"]
         rarities = reward["rarity"]
 
-        await user_collection.update_one(
-            {"id": user_id},
+        await users.update(
+            user_id,
             {"$inc": {"balance": gold}}
         )
 
@@ -64,10 +66,7 @@ async def give_milestone_reward(user_id: int, milestone: int, context: CallbackC
                 character = char_list[0]
                 characters.append(character)
 
-                await user_collection.update_one(
-                    {"id": user_id},
-                    {"$push": {"characters": character}}
-                )
+                await add_characters(user_id, [character], upsert=False)
 
         char_list_text = "\n".join([
             f"{HAREM_MODE_MAPPING.get(c.get('rarity', 'common'), '🟢')} {c.get('name', 'Unknown')}"
@@ -123,8 +122,8 @@ async def process_referral(user_id: int, first_name: str, referring_user_id: int
             LOGGER.info(f"User {user_id} already referred by {new_user.get('referred_by')}")
             return False
 
-        await user_collection.update_one(
-            {"id": user_id},
+        await users.update(
+            user_id,
             {
                 "$set": {"referred_by": referring_user_id},
                 "$inc": {"balance": NEW_USER_BONUS}
@@ -134,8 +133,8 @@ async def process_referral(user_id: int, first_name: str, referring_user_id: int
         old_count = referring_user.get('referred_users', 0)
         new_count = old_count + 1
 
-        await user_collection.update_one(
-            {"id": referring_user_id},
+        await users.update(
+            referring_user_id,
             {
                 "$inc": {
                     "balance": REFERRER_REWARD,
@@ -267,7 +266,7 @@ async def start(update: Update, context: CallbackContext):
                 }
             }
 
-            await user_collection.insert_one(new_user)
+            await users.insert(new_user)
             user_data = new_user
 
             context.application.create_task(
@@ -281,8 +280,8 @@ async def start(update: Update, context: CallbackContext):
         else:
             LOGGER.info(f"Existing user {user_id} started bot")
             
-            await user_collection.update_one(
-                {"id": user_id},
+            await users.update(
+                user_id,
                 {"$set": {"first_name": first_name, "username": username}}
             )
 
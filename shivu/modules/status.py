@@ -1,6 +1,9 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
 from shivu import shivuu, SUPPORT_CHAT, user_collection, collection
+from shivu.modules.database.users import users
+from shivu.modules.database.ownership import count_characters, get_summary
+from shivu.modules.database.rankings import rankings
 import os
 import re
 from datetime import datetime, timedelta
@@ -271,44 +274,15 @@ async def get_user_collection() -> List[Dict[str, Any]]:
 
 
 async def get_global_rank(user_id: int) -> int:
-    pipeline = [
-        {
-            "$project": {
-                "id": 1,
-                "characters_count": {
-                    "$cond": {
-                        "if": {"$isArray": "$characters"},
-                        "then": {"$size": "$characters"},
-                        "else": 0
-                    }
-                }
-            }
-        },
-        {"$sort": {"characters_count": -1}}
-    ]
-
-    cursor = user_collection.aggregate(pipeline)
-    leaderboard_data = await cursor.to_list(length=None)
-
-    for i, user in enumerate(leaderboard_data, start=1):
-        if user.get('id') == user_id:
-            return i
-
-    return 0
+    return await rankings.rank(user_id) or 0
 
 
 async def get_user_balance(user_id: int) -> int:
-    user_balance = await user_collection.find_one(
-        {'id': user_id},
-        projection={'balance': 1}
-    )
-    if user_balance:
-        return user_balance.get('balance', 0)
-    return 0
+    return await users.balance(user_id)
 
 
 async def get_grab_stats(user_id: int) -> Dict[str, int]:
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'grab_stats')
     if not user:
         return {
             'total_grabs': 0,
@@ -319,7 +293,7 @@ async def get_grab_stats(user_id: int) -> Dict[str, int]:
     
     grab_stats = user.get('grab_stats', {})
     return {
-        'total_grabs': len(user.get('characters', [])),
+        'total_grabs': await count_characters(user_id),
         'today_grabs': grab_stats.get('today', 0),
         'weekly_grabs': grab_stats.get('weekly', 0),
         'monthly_grabs': grab_stats.get('monthly', 0)
@@ -327,7 +301,7 @@ async def get_grab_stats(user_id: int) -> Dict[str, int]:
 
 
 async def get_streak(user_id: int) -> Dict[str, Any]:
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'streak_data')
     if not user:
         return {'current': 0, 'longest': 0, 'last_claim': None}
     
@@ -352,12 +326,12 @@ async def get_streak(user_id: int) -> Dict[str, Any]:
 
 
 async def check_badges(user_id: int) -> List[str]:
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'badges', 'balance')
     if not user:
         return []
     
     earned_badges = user.get('badges', [])
-    total_grabs = len(user.get('characters', []))
+    total_grabs = await count_characters(user_id)
     balance = user.get('balance', 0)
     streak_data = await get_streak(user_id)
     
@@ -377,8 +351,8 @@ async def check_badges(user_id: int) -> List[str]:
     
     if new_badges:
         earned_badges.extend(new_badges)
-        await user_collection.update_one(
-            {'id': user_id},
+        await users.update(
+            user_id,
             {'$set': {'badges': earned_badges}}
         )
     
@@ -386,10 +360,10 @@ async def check_badges(user_id: int) -> List[str]:
 
 
 async def initialize_profile_data(user_id: int) -> None:
-    existing = await user_collection.find_one({'id': user_id})
+    existing = await users.get(user_id, 'profile_data', 'grab_stats', 'streak_data', 'badges')
     if existing and 'profile_data' not in existing:
-        await user_collection.update_one(
-            {'id': user_id},
+        await users.update(
+            user_id,
             {
                 '$set': {
                     'profile_data': {
@@ -408,8 +382,8 @@ async def initialize_profile_data(user_id: int) -> None:
         )
     
     if existing and 'grab_stats' not in existing:
-        await user_collection.update_one(
-            {'id': user_id},
+        await users.update(
+            user_id,
             {
                 '$set': {
                     'grab_stats': {
@@ -423,8 +397,8 @@ async def initialize_profile_data(user_id: int) -> None:
         )
     
     if existing and 'streak_data' not in existing:
-        await user_collection.update_one(
-            {'id': user_id},
+        await users.update(
+            user_id,
             {
                 '$set': {
                     'streak_data': {
@@ -437,14 +411,14 @@ async def initialize_profile_data(user_id: int) -> None:
         )
     
     if existing and 'badges' not in existing:
-        await user_collection.update_one(
-            {'id': user_id},
+        await users.update(
+            user_id,
             {'$set': {'badges': []}}
         )
 
 
 async def check_auto_unlocks(user_id: int, total_count: int) -> None:
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'profile_data')
     if not user:
         return
 
@@ -462,8 +436,8 @@ async def check_auto_unlocks(user_id: int, total_count: int) -> None:
             if title_id not in owned_titles:
                 owned_titles.append(title_id)
 
-    await user_collection.update_one(
-        {'id': user_id},
+    await users.update(
+        user_id,
         {'$set': {'profile_data.owned_titles': owned_titles}}
     )
 
@@ -477,7 +451,7 @@ async def get_user_info(user, already: bool = False) -> Tuple[str, Optional[str]
 
     user_id = user.id
     username = user.username or "ɴᴏɴᴇ"
-    existing_user = await user_collection.find_one({'id': user_id})
+    existing_user = await users.get(user_id)
     
     if not existing_user:
         return "ᴜsᴇʀ ɴᴏᴛ ғᴏᴜɴᴅ ɪɴ ᴅᴀᴛᴀʙᴀsᴇ", None
@@ -485,7 +459,7 @@ async def get_user_info(user, already: bool = False) -> Tuple[str, Optional[str]
     first_name = user.first_name
     global_rank = await get_global_rank(user_id)
     global_count = await collection.count_documents({})
-    total_count = len(existing_user.get('characters', []))
+    total_count = await count_characters(user_id)
     photo_id = user.photo.big_file_id if user.photo else None
     balance = await get_user_balance(user_id)
     global_coin_rank = await user_collection.count_documents({'balance': {'$gt': balance}}) + 1
@@ -496,7 +470,7 @@ async def get_user_info(user, already: bool = False) -> Tuple[str, Optional[str]
     await initialize_profile_data(user_id)
     await check_auto_unlocks(user_id, total_count)
 
-    existing_user = await user_collection.find_one({'id': user_id})
+    existing_user = await users.get(user_id, 'profile_data', 'pass', 'tokens')
     profile_data = existing_user.get('profile_data', {})
 
     active_title = PROFILE_TITLES.get(
@@ -619,7 +593,7 @@ async def profile(client: Client, message: Message) -> None:
         )]
     ])
 
-    existing_user = await user_collection.find_one({'id': user if isinstance(user, int) else None})
+    existing_user = isinstance(user, int) and await users.exists(user)
 
     if photo_id is None:
         await m.edit(info_text, disable_web_page_preview=True, reply_markup=keyboard)
@@ -713,14 +687,14 @@ async def claim_reward_callback(client: Client, callback_query: CallbackQuery) -
     day_index = (new_streak - 1) % 7
     reward = DAILY_REWARDS[day_index]
     
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'balance', fresh=True)
     current_balance = user.get('balance', 0)
     new_balance = current_balance + reward['coins']
     
     longest_streak = max(new_streak, streak_data['longest'])
     
-    await user_collection.update_one(
-        {'id': user_id},
+    await users.update(
+        user_id,
         {
             '$set': {
                 'balance': new_balance,
@@ -781,22 +755,18 @@ async def view_badges_callback(client: Client, callback_query: CallbackQuery) ->
 @shivuu.on_callback_query(filters.regex("^view_stats$"))
 async def view_stats_callback(client: Client, callback_query: CallbackQuery) -> None:
     user_id = callback_query.from_user.id
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'balance', 'profile_data')
     
     if not user:
         await callback_query.answer("ᴜsᴇʀ ɴᴏᴛ ғᴏᴜɴᴅ", show_alert=True)
         return
 
     grab_stats = await get_grab_stats(user_id)
-    total_count = len(user.get('characters', []))
+    summary = await get_summary(user_id) or {}
+    total_count = summary.get('total', 0)
     balance = user.get('balance', 0)
     
-    rarity_counts = {}
-    for char in user.get('characters', []):
-        rarity = char.get('rarity', '🟢 Common')
-        rarity_emoji = rarity.split(' ')[0] if ' ' in rarity else rarity
-        rarity_counts[rarity_emoji] = rarity_counts.get(rarity_emoji, 0) + 1
-    
+    rarity_counts = {k: v for k, v in summary.get('rarity', {}).items() if v > 0}
     sorted_rarities = sorted(rarity_counts.items(), key=lambda x: x[1], reverse=True)
     
     stats_text = f"""╔═══════════════════╗
@@ -841,26 +811,7 @@ async def view_stats_callback(client: Client, callback_query: CallbackQuery) ->
 async def leaderboard_callback(client: Client, callback_query: CallbackQuery) -> None:
     user_id = callback_query.from_user.id
     
-    pipeline = [
-        {
-            "$project": {
-                "id": 1,
-                "first_name": 1,
-                "characters_count": {
-                    "$cond": {
-                        "if": {"$isArray": "$characters"},
-                        "then": {"$size": "$characters"},
-                        "else": 0
-                    }
-                }
-            }
-        },
-        {"$sort": {"characters_count": -1}},
-        {"$limit": 10}
-    ]
-    
-    cursor = user_collection.aggregate(pipeline)
-    leaderboard = await cursor.to_list(length=None)
+    leaderboard = await rankings.top(10)
     
     leaderboard_text = f"""╔═══════════════════╗
     🏆 ᴛᴏᴘ ɢʀᴀʙʙᴇʀs 🏆
@@ -874,7 +825,7 @@ async def leaderboard_callback(client: Client, callback_query: CallbackQuery) ->
     for i, user_data in enumerate(leaderboard, start=1):
         medal = medals[i-1] if i <= 3 else f"#{i}"
         name = user_data.get('first_name', 'Unknown')[:15]
-        count = user_data.get('characters_count', 0)
+        count = user_data.get('total', 0)
         
         if user_data.get('id') == user_id:
             user_rank = i
@@ -933,11 +884,11 @@ async def shop_titles_callback(client: Client, callback_query: CallbackQuery) ->
     user_id = callback_query.from_user.id
     await initialize_profile_data(user_id)
     
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'profile_data')
     profile_data = user.get('profile_data', {})
     owned_titles = profile_data.get('owned_titles', ['rookie'])
     balance = await get_user_balance(user_id)
-    total_grabs = len(user.get('characters', []))
+    total_grabs = await count_characters(user_id)
 
     titles_text = "╔═══════════════════╗\n    ✦ ᴛɪᴛʟᴇ sʜᴏᴘ ✦\n╚═══════════════════╝\n\n"
 
@@ -1017,7 +968,7 @@ async def unlock_title_callback(client: Client, callback_query: CallbackQuery) -
         return
 
     title_data = PROFILE_TITLES[title_id]
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'profile_data')
     profile_data = user.get('profile_data', {})
     owned_titles = profile_data.get('owned_titles', [])
 
@@ -1027,8 +978,8 @@ async def unlock_title_callback(client: Client, callback_query: CallbackQuery) -
 
     owned_titles.append(title_id)
 
-    await user_collection.update_one(
-        {'id': user_id},
+    await users.update(
+        user_id,
         {'$set': {'profile_data.owned_titles': owned_titles}}
     )
 
@@ -1048,7 +999,7 @@ async def buy_title_callback(client: Client, callback_query: CallbackQuery) -> N
     title_data = PROFILE_TITLES[title_id]
     price = title_data['price']
 
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'balance', 'profile_data', fresh=True)
     balance = user.get('balance', 0)
     profile_data = user.get('profile_data', {})
     owned_titles = profile_data.get('owned_titles', [])
@@ -1065,8 +1016,8 @@ async def buy_title_callback(client: Client, callback_query: CallbackQuery) -> N
     new_balance = balance - price
     owned_titles.append(title_id)
 
-    await user_collection.update_one(
-        {'id': user_id},
+    await users.update(
+        user_id,
         {
             '$set': {
                 'balance': new_balance,
@@ -1088,7 +1039,7 @@ async def equip_title_callback(client: Client, callback_query: CallbackQuery) ->
         await callback_query.answer("◇ ɪɴᴠᴀʟɪᴅ ᴛɪᴛʟᴇ", show_alert=True)
         return
 
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'profile_data')
     profile_data = user.get('profile_data', {})
     owned_titles = profile_data.get('owned_titles', [])
 
@@ -1096,8 +1047,8 @@ async def equip_title_callback(client: Client, callback_query: CallbackQuery) ->
         await callback_query.answer("◇ ɴᴏᴛ ᴏᴡɴᴇᴅ", show_alert=True)
         return
 
-    await user_collection.update_one(
-        {'id': user_id},
+    await users.update(
+        user_id,
         {'$set': {'profile_data.title': title_id}}
     )
 
@@ -1110,7 +1061,7 @@ async def shop_themes_callback(client: Client, callback_query: CallbackQuery) ->
     user_id = callback_query.from_user.id
     await initialize_profile_data(user_id)
     
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'profile_data')
     profile_data = user.get('profile_data', {})
     owned_themes = profile_data.get('owned_themes', ['default'])
     balance = await get_user_balance(user_id)
@@ -1175,7 +1126,7 @@ async def buy_theme_callback(client: Client, callback_query: CallbackQuery) -> N
     theme_data = PROFILE_THEMES[theme_id]
     price = theme_data['price']
 
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'balance', 'profile_data', fresh=True)
     balance = user.get('balance', 0)
     profile_data = user.get('profile_data', {})
     owned_themes = profile_data.get('owned_themes', [])
@@ -1192,8 +1143,8 @@ async def buy_theme_callback(client: Client, callback_query: CallbackQuery) -> N
     new_balance = balance - price
     owned_themes.append(theme_id)
 
-    await user_collection.update_one(
-        {'id': user_id},
+    await users.update(
+        user_id,
         {
             '$set': {
                 'balance': new_balance,
@@ -1215,7 +1166,7 @@ async def equip_theme_callback(client: Client, callback_query: CallbackQuery) ->
         await callback_query.answer("◇ ɪɴᴠᴀʟɪᴅ ᴛʜᴇᴍᴇ", show_alert=True)
         return
 
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'profile_data')
     profile_data = user.get('profile_data', {})
     owned_themes = profile_data.get('owned_themes', [])
 
@@ -1223,8 +1174,8 @@ async def equip_theme_callback(client: Client, callback_query: CallbackQuery) ->
         await callback_query.answer("◇ ɴᴏᴛ ᴏᴡɴᴇᴅ", show_alert=True)
         return
 
-    await user_collection.update_one(
-        {'id': user_id},
+    await users.update(
+        user_id,
         {'$set': {'profile_data.theme': theme_id}}
     )
 
@@ -1237,7 +1188,7 @@ async def shop_frames_callback(client: Client, callback_query: CallbackQuery) ->
     user_id = callback_query.from_user.id
     await initialize_profile_data(user_id)
     
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'profile_data')
     profile_data = user.get('profile_data', {})
     owned_frames = profile_data.get('owned_frames', ['none'])
     balance = await get_user_balance(user_id)
@@ -1303,7 +1254,7 @@ async def buy_frame_callback(client: Client, callback_query: CallbackQuery) -> N
     frame_data = AVATAR_FRAMES[frame_id]
     price = frame_data['price']
 
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'balance', 'profile_data', fresh=True)
     balance = user.get('balance', 0)
     profile_data = user.get('profile_data', {})
     owned_frames = profile_data.get('owned_frames', [])
@@ -1320,8 +1271,8 @@ async def buy_frame_callback(client: Client, callback_query: CallbackQuery) -> N
     new_balance = balance - price
     owned_frames.append(frame_id)
 
-    await user_collection.update_one(
-        {'id': user_id},
+    await users.update(
+        user_id,
         {
             '$set': {
                 'balance': new_balance,
@@ -1343,7 +1294,7 @@ async def equip_frame_callback(client: Client, callback_query: CallbackQuery) ->
         await callback_query.answer("◇ ɪɴᴠᴀʟɪᴅ ғʀᴀᴍᴇ", show_alert=True)
         return
 
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'profile_data')
     profile_data = user.get('profile_data', {})
     owned_frames = profile_data.get('owned_frames', [])
 
@@ -1351,8 +1302,8 @@ async def equip_frame_callback(client: Client, callback_query: CallbackQuery) ->
         await callback_query.answer("◇ ɴᴏᴛ ᴏᴡɴᴇᴅ", show_alert=True)
         return
 
-    await user_collection.update_one(
-        {'id': user_id},
+    await users.update(
+        user_id,
         {'$set': {'profile_data.frame': frame_id}}
     )
 
@@ -1365,7 +1316,7 @@ async def shop_emojis_callback(client: Client, callback_query: CallbackQuery) ->
     user_id = callback_query.from_user.id
     await initialize_profile_data(user_id)
     
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'profile_data')
     profile_data = user.get('profile_data', {})
     owned_packs = profile_data.get('owned_emoji_packs', ['basic'])
     balance = await get_user_balance(user_id)
@@ -1419,7 +1370,7 @@ async def buy_emoji_callback(client: Client, callback_query: CallbackQuery) -> N
     pack_data = EMOJI_PACKS[pack_id]
     price = pack_data['price']
 
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'balance', 'profile_data', fresh=True)
     balance = user.get('balance', 0)
     profile_data = user.get('profile_data', {})
     owned_packs = profile_data.get('owned_emoji_packs', [])
@@ -1436,8 +1387,8 @@ async def buy_emoji_callback(client: Client, callback_query: CallbackQuery) -> N
     new_balance = balance - price
     owned_packs.append(pack_id)
 
-    await user_collection.update_one(
-        {'id': user_id},
+    await users.update(
+        user_id,
         {
             '$set': {
                 'balance': new_balance,
@@ -1455,7 +1406,7 @@ async def shop_bio_callback(client: Client, callback_query: CallbackQuery) -> No
     user_id = callback_query.from_user.id
     await initialize_profile_data(user_id)
     
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'profile_data')
     profile_data = user.get('profile_data', {})
     current_bio = profile_data.get('bio', 'ɴᴏᴛ sᴇᴛ')
     last_update = profile_data.get('bio_last_update')
@@ -1515,7 +1466,7 @@ async def set_bio_command(client: Client, message: Message) -> None:
         await message.reply_text(f"◇ ᴛᴏᴏ ᴍᴀɴʏ ᴇᴍᴏᴊɪs\nᴍᴀx {BIO_EMOJI_LIMIT}")
         return
 
-    user = await user_collection.find_one({'id': user_id})
+    user = await users.get(user_id, 'profile_data')
     profile_data = user.get('profile_data', {})
     last_update = profile_data.get('bio_last_update')
 
@@ -1526,8 +1477,8 @@ async def set_bio_command(client: Client, message: Message) -> None:
             await message.reply_text(f"⏰ ᴡᴀɪᴛ {int(cooldown_minutes)}ᴍ")
             return
 
-    await user_collection.update_one(
-        {'id': user_id},
+    await users.update(
+        user_id,
         {
             '$set': {
                 'profile_data.bio': bio_text,
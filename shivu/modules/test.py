@@ -4,6 +4,7 @@ from html import escape
 import random
 import re
 from shivu import db, application, collection, user_collection, sudo_users
+from shivu.modules.database.ownership import add_characters as give_characters, array_item, with_summary
 
 # Owner IDs (in addition to sudo_users)
 OWNERS = [8420981179, 5147822244]
@@ -223,27 +224,27 @@ async def add_characters(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         # Add to user collection
         try:
             if target_user_id:
-                await user_collection.update_one(
-                    {'id': target_user_id},
+                await give_characters(
+                    target_user_id,
+                    [character_data],
                     {
-                        '$push': {'characters': character_data},
                         '$setOnInsert': {
-                            'id': target_user_id,
                             'username': target_username,
                             'first_name': target_first_name
                         }
-                    },
-                    upsert=True
+                    }
                 )
             elif target_username:
+                # No user id to key the ownership store on; rows are rebuilt
+                # from the array the first time the user's collection is read.
                 await user_collection.update_one(
                     {'username': target_username},
-                    {
-                        '$push': {'characters': character_data},
+                    with_summary({
+                        '$push': {'characters': array_item(character_data)},
                         '$setOnInsert': {
                             'username': target_username
                         }
-                    },
+                    }, [character_data]),
                     upsert=True
                 )
         except Exception as e:
@@ -1,7 +1,8 @@
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from shivu import shivuu as bot
-from shivu import user_collection, application
+from shivu import application
+from shivu.modules.database.ownership import add_characters, remove_character, get_character
 import asyncio
 
 pending_trades = {}
@@ -28,19 +29,8 @@ async def handle_trade_command(update: Update, context: CallbackContext):
 
     sender_character_id, receiver_character_id = context.args[0], context.args[1]
 
-    sender = await user_collection.find_one({'id': sender_id})
-    receiver = await user_collection.find_one({'id': receiver_id})
-
-    # Ensure 'characters' is a list
-    if not isinstance(sender.get('characters'), list):
-        await message.reply_html("<b>Your characters data is corrupted!</b>")
-        return
-    if not isinstance(receiver.get('characters'), list):
-        await message.reply_html("<b>The other user's characters data is corrupted!</b>")
-        return
-
-    sender_character = next((character for character in sender['characters'] if character['id'] == sender_character_id), None)
-    receiver_character = next((character for character in receiver['characters'] if character['id'] == receiver_character_id), None)
+    sender_character = await get_character(sender_id, sender_character_id)
+    receiver_character = await get_character(receiver_id, receiver_character_id)
 
     if not sender_character:
         await message.reply_text("<b>You don't have the slave you're trying to trade!</b>")
@@ -80,37 +70,28 @@ async def on_callback_query(update: Update, context: CallbackContext):
         return
 
     if callback_query.data == "confirm_trade":
-        sender = await user_collection.find_one({'id': sender_id})
-        receiver = await user_collection.find_one({'id': receiver_id})
-
         sender_character_id = trade_data['sender_character_id']
         receiver_character_id = trade_data['receiver_character_id']
 
-        # Ensure 'characters' is a list
-        if not isinstance(sender.get('characters'), list) or not isinstance(receiver.get('characters'), list):
-            await callback_query.message.edit_text("One of the users' characters data is corrupted!")
+        sender_character = await get_character(sender_id, sender_character_id)
+        receiver_character = await get_character(receiver_id, receiver_character_id)
+
+        # Take one copy from each side; put the sender's back if the receiver's is gone
+        if (
+            not sender_character or not receiver_character
+            or not await remove_character(sender_id, sender_character_id)
+        ):
+            await callback_query.message.edit_text("One of the characters in the trade no longer exists!")
             del pending_trades[(sender_id, receiver_id)]
             return
-
-        sender_character = next((character for character in sender['characters'] if character['id'] == sender_character_id), None)
-        receiver_character = next((character for character in receiver['characters'] if character['id'] == receiver_character_id), None)
-
-        if not sender_character or not receiver_character:
+        if not await remove_character(receiver_id, receiver_character_id):
+            await add_characters(sender_id, [sender_character], upsert=False)
             await callback_query.message.edit_text("One of the characters in the trade no longer exists!")
             del pending_trades[(sender_id, receiver_id)]
             return
 
-        sender['characters'].remove(sender_character)
-        receiver['characters'].remove(receiver_character)
-
-        await user_collection.update_one({'id': sender_id}, {'$set': {'characters': sender['characters']}})
-        await user_collection.update_one({'id': receiver_id}, {'$set': {'characters': receiver['characters']}})
-
-        sender['characters'].append(receiver_character)
-        receiver['characters'].append(sender_character)
-
-        await user_collection.update_one({'id': sender_id}, {'$set': {'characters': sender['characters']}})
-        await user_collection.update_one({'id': receiver_id}, {'$set': {'characters': receiver['characters']}})
+        await add_characters(sender_id, [receiver_character], upsert=False)
+        await add_characters(receiver_id, [sender_character], upsert=False)
 
         del pending_trades[(sender_id, receiver_id)]
 
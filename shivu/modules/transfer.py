@@ -2,6 +2,7 @@ import html
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import CommandHandler, CallbackQueryHandler, ContextTypes
 from shivu import application, user_collection
+from shivu.modules.database.ownership import add_characters, clear_characters
 
 # --- CONFIGURATION ---
 OWNER_ID = 8420981179
@@ -77,8 +78,11 @@ async def transfer_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         # Atomic Database Update
-        await user_collection.update_one({'id': r_id}, {'$push': {'characters': {'$each': s_waifus}}})
-        await user_collection.update_one({'id': s_id}, {'$set': {'characters': []}})
+        s_waifus = await clear_characters(s_id)
+        if s_waifus and not await add_characters(r_id, s_waifus, upsert=False):
+            await add_characters(s_id, s_waifus, upsert=False)
+            await query.edit_message_text(f"<b>⚠️ ʀᴇᴄᴇɪᴠᴇʀ ɴᴏᴛ ꜰᴏᴜɴᴅ.</b>", parse_mode='HTML')
+            return
 
         await query.edit_message_text(f"<b>✅ ꜱᴜᴄᴄᴇꜱꜱꜰᴜʟʟʏ ᴍᴏᴠᴇᴅ {len(s_waifus)} ᴄʜᴀʀᴀᴄᴛᴇʀꜱ!</b>", parse_mode='HTML')
 
@@ -5,13 +5,14 @@ from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, InputMe
 from telegram.ext import CommandHandler, CallbackQueryHandler, ContextTypes
 from telegram.constants import ParseMode
 
-from shivu import application, collection, user_collection
+from shivu import application
+from shivu.modules.database.catalog import catalog
+from shivu.modules.database.ownership import owned_ids
 
 
 async def get_ungrabbed_characters() -> List[dict]:
-    all_chars = await collection.find({}).to_list(length=1000)
-    grabbed_ids = await user_collection.distinct('characters.id')
-    ungrabbed = [char for char in all_chars if char.get('id') not in grabbed_ids]
+    grabbed_ids = await owned_ids()
+    ungrabbed = [char for char in await catalog.all() if str(char.get('id')) not in grabbed_ids]
     return ungrabbed[:1000]
 
 
@@ -20,6 +20,7 @@ from telegram.error import TelegramError, NetworkError, TimedOut, BadRequest
 
 from shivu import application, collection, db, CHARA_CHANNEL_ID, SUPPORT_CHAT
 from shivu.config import Config
+from shivu.modules.database.catalog import catalog
 
 
 # ===================== LOGGING CONFIGURATION (Fix #6) =====================
@@ -757,6 +758,7 @@ class UploadHandler:
 
             # Save to database (only after both operations succeed)
             await collection.insert_one(character.to_dict())
+            await catalog.mark_changed(character.character_id)
 
             # Clean up temporary file
             media_file.cleanup()
@@ -799,6 +801,8 @@ class DeleteHandler:
             await update.message.reply_text('❌ ᴄʜᴀʀᴀᴄᴛᴇʀ ɴᴏᴛ ꜰᴏᴜɴᴅ ɪɴ ᴅᴀᴛᴀʙᴀꜱᴇ.')
             return
 
+        await catalog.mark_changed(character_id)
+
         try:
             if 'message_id' in character:
                 await context.bot.delete_message(
@@ -989,6 +993,8 @@ class UpdateHandler:
             await update.message.reply_text('❌ Failed to update character in database.')
             return
 
+        await catalog.mark_changed(char_id)
+
         # Update channel message (if not img_url which was already handled)
         if field != 'img_url' and 'message_id' in updated_character:
             try:
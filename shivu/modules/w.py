@@ -4,7 +4,9 @@ from dataclasses import dataclass, field
 from typing import Optional, List, Dict
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CommandHandler, CallbackContext
-from shivu import application, user_collection, collection, LOGGER
+from shivu import application, user_collection, LOGGER
+from shivu.modules.database.catalog import catalog
+from shivu.modules.database.ownership import add_characters
 import random
 
 @dataclass
@@ -53,12 +55,12 @@ class WeeklyClaimSystem:
     async def get_unique_weekly_character(self, user_id: int) -> Optional[Dict]:
         try:
             user_data = await user_collection.find_one({'id': user_id})
-            claimed_ids = [c.get('id') for c in user_data.get('characters', [])] if user_data else []
+            claimed_ids = {c.get('id') for c in user_data.get('characters', [])} if user_data else set()
 
-            available = []
-            async for char in collection.find({'rarity': {'$in': self.config.WEEKLY_RARITIES}}):
-                if char.get('id') not in claimed_ids:
-                    available.append(char)
+            available = [
+                char for char in await catalog.by_rarity(self.config.WEEKLY_RARITIES)
+                if char.get('id') not in claimed_ids
+            ]
 
             return random.choice(available) if available else None
         except Exception as e:
@@ -89,18 +91,18 @@ class WeeklyClaimSystem:
 
     async def process_claim(self, user_id: int, first_name: str, username: str, character: Dict) -> bool:
         try:
-            await user_collection.update_one(
-                {'id': user_id},
+            return await add_characters(
+                user_id,
+                [character],
                 {
-                    '$push': {'characters': character},
                     '$set': {
                         'last_weekly_claim': datetime.utcnow(),
                         'first_name': first_name,
                         'username': username
                     }
-                }
+                },
+                upsert=False
             )
-            return True
         except Exception as e:
             LOGGER.error(f"[WCLAIM] Database update error: {e}")
             return False
@@ -0,0 +1,86 @@
+import html
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable
+
+# Dropped in place, so "C.C." reads "cc" and "d'Arc" reads "darc".
+_JOINERS = re.compile(r"['\u2019.]")
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize_name(text: str) -> str:
+    """Casefold, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize('NFKD', html.unescape(text or ''))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = _JOINERS.sub('', text.casefold())
+    text = _NON_WORD.sub(' ', text)
+    return ' '.join(text.split())
+
+
+def _bag_key(normalized: str) -> str:
+    return ' '.join(sorted(normalized.split()))
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+
+    i = 0
+    while i < la and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
+
+
+@dataclass(frozen=True)
+class NameMatcher:
+    """Precomputed accepted forms of a spawned character's name.
+
+    A guess matches when it equals one name token of two or more letters,
+    or the full name or an alias with its words in any order. Each check is
+    a set lookup.
+    """
+    tokens: FrozenSet[str]
+    bags: FrozenSet[str]
+
+    @classmethod
+    def from_names(cls, names: Iterable[str]) -> 'NameMatcher':
+        tokens = set()
+        bags = set()
+        for name in names:
+            n = normalize_name(name)
+            if not n:
+                continue
+            tokens.update(t for t in n.split() if len(t) > 1)
+            bags.add(_bag_key(n))
+        return cls(frozenset(tokens), frozenset(bags))
+
+    @classmethod
+    def from_character(cls, ch: dict) -> 'NameMatcher':
+        aliases = ch.get('aliases') or []
+        if isinstance(aliases, str):
+            aliases = [aliases]
+        return cls.from_names([ch.get('name', ''), *aliases])
+
+    def matches(self, guess: str, fuzzy: bool = False) -> bool:
+        g = normalize_name(guess)
+        if not g:
+            return False
+
+        key = _bag_key(g)
+        if g in self.tokens or key in self.bags:
+            return True
+
+        # One typo is tolerated on longer guesses only, so short tokens stay exact.
+        if fuzzy and len(key) >= 5:
+            return any(_within_one_edit(key, b) for b in self.bags) or (
+                ' ' not in g and any(_within_one_edit(g, t) for t in self.tokens if len(t) >= 5)
+            )
+        return False
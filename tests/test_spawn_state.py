@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis.aioredis")
+pytest.importorskip("lupa")  # fakeredis needs it to run the clear script
+
+from shivu.modules.database.spawn_state import MemorySpawnState, RedisSpawnState
+
+TTL = 60
+
+
+def make_memory():
+    return MemorySpawnState()
+
+
+def make_redis():
+    return RedisSpawnState(fakeredis.FakeRedis(), prefix="test")
+
+
+BACKENDS = pytest.mark.parametrize("make", [make_memory, make_redis], ids=["memory", "redis"])
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@BACKENDS
+def test_claim_is_first_come(make):
+    async def go():
+        state = make()
+        await state.set_spawn(1, {"id": "a"}, TTL)
+        assert await state.claim(1, "a", 10, TTL)
+        assert not await state.claim(1, "a", 20, TTL)
+        assert await state.claimed_by(1, "a") == 10
+        assert await state.claimed_by(1, "b") is None
+    run(go())
+
+
+@BACKENDS
+def test_set_spawn_keeps_previous_claim(make):
+    async def go():
+        state = make()
+        await state.set_spawn(1, {"id": "a", "name": "A"}, TTL)
+        await state.claim(1, "a", 10, TTL)
+        await state.set_spawn(1, {"id": "b", "name": "B"}, TTL)
+        assert (await state.get_spawn(1))["id"] == "b"
+        # The despawn timer of "a" must still see it was grabbed.
+        assert await state.claimed_by(1, "a") == 10
+        assert await state.claim(1, "b", 20, TTL)
+    run(go())
+
+
+@BACKENDS
+def test_clear_spawn_only_drops_its_own_spawn(make):
+    async def go():
+        state = make()
+        await state.set_spawn(1, {"id": "a"}, TTL)
+        await state.claim(1, "a", 10, TTL)
+        await state.set_spawn(1, {"id": "b"}, TTL)
+
+        await state.clear_spawn(1, "a")
+        assert await state.claimed_by(1, "a") is None
+        assert (await state.get_spawn(1))["id"] == "b"
+
+        await state.clear_spawn(1, "b")
+        assert await state.get_spawn(1) is None
+    run(go())
+
+
+@BACKENDS
+def test_begin_spawn_is_exclusive(make):
+    async def go():
+        state = make()
+        assert await state.begin_spawn(1)
+        assert not await state.begin_spawn(1)
+        await state.end_spawn(1)
+        assert await state.begin_spawn(1)
+    run(go())
+
+
+@BACKENDS
+def test_message_counter(make):
+    async def go():
+        state = make()
+        assert await state.incr_messages(1) == 1
+        assert await state.incr_messages(1) == 2
+        await state.reset_messages(1)
+        assert await state.incr_messages(1) == 1
+    run(go())